@@ -2,8 +2,8 @@
 --- Day 4: The Ideal Stocking Stuffer ---
 """
 
-from hashlib import md5
 from common.aoc import file_to_string, aoc_part, get_filename
+from common.hashsearch import search
 
 
 def parse_data(raw_data):
@@ -15,25 +15,15 @@ def parse_data(raw_data):
 @aoc_part
 def solve_part_a(data) -> int:
     """Solve part A"""
-    i = 0
-    while True:
-        i += 1
-        s = f"{data}{i}".encode()
-        h = md5(s).hexdigest()
-        if h[:5] == "00000":
-            return i
+    i, _ = next(search(data, "00000", start=1))
+    return i
 
 
 @aoc_part
 def solve_part_b(data) -> int:
     """Solve part B"""
-    i = 0
-    while True:
-        i += 1
-        s = f"{data}{i}".encode()
-        h = md5(s).hexdigest()
-        if h[:6] == "000000":
-            return i
+    i, _ = next(search(data, "000000", start=1))
+    return i
 
 
 EX_RAW_DATA = file_to_string(get_filename(__file__, "ex"))
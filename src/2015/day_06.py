@@ -5,8 +5,7 @@
 from collections import Counter, defaultdict, deque
 import re
 from common.aoc import file_to_list, aoc_part, get_filename
-from common.blocks import BlockResolver, BlockResolverUsingBlock
-from blocksets import Block
+from common.blocks import Block, BlockMap
 
 
 def parse_data(raw_data):
@@ -102,69 +101,35 @@ def solve_part_b(data) -> int:
     return total
 
 
-@aoc_part
-def solve_part_c(data) -> int:
-    """Solve part A - alt"""
+LIGHTS = {
+    "turn on": lambda v: 1,
+    "turn off": lambda v: 0,
+    "toggle": lambda v: 1 - v,
+}
 
-    def cross_section_resolver(cross_section):
-        state = False
-        for _, stack_data in cross_section[::-1]:
-            op = stack_data[0]
-            if op == "turn on":
-                state = not state
-                break
-            if op == "turn off":
-                break
-            if op == "toggle":
-                state = not state
+BRIGHTNESS = {
+    "turn on": lambda v: v + 1,
+    "turn off": lambda v: max(0, v - 1),
+    "toggle": lambda v: v + 2,
+}
 
-        return state
 
-    br = BlockResolverUsingBlock(2, cross_section_resolver)
+@aoc_part
+def solve_part_c(data) -> int:
+    """Solve part A - alt"""
+    bm = BlockMap()
     for op, a, b in data:
-        block = Block(a, b)
-        stack_data = (op,)
-        entry = (block, stack_data)
-        br._operation_stack.append(entry)
-    br.resolve()
-
-    total = 0
-    for block, stack_data in br._operation_stack:
-        total += block.measure
-
-    return total
+        bm.apply((a, b), LIGHTS[op])
+    return bm.volume
 
 
 @aoc_part
 def solve_part_d(data) -> int:
     """Solve part B - alt"""
-
-    def cross_section_resolver(cross_section):
-        state = 0
-        for _, stack_data in cross_section:
-            op = stack_data[0]
-            if op == "turn on":
-                state += 1
-            if op == "turn off":
-                state -= 1
-                state = max(0, state)
-            if op == "toggle":
-                state += 2
-        return state
-
-    br = BlockResolverUsingBlock(2, cross_section_resolver)
+    bm = BlockMap()
     for op, a, b in data:
-        block = Block(a, b)
-        stack_data = (op,)
-        entry = (block, stack_data)
-        br._operation_stack.append(entry)
-    br.resolve()
-
-    total = 0
-    for block, stack_data in br._operation_stack:
-        total += block.measure * stack_data[0]
-
-    return total
+        bm.apply((a, b), BRIGHTNESS[op])
+    return bm.total
 
 
 @aoc_part
@@ -212,7 +177,7 @@ MY_DATA = parse_data(MY_RAW_DATA)
 solve_part_a(MY_DATA)
 solve_part_b(MY_DATA)
 
-# # using BlockResolver
+# # using BlockMap
 solve_part_c(MY_DATA)
 solve_part_d(MY_DATA)
 
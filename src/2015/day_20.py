@@ -6,7 +6,12 @@ from collections import Counter, defaultdict
 from math import log2, prod, sqrt
 from common.aoc import file_to_string, aoc_part, get_filename
 from common.general import powerset
-from common.numty import prime_factors, prime_list, sum_geometric_seq
+from common.numty import (
+    first_divisor_sum_at_least,
+    prime_factors,
+    prime_list,
+    sum_geometric_seq,
+)
 
 
 def parse_data(raw_data):
@@ -158,9 +163,25 @@ def solve_part_b(data) -> int:
     return ans[0][0]
 
 
+@aoc_part
+def solve_part_c(data) -> int:
+    """Solve part A, by sieving the divisor sums in order"""
+    return first_divisor_sum_at_least(-(-data // 10))
+
+
+@aoc_part
+def solve_part_d(data) -> int:
+    """Solve part B, by sieving the divisor sums of elves only
+    visiting their first 50 houses"""
+    return first_divisor_sum_at_least(-(-data // 11), max_multiples=50)
+
+
 MY_RAW_DATA = file_to_string(get_filename(__file__, "my"))
 MY_DATA = parse_data(MY_RAW_DATA)
 
 solve_part_a(MY_DATA)
 # analysis(MY_DATA)
 solve_part_b(MY_DATA)
+
+solve_part_c(MY_DATA)
+solve_part_d(MY_DATA)
@@ -2,8 +2,9 @@
 --- Day 5: How About a Nice Game of Chess? ---
 """
 
-import hashlib
+from itertools import islice
 from common.aoc import file_to_string, aoc_part, get_filename
+from common.hashsearch import search
 
 
 def parse_data(raw_data):
@@ -15,45 +16,28 @@ def parse_data(raw_data):
 @aoc_part
 def solve_part_a(data) -> int:
     """Solve part A"""
-    i = 0
-    pwd = ""
-    while True:
-
-        s = f"{data}{i}".encode()
-        h = hashlib.md5(s)
-        h = h.hexdigest()
-        if h[:5] == "00000":
-            pwd += h[5]
-            if len(pwd) == 8:
-                break
-        i += 1
-
-    return pwd
+    found = islice(search(data, "00000"), 8)
+    return "".join(d.hex()[5] for _, d in found)
 
 
 @aoc_part
 def solve_part_b(data) -> int:
     """Solve part B"""
-    i = 0
     pwd = [" "] * 8
-    while True:
-
-        s = f"{data}{i}".encode()
-        h = hashlib.md5(s)
-        h = h.hexdigest()
-        if h[:5] == "00000":
-            p = h[5]
-            v = h[6]
-            if p in "01234567":
-                p = int(p)
-                if pwd[p] == " ":
-                    pwd[p] = v
-                    print("".join(pwd))
-                    if " " not in pwd:
-                        pwd = "".join(pwd)
-                        return pwd
-
-        i += 1
+    for _, d in search(data, "00000"):
+        h = d.hex()
+        p = h[5]
+        v = h[6]
+        if p in "01234567":
+            p = int(p)
+            if pwd[p] == " ":
+                pwd[p] = v
+                print("".join(pwd))
+                if " " not in pwd:
+                    pwd = "".join(pwd)
+                    return pwd
+
+    return None
 
 
 EX_RAW_DATA = file_to_string(get_filename(__file__, "ex"))
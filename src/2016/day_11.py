@@ -2,11 +2,12 @@
 --- Day 11: Radioisotope Thermoelectric Generators ---
 """
 
-from collections import defaultdict, deque
-from itertools import combinations
+from collections import defaultdict
+from itertools import chain, combinations
 import re
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.general import tok
+from common.graph import state_search
 
 
 def parse_data(raw_data):
@@ -53,73 +54,54 @@ def get_state_key(state):
     return lift, locations
 
 
+def is_valid(locations, sz) -> bool:
+    """No chip is left with another generator unless its own is there too"""
+    generators = locations[:sz]
+    chips = locations[sz:]
+    for i in range(sz):
+        if chips[i] == generators[i]:
+            # chip & gen are on the same floor, ok
+            continue
+        if chips[i] in generators:
+            return False
+    return True
+
+
 def solve(elements) -> int:
-    """Solve"""
+    """Solve, moves are reversible so search from both ends"""
     data = create_initial_state(elements)
     max_floor = 3
     elements, locations = data
     sz = len(elements)
     final = (max_floor, (max_floor,) * sz * 2)
 
-    lift = 0
-    state = (lift, locations)
-    bfs = deque()
-    best_for_state = {}
-    bfs.append((state, 0))
-    while bfs:
-        state, steps = bfs.popleft()
-        state_key = get_state_key(state)
-
-        if state == final:
-            return steps
-
-        if state_key in best_for_state and best_for_state[state_key] <= steps:
-            continue
-        best_for_state[state_key] = steps
-
+    def options(state):
         lift, locations = state
-        generators = locations[:sz]
-        chips = locations[sz:]
-
-        # validate state
-        valid = True
-        for i in range(sz):
-            if chips[i] == generators[i]:
-                # chip & gen are on the same floor, ok
-                continue
-            generators_on_this_floor = [x for x in generators if x == chips[i]]
-            if generators_on_this_floor:
-                valid = False
-                break
-
-        if not valid:
-            continue
-
-        # options
+        on_this_floor = [i for i, x in enumerate(locations) if x == lift]
         for d in range(-1, 2, 2):
-
             new_lift = lift + d
             if not 0 <= new_lift <= max_floor:
                 continue
 
-            on_this_floor = [i for i, x in enumerate(locations) if x == lift]
-
-            # take 1
-            for x in on_this_floor:
-                new_locations = list(locations)
-                new_locations[x] = new_lift
-                new_state = (new_lift, tuple(new_locations))
-                bfs.append((new_state, steps + 1))
-
-            # take 2
-            for a, b in combinations(on_this_floor, 2):
+            # take 1 or 2
+            take_1 = combinations(on_this_floor, 1)
+            take_2 = combinations(on_this_floor, 2)
+            for items in chain(take_1, take_2):
                 new_locations = list(locations)
-                new_locations[a] = new_lift
-                new_locations[b] = new_lift
-                new_state = (new_lift, tuple(new_locations))
-                bfs.append((new_state, steps + 1))
-
-    return None
+                for x in items:
+                    new_locations[x] = new_lift
+                new_locations = tuple(new_locations)
+                if is_valid(new_locations, sz):
+                    yield (new_lift, new_locations), 1
+
+    steps, _ = state_search(
+        (0, locations),
+        final,
+        options,
+        state_key=get_state_key,
+        bidirectional=True,
+    )
+    return steps
 
 
 @aoc_part
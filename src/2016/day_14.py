@@ -3,9 +3,9 @@
 """
 
 from collections import Counter, defaultdict
-import hashlib
 from common.aoc import file_to_string, aoc_part, get_filename
 from common.general import window_over
+from common.hashsearch import hashes
 
 
 def parse_data(raw_data):
@@ -25,21 +25,9 @@ def contains_bunch(s, sz=3):
 
 def find_keys(salt, start=0, stretch=0):
     """Generator for keys"""
-
-    def hash_iter(salt, t=stretch):
-        s = f"{salt}{i}".encode()
-        h = hashlib.md5(s)
-        h = h.hexdigest()
-        for _ in range(t):
-            bs = h.encode()
-            h = hashlib.md5(bs)
-            h = h.hexdigest()
-        return h
-
-    i = start
     bunches = defaultdict(list)
-    while True:
-        h = hash_iter(salt)
+    keyed = hashes(salt, start=start, stretch=stretch, cache=True)
+    for i, h in enumerate(keyed, start):
 
         b = contains_bunch(h, sz=5)
         if b:
@@ -52,8 +40,6 @@ def find_keys(salt, start=0, stretch=0):
         if b:
             bunches[b].append(i)
 
-        i += 1
-
 
 @aoc_part
 def solve_part_a(data) -> int:
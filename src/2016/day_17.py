@@ -3,10 +3,10 @@
 """
 
 from collections import deque
-from hashlib import md5
 from operator import add
 from common.aoc import file_to_string, aoc_part, get_filename
 from common.grid_2d import directions_UDLR
+from common.hashsearch import salted
 
 
 def parse_data(raw_data):
@@ -18,6 +18,7 @@ def parse_data(raw_data):
 def shortest_path(salt):
     """Return the UDLR path"""
     d_map = ["U", "D", "L", "R"]
+    digest = salted(salt)
     pos = (0, 0)
     bfs = deque()
     bfs.append(("", pos))
@@ -26,9 +27,7 @@ def shortest_path(salt):
         if pos == (3, 3):
             return route
 
-        s = f"{salt}{route}"
-        s = s.encode()
-        h = md5(s).hexdigest()
+        h = digest(route)[:2].hex()
 
         for d, v in directions_UDLR.items():
             nxt = tuple(map(add, pos, v))
@@ -52,6 +51,7 @@ def solve_part_a(salt) -> str:
 def longest_path(salt):
     """Return the UDLR path"""
     d_map = ["U", "D", "L", "R"]
+    digest = salted(salt)
     pos = (0, 0)
     bfs = deque()
     bfs.append(("", pos))
@@ -62,9 +62,7 @@ def longest_path(salt):
             lp = max(lp, len(route))
             continue
 
-        s = f"{salt}{route}"
-        s = s.encode()
-        h = md5(s).hexdigest()
+        h = digest(route)[:2].hex()
 
         for d, v in directions_UDLR.items():
             nxt = tuple(map(add, pos, v))
@@ -2,10 +2,10 @@
 --- Day 20: Firewall Rules ---
 """
 
-from itertools import pairwise
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.general import tok
-from blocksets import BlockSet, Block
+from common.blocks import BlockMap
+from common.intervals import Interval, IntervalSet
 
 
 def parse_data(raw_data):
@@ -21,56 +21,25 @@ def parse_data(raw_data):
 @aoc_part
 def solve_part_a(data) -> int:
     """Solve part A"""
-    lowest = 0
-    tests = set(data)
-    next_tests = set()
-    while tests:
-        prv_lowest = lowest
-        for a, b in tests:
-            if lowest < a:
-                next_tests.add((a, b))
-            if a <= lowest < b:
-                lowest = b
-        if prv_lowest == lowest:
-            break
-        tests = next_tests
-    return lowest
+    blocked = IntervalSet(data)
+    return blocked.next_outside(0)
 
 
 @aoc_part
 def solve_part_b(data) -> int:
     """Solve part B"""
-    markers = {2**32}
-    for a, b in data:
-        markers.add(a)
-        markers.add(b)
-
-    markers = sorted(markers)
-    total = 0
-    for x, y in pairwise(markers):
-        exclude = False
-        for a, b in data:
-            if y < a or x > b:
-                continue
-            if a <= x and y <= b:
-                exclude = True
-                break
-        if not exclude:
-            allowed = y - x
-            total += allowed
-
-    return total
+    blocked = IntervalSet(data)
+    return blocked.negation(Interval(0, 2**32)).size()
 
 
 @aoc_part
 def solve_part_c(data) -> int:
-    bs = BlockSet(1)
-    b = Block(0, 2**32)
-    bs.add(b)
+    """Solve part B again, using 1D blocks"""
+    bm = BlockMap()
+    bm.set(((0,), (2**32,)), 1)
     for a, b in data:
-        b = Block(a, b)
-        bs.remove(b)
-    return bs.measure
+        bm.set(((a,), (b,)), 0)
+    return bm.volume
 
 
 EX_RAW_DATA = file_to_list(get_filename(__file__, "ex"))
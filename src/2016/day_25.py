@@ -2,104 +2,28 @@
 --- Day 25: Clock Signal ---
 """
 
-from collections import defaultdict
 from common.aoc import file_to_list, aoc_part, get_filename
-from common.general import tok
+from common.regvm import RegisterVM, parse_words
 
 
 def parse_data(raw_data):
     """Parse the input"""
-    data = []
-    for line in raw_data:
-        arr = tok(line)
-        op = arr[0]
-        args = []
-        for x in arr[1:]:
-            try:
-                x = int(x)
-            except ValueError:
-                pass
-            args.append(x)
-        row = (op, tuple(args))
-        data.append(row)
-    return data
-
-
-def run_pgm(pgm, reg):
-    """Run the program"""
-    p = 0
-    c = 0
-    output = []
-    while True:
-        c += 1
-        if len(output) == 20:
-            break
-
-        try:
-            op, args = pgm[p]
-        except IndexError:
-            break
-
-        v_args = [reg[a] if isinstance(a, str) else a for a in args]
-
-        if op == "inc":
-            reg[args[0]] += 1
-            p += 1
-            continue
-
-        if op == "dec":
-            reg[args[0]] -= 1
-            p += 1
-            continue
-
-        if op == "cpy":
-            reg[args[1]] = v_args[0]
-            p += 1
-            continue
-
-        if op == "jnz":
-            if v_args[0] != 0:
-                p += v_args[1]
-            else:
-                p += 1
-            continue
-
-        if op == "tgl":
-            q = p + v_args[0]
-            if q < len(pgm):
-                t_op, t_args = pgm[q]
-                if t_op in ("inc", "dec", "tgl"):
-                    n_op = "inc"
-                    if t_op in ("inc"):
-                        n_op = "dec"
-                else:
-                    n_op = "jnz"
-                    if t_op in ("jnz"):
-                        n_op = "cpy"
-                pgm[q] = (n_op, t_args)
-
-            p += 1
-            continue
-
-        if op == "out":
-            output.append(str(v_args[0]))
-            p += 1
-            continue
-
-    return "".join(output)
+    return parse_words(raw_data)
 
 
 @aoc_part
 def solve_part_a(data) -> int:
     """Solve part A"""
-    v1 = "01" * 10
-    v2 = "10" * 10
+    v1 = [0, 1] * 10
+    v2 = [1, 0] * 10
+    vm = RegisterVM(data, "assembunny")
     a = 0
     while True:
-        reg = defaultdict(int)
-        reg["a"] = a
-        output = run_pgm(data, reg)
-        if output in (v1, v2):
+        # the compiled blocks are kept over the reset
+        vm.reset()
+        vm["a"] = a
+        vm.run(max_output=20)
+        if vm.output in (v1, v2):
             return a
         a += 1
 
@@ -6,6 +6,7 @@ from collections import defaultdict, deque
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.general import tok
 from common.graph import tarjan
+from common.union_find import DisjointSet
 
 
 def parse_data(raw_data):
@@ -68,6 +69,22 @@ def solve_part_c(gph) -> int:
     return len(cgs)
 
 
+def pipes(raw_data):
+    """Generate the (pid, pid) pipes straight from the input"""
+    for line in raw_data:
+        arr = tok(line, "<->")
+        pid = int(arr[0])
+        for p in tok(arr[1], ","):
+            yield pid, int(p)
+
+
+@aoc_part
+def solve_part_d(raw_data) -> tuple:
+    """Solve both parts with union find over the stream of pipes"""
+    ds = DisjointSet.from_edges(pipes(raw_data))
+    return ds.size(0), ds.count
+
+
 EX_RAW_DATA = file_to_list(get_filename(__file__, "ex"))
 EX_DATA = parse_data(EX_RAW_DATA)
 
@@ -81,3 +98,4 @@ solve_part_b(EX_DATA)
 solve_part_b(MY_DATA)
 
 solve_part_c(MY_DATA)
+solve_part_d(MY_RAW_DATA)
@@ -3,6 +3,7 @@
 """
 
 from common.aoc import aoc_part, file_to_string, get_filename
+from common.cycles import find_cycle
 from common.general import tok
 
 
@@ -56,31 +57,13 @@ def solve_part_a(data, sz=5) -> int:
     return "".join(line)
 
 
-def find_repeat(data, sz):
-    """Find the repeat"""
-    line = get_starting_line(sz)
-    s = "".join(line)
-    outcomes = [s]
-    n = 0
-    while True:
-        n += 1
-        line = do_dance(data, line)
-        s = "".join(line)
-        if s in outcomes:
-            p = outcomes.index(s)
-            return p, n, outcomes
-        outcomes.append(s)
-
-
 @aoc_part
 def solve_part_b(data, sz=5) -> int:
     """Solve part B"""
     after = 1000000000
-    a, b, outcomes = find_repeat(data, sz)
-    m = b - a
-    cc = (after - a) % m
-    pos = outcomes[cc + a]
-    return pos
+    line = get_starting_line(sz)
+    cycle = find_cycle(lambda l: do_dance(data, list(l)), line, key="".join)
+    return cycle[after]
 
 
 EX_RAW_DATA = file_to_string(get_filename(__file__, "ex"))
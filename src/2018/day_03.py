@@ -6,7 +6,7 @@ from collections import defaultdict
 import re
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.general import tok
-from blocksets import Block
+from common.blocks import Block
 
 
 def parse_data(raw_data):
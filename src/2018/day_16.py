@@ -6,6 +6,7 @@ from collections import defaultdict
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.general import tok, window_over
 from common.logic import exact_cover, mapping_options, resolve_injective_mappings
+from common.regvm import ELFCODE_OPS, RegisterVM, elfcode_op
 
 
 def parse_data(raw_data):
@@ -29,125 +30,14 @@ def parse_data(raw_data):
     return data, pgm
 
 
-def do_op(op, args, registers):
-    """Return after state"""
-    after = registers.copy()
-
-    if op == "addr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a + b
-
-    if op == "addi":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a + b
-
-    if op == "mulr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a * b
-
-    if op == "muli":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a * b
-
-    if op == "banr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a & b
-
-    if op == "bani":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a & b
-
-    if op == "borr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a | b
-
-    if op == "bori":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a | b
-
-    if op == "setr":
-        a = registers[args[0]]
-        c = args[2]
-        after[c] = a
-
-    if op == "seti":
-        a = args[0]
-        c = args[2]
-        after[c] = a
-
-    if op == "gtir":
-        a = args[0]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a > b else 0
-
-    if op == "gtri":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = 1 if a > b else 0
-
-    if op == "gtrr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a > b else 0
-
-    if op == "eqir":
-        a = args[0]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a == b else 0
-
-    if op == "eqri":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = 1 if a == b else 0
-
-    if op == "eqrr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a == b else 0
-
-    return after
-
-
-ops = {
-    "addr",
-    "addi",
-    "mulr",
-    "muli",
-    "banr",
-    "bani",
-    "borr",
-    "bori",
-    "setr",
-    "seti",
-    "gtir",
-    "gtri",
-    "gtrr",
-    "eqir",
-    "eqri",
-    "eqrr",
-}
+ops = set(ELFCODE_OPS)
+
+
+def run_pgm(pgm, op_map) -> int:
+    """Run the program once the opcodes are known, return register 0"""
+    vm = RegisterVM([(op_map[e[0]], *e[1:]) for e in pgm], "elfcode", range(4))
+    vm.run()
+    return vm[0]
 
 
 @aoc_part
@@ -159,7 +49,7 @@ def solve_part_a(data) -> int:
     for b, (o, args), a in data:
         cnt = 0
         for op in ops:
-            ca = do_op(op, args, b)
+            ca = elfcode_op(op, args, b)
             if ca == a:
                 opcodes[o].add(op)
                 cnt += 1
@@ -176,7 +66,7 @@ def solve_part_b(data) -> int:
     opcodes = defaultdict(set)
     for b, (o, args), a in data:
         for op in ops:
-            ca = do_op(op, args, b)
+            ca = elfcode_op(op, args, b)
             if ca == a:
                 opcodes[o].add(op)
     resolved, op_map = resolve_injective_mappings(opcodes)
@@ -184,13 +74,7 @@ def solve_part_b(data) -> int:
         print("No can do")
         return None
 
-    registers = [0] * 4
-    for e in pgm:
-        op = op_map[e[0]]
-        args = e[1:]
-        registers = do_op(op, args, registers)
-
-    return registers[0]
+    return run_pgm(pgm, op_map)
 
 
 @aoc_part
@@ -205,7 +89,7 @@ def solve_part_c(data) -> int:
 
     for b, (o, args), a in data:
         for op in ops:
-            ca = do_op(op, args, b)
+            ca = elfcode_op(op, args, b)
             if ca == a:
                 # each possibility meets name constraint and an index constraint
                 possibilities[(o, op)] = [("#", o), ("o", op)]
@@ -219,13 +103,7 @@ def solve_part_c(data) -> int:
 
     op_map = {idx: op for idx, op in solution}
 
-    registers = [0] * 4
-    for e in pgm:
-        op = op_map[e[0]]
-        args = e[1:]
-        registers = do_op(op, args, registers)
-
-    return registers[0]
+    return run_pgm(pgm, op_map)
 
 
 @aoc_part
@@ -235,7 +113,7 @@ def solve_part_d(data) -> int:
     opcodes = defaultdict(set)
     for b, (o, args), a in data:
         for op in ops:
-            ca = do_op(op, args, b)
+            ca = elfcode_op(op, args, b)
             if ca == a:
                 opcodes[o].add(op)
     options = list(mapping_options(opcodes))
@@ -245,13 +123,7 @@ def solve_part_d(data) -> int:
 
     op_map = options[0]
 
-    registers = [0] * 4
-    for e in pgm:
-        op = op_map[e[0]]
-        args = e[1:]
-        registers = do_op(op, args, registers)
-
-    return registers[0]
+    return run_pgm(pgm, op_map)
 
 
 MY_RAW_DATA = file_to_list(get_filename(__file__, "my"))
@@ -7,6 +7,7 @@ from itertools import pairwise
 import json
 from operator import add
 from common.aoc import file_to_list, aoc_part, get_filename
+from common.cycles import find_cycle
 from common.grid_2d import all_directions
 from common.numty import (
     get_congruence_classes_from_simulation,
@@ -87,48 +88,27 @@ def solve_part_a(data) -> int:
     return ans
 
 
-def analysis(data):
-    """Find a repeated state"""
-
-    def get_state():
-        s = ""
-        for r in range(height):
-            for c in range(width):
-                p = (r, c)
-                s += landscape[p]
-        return s
-
-    height, width, landscape = data
-    st = get_state()
-    states = [st]
-    i = 0
-    while True:
-        landscape = iterate(height, width, landscape)
-        i += 1
-        st = get_state()
-        if st in states:
-            return states.index(st), i, states
-        states.append(st)
+def get_state(height, width, landscape):
+    """The landscape as a string"""
+    s = ""
+    for r in range(height):
+        for c in range(width):
+            p = (r, c)
+            s += landscape[p]
+    return s
 
 
 @aoc_part
 def solve_part_b(data) -> int:
     """Solve part B"""
     when = 1000000000
-    # analysis finds first repeat of state returning
-    # a: idx of 1st occurrence
-    # b: idx of 2nd occurrence
-    # list of the states leading up to b
-    a, b, states = analysis(data)
-
-    # m: modulus
-    m = b - a
-
-    # cc: congruence class for when
-    cc = (when - a) % m
-
-    # cc+a gives the index of the state for when
-    state = states[cc + a]
+    height, width, landscape = data
+    loop = find_cycle(
+        lambda l: iterate(height, width, l),
+        landscape,
+        key=lambda l: get_state(height, width, l),
+    )
+    state = loop[when]
 
     cnt = Counter(state)
     ans = cnt["|"] * cnt["#"]
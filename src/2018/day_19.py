@@ -4,6 +4,7 @@
 
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.general import tok
+from common.regvm import RegisterVM, elfcode_op
 
 
 def parse_data(raw_data):
@@ -16,137 +17,21 @@ def parse_data(raw_data):
     return pgm
 
 
-def do_op(op, args, registers):
-    """Return after state - copied from day 16"""
-    after = registers.copy()
-
-    if op == "addr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a + b
-
-    if op == "addi":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a + b
-
-    if op == "mulr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a * b
-
-    if op == "muli":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a * b
-
-    if op == "banr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a & b
-
-    if op == "bani":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a & b
-
-    if op == "borr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a | b
-
-    if op == "bori":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a | b
-
-    if op == "setr":
-        a = registers[args[0]]
-        c = args[2]
-        after[c] = a
-
-    if op == "seti":
-        a = args[0]
-        c = args[2]
-        after[c] = a
-
-    if op == "gtir":
-        a = args[0]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a > b else 0
-
-    if op == "gtri":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = 1 if a > b else 0
-
-    if op == "gtrr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a > b else 0
-
-    if op == "eqir":
-        a = args[0]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a == b else 0
-
-    if op == "eqri":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = 1 if a == b else 0
-
-    if op == "eqrr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a == b else 0
-
-    return after
-
-
-def run_pgm_a(pgm, bound_reg):
-    """Run the program"""
-    registers = [0] * 6
-
-    while True:
-
-        ip = registers[bound_reg]
-
-        try:
-            ins, args = pgm[ip]
-        except IndexError:
-            break
-
-        registers = do_op(ins, args, registers)
-
-        registers[bound_reg] += 1
-
-    return registers
+def run_pgm(data, r0) -> int:
+    """Run the program with the divisor loops optimised, return register 0"""
+    _, args = data[0]
+    pgm = [(op, *args) for op, args in data[1:]]
+    vm = RegisterVM(pgm, "elfcode", ip_register=args[0], optimise=True)
+    vm[0] = r0
+    vm.run()
+    print(vm.idioms())
+    return vm[0]
 
 
 @aoc_part
 def solve_part_a(data) -> int:
     """Solve part A"""
-    _, args = data[0]
-    bound_reg = args[0]
-    registers = run_pgm_a(data[1:], bound_reg)
-    if bound_reg == 0:
-        registers[0] -= 1
-    print(registers)
-    return registers[0]
+    return run_pgm(data, 0)
 
 
 def run_pgm_b(
@@ -203,7 +88,7 @@ def run_pgm_b(
                     dc += 1
                 dn = dump_next
 
-        registers = do_op(ins, args, registers)
+        registers = elfcode_op(ins, args, registers)
 
         registers[bound_reg] += 1
 
@@ -231,7 +116,7 @@ def run_pgm_c(pgm, bound_reg, registers):
             return registers
         print(dump)
 
-        registers = do_op(ins, args, registers)
+        registers = elfcode_op(ins, args, registers)
 
         registers[bound_reg] += 1
 
@@ -327,51 +212,12 @@ def analysis(data):
                 break
 
 
-def find_r5(pgm, bound_reg):
-    """Run the program for a set of registers and quit if register 0 changed"""
-
-    registers = [0] * 6
-    registers[0] = 1
-    r0 = 1
-
-    while True:
-        ip = registers[bound_reg]
-
-        try:
-            ins, args = pgm[ip]
-        except IndexError:
-            return registers
-
-        if registers[0] != r0:
-            return registers[5]
-
-        registers = do_op(ins, args, registers)
-
-        registers[bound_reg] += 1
-
-
 @aoc_part
 def solve_part_b(data) -> int:
-    """Solve part B"""
-    _, args = data[0]
-    bound_reg = args[0]
-
-    r5 = find_r5(data[1:], bound_reg)
-    sf = 0
-    for x in range(1, r5 + 1):
-        if r5 % x != 0:
-            continue
-        sf += x
-
-    # We think r0 is the sum of the factors of r5
-    # see if the program halts putting r3 to sf-1
-    registers = run_pgm_b(
-        data[1:],
-        bound_reg,
-        registers=[sf, r5, 3, sf - 1, 1, r5],
-    )
-    print(registers)
-    return registers[0]
+    """Solve part B
+    r0 ends up as the sum of the factors of r5, which analysis() found by
+    hand and the optimiser now spots as a nested divisor sum"""
+    return run_pgm(data, 1)
 
 
 EX_RAW_DATA = file_to_list(get_filename(__file__, "ex"))
@@ -383,5 +229,5 @@ MY_DATA = parse_data(MY_RAW_DATA)
 solve_part_a(EX_DATA)
 solve_part_a(MY_DATA)
 
-analysis(MY_DATA)
+# analysis(MY_DATA)
 solve_part_b(MY_DATA)
@@ -5,6 +5,7 @@
 from collections import defaultdict
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.general import tok
+from common.regvm import BREAK, RegisterVM, elfcode_op
 
 
 def parse_data(raw_data):
@@ -17,107 +18,6 @@ def parse_data(raw_data):
     return pgm
 
 
-def do_op(op, args, registers):
-    """Return after state - copied from day 16"""
-    after = registers.copy()
-
-    if op == "addr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a + b
-
-    if op == "addi":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a + b
-
-    if op == "mulr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a * b
-
-    if op == "muli":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a * b
-
-    if op == "banr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a & b
-
-    if op == "bani":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a & b
-
-    if op == "borr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = a | b
-
-    if op == "bori":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = a | b
-
-    if op == "setr":
-        a = registers[args[0]]
-        c = args[2]
-        after[c] = a
-
-    if op == "seti":
-        a = args[0]
-        c = args[2]
-        after[c] = a
-
-    if op == "gtir":
-        a = args[0]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a > b else 0
-
-    if op == "gtri":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = 1 if a > b else 0
-
-    if op == "gtrr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a > b else 0
-
-    if op == "eqir":
-        a = args[0]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a == b else 0
-
-    if op == "eqri":
-        a = registers[args[0]]
-        b = args[1]
-        c = args[2]
-        after[c] = 1 if a == b else 0
-
-    if op == "eqrr":
-        a = registers[args[0]]
-        b = registers[args[1]]
-        c = args[2]
-        after[c] = 1 if a == b else 0
-
-    return after
-
-
 def pgm_halts(pgm, bound_reg, registers):
     """Yes but when/why? Dump various things for analysis"""
     states = set()
@@ -164,7 +64,7 @@ def pgm_halts(pgm, bound_reg, registers):
         #     break
 
         prv_reg = registers.copy()
-        registers = do_op(ins, args, registers)
+        registers = elfcode_op(ins, args, registers)
 
         dump = f"{cnt:10} {ip:4} {str(prv_reg):50} {ins:6} {str(args):30} {str(registers):50} "
 
@@ -185,63 +85,43 @@ def pgm_halts(pgm, bound_reg, registers):
         registers[bound_reg] += 1
 
 
-def next_r3(pgm, bound_reg, registers):
-    """Registers 1,3 change value on 17 and 30
-    17: R1 is still over 255 ( R1->R1 // 256 ) : resume on 8
-    30: R1 is <= 255 and meets the condition for halting : resume on 6
-    """
-    while True:
-        ip = registers[bound_reg]
-
-        try:
-            ins, args = pgm[ip]
-        except IndexError:
-            return registers
-        registers = do_op(ins, args, registers)
+def get_vm(data) -> RegisterVM:
+    """The program with the r1 // 256 loop optimised"""
+    _, args = data[0]
+    pgm = [(op, *args) for op, args in data[1:]]
+    return RegisterVM(pgm, "elfcode", ip_register=args[0], optimise=True)
 
-        if ip in (17, 30):
-            return registers
 
-        registers[bound_reg] += 1
+def halting_values(vm: RegisterVM):
+    """Generate the values r0 is compared with to see if we halt"""
+    check = next(
+        k for k, ins in enumerate(vm.program) if ins[0] == "eqrr" and 0 in ins[1:3]
+    )
+    _, a, b, _ = vm.program[check]
+    vm.breakpoints = {check}
+    while vm.run() == BREAK:
+        yield vm[b if a == 0 else a]
 
 
 @aoc_part
 def solve_part_a(data) -> int:
     """Solve part A"""
-    _, args = data[0]
-    bound_reg = args[0]
-
-    registers = [0] * 6
-    while True:
-        registers = next_r3(data[1:], bound_reg, registers)
-        if registers[5] == 17:
-            registers[5] = 8
-            registers[1] = registers[1] // 256
-        else:
-            return registers[3]
+    return next(halting_values(get_vm(data)))
 
 
 @aoc_part
 def solve_part_b(data) -> int:
-    """Solve part A"""
-    _, args = data[0]
-    bound_reg = args[0]
-
-    registers = [0] * 6
-    states = []
-    while True:
-        registers = next_r3(data[1:], bound_reg, registers)
-        if registers[5] == 17:
-            registers[5] = 8
-            registers[1] = registers[1] // 256
-        else:
-            if registers[3] in states:
-                break
-            states.append(registers[3])
-            registers[5] = 6
-            registers[1] = registers[3]
-
-    return states[-1]
+    """Solve part B, the last value before they repeat"""
+    vm = get_vm(data)
+    states = set()
+    last = None
+    for r3 in halting_values(vm):
+        if r3 in states:
+            break
+        states.add(r3)
+        last = r3
+    print(vm.idioms())
+    return last
 
 
 MY_RAW_DATA = file_to_list(get_filename(__file__, "my"))
@@ -8,9 +8,8 @@ from math import inf
 from operator import sub
 import re
 from common.aoc import file_to_list, aoc_part, get_filename
-from common.blocks import BlockResolver, BlockResolverUsingBlock
+from common.blocks import Block, BlockResolver, BlockResolverUsingBlock
 from common.grid_3d import octahedron_manhattan_planes, octaplanes_to_point_set
-from blocksets import Block
 
 
 def parse_data(raw_data):
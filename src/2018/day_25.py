@@ -8,6 +8,7 @@ from operator import sub
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.general import tok
 from common.graph import tarjan
+from common.union_find import DisjointSet
 
 
 def parse_data(raw_data):
@@ -82,6 +83,14 @@ def solve_part_c(data) -> int:
     return len(sccs)
 
 
+@aoc_part
+def solve_part_d(data) -> int:
+    """Solve part A using union find, no graph needed"""
+    edges = ((p, q) for p, q in combinations(data, 2) if manhattan(p, q) <= 3)
+    ds = DisjointSet.from_edges(edges, nodes=data)
+    return ds.count
+
+
 EX_RAW_DATA = file_to_list(get_filename(__file__, "ex"))
 EX_DATA = parse_data(EX_RAW_DATA)
 
@@ -92,3 +101,4 @@ solve_part_a(EX_DATA)
 solve_part_a(MY_DATA)
 
 solve_part_c(MY_DATA)
+solve_part_d(MY_DATA)
@@ -3,7 +3,6 @@
 """
 
 from collections import defaultdict, deque
-from copy import deepcopy
 from operator import add
 from common.aoc import aoc_part, file_to_string, get_filename
 from common.graph import dijkstra, simplify
@@ -41,11 +40,11 @@ def create_map(data):
     ic = IntCode(data)
     origin = (0, 0)
     bfs = deque()
-    bfs.append((origin, ic))
+    bfs.append((origin, ic.snapshot()))
     seen = set()
     oxygen = None
     while bfs:
-        pos, ic = bfs.popleft()
+        pos, state = bfs.popleft()
         if pos in seen:
             continue
         seen.add(pos)
@@ -55,10 +54,10 @@ def create_map(data):
             if nxt_pos in seen:
                 continue
 
-            nic = deepcopy(ic)
-            nic.input.append(NEWS[k])
-            nic.go()
-            reply = nic.output.pop()
+            ic.restore(state)
+            ic.input.append(NEWS[k])
+            ic.go()
+            reply = ic.output.pop()
 
             if reply == 0:
                 continue
@@ -68,7 +67,7 @@ def create_map(data):
             m[pos][nxt_pos] = 1
             m[nxt_pos][pos] = 1
 
-            bfs.append((nxt_pos, nic))
+            bfs.append((nxt_pos, ic.snapshot()))
 
     return seen, m, oxygen
 
@@ -3,75 +3,64 @@
 """
 
 from common.aoc import aoc_part, file_to_string, get_filename
-from common.general import window_over
-from common.intcode import IntCode
+from common.intcode import IntCode, IntCodeNetwork
 
+NAT = 255
 
-def boot_up(data, nbr=50):
-    """Boot up 50 intcode units"""
+
+def boot_up(data, router, on_idle=None, nbr=50):
+    """Boot up 50 intcode units on a network"""
     ics = []
     for i in range(nbr):
         ic = IntCode(data)
+        ic.input = [i]
         ics.append(ic)
-        ic.input = [i, -1]
-        ic.go()
-    return ics
+    return IntCodeNetwork(
+        ics, packet_size=3, router=router, on_idle=on_idle, empty_input=-1
+    )
 
 
 @aoc_part
 def solve_part_a(data) -> int:
     """Solve part A"""
-    ics = boot_up(data)
-    while True:
-        for ic in ics:
-            for m, x, y in window_over(ic.output, 3, 3):
-                if m == 255:
-                    return y
-                to_ic = ics[m]
-                to_ic.input.extend([x, y])
-            ic.output.clear()
-
-        for ic in ics:
-            if not ic.input:
-                ic.input = [-1]
-            ic.go()
+
+    def router(network, _, packet):
+        m, x, y = packet
+        if m == NAT:
+            network.stop(y)
+            return
+        network.send(m, [x, y])
+
+    return boot_up(data, router).run()
 
 
 @aoc_part
 def solve_part_b(data) -> int:
     """Solve part B"""
-    ics = boot_up(data)
-    ic0 = ics[0]
+
+    def router(network, _, packet):
+        nonlocal nat_packet
+        m, x, y = packet
+        if m == NAT:
+            nat_packet = [x, y]
+            return
+        network.send(m, [x, y])
+
+    def on_idle(network):
+        nonlocal last_y
+        if not nat_packet:
+            print("What, no packet!")
+            return False
+        if nat_packet[1] == last_y:
+            network.stop(last_y)
+            return False
+        last_y = nat_packet[1]
+        network.send(0, nat_packet)
+        return True
+
     nat_packet = []
     last_y = None
-    while True:
-
-        idle = True
-        for ic in ics:
-            for m, x, y in window_over(ic.output, 3, 3):
-                idle = False
-                if m == 255:
-                    nat_packet = [x, y]
-                    continue
-                to_ic = ics[m]
-                to_ic.input.extend([x, y])
-            ic.output.clear()
-
-        for ic in ics:
-            if ic.input:
-                idle = False
-            else:
-                ic.input = [-1]
-            ic.go()
-
-        if idle:
-            if not nat_packet:
-                print("What, no packet!")
-                return None
-            if nat_packet[1] == last_y:
-                return last_y
-            last_y = nat_packet[1]
-            ic0.input.extend(nat_packet)
+    return boot_up(data, router, on_idle).run()
 
 
 MY_RAW_DATA = file_to_string(get_filename(__file__, "my"))
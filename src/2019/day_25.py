@@ -3,7 +3,6 @@
 """
 
 from collections import defaultdict, deque
-from copy import deepcopy
 from itertools import pairwise
 from common.aoc import aoc_part, file_to_string, get_filename
 from common.general import powerset_swap, tok
@@ -74,7 +73,7 @@ def auto_explore(data):
             all_items[room].add(itm)
 
         for door in doors:
-            nic = deepcopy(ic)
+            nic = ic.fork()
             out = parse_output(nic.go_ascii([door]))
             new_room, *_ = out
             bfs.append((nic, out))
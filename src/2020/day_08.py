@@ -5,6 +5,7 @@
 from collections import namedtuple
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.general import tok
+from common.regvm import HALT, RegisterVM
 
 Instruction = namedtuple("Instruction", ("op", "v"))
 
@@ -19,61 +20,52 @@ def parse_data(raw_data):
     return data
 
 
-def run_the_data(data):
-    """Return the acc and True if halted naturally"""
-    seen = set()
-    idx = 0
-    acc = 0
-    naturally = False
-    while True:
-        if idx in seen:
-            break
-        try:
-            ins: Instruction = data[idx]
-        except IndexError:
-            return 0, False
-
-        seen.add(idx)
-        if ins.op == "acc":
-            acc += ins.v
-            idx += 1
+def run_the_vm(vm: RegisterVM):
+    """Return the acc and True if halted naturally
+    Jumps don't depend on acc, so without halting in len(program) steps
+    an ip must have repeated. For the acc at the first repeat every ip
+    is a breakpoint and we stop as soon as one is seen again."""
+    vm.reset()
+    n = len(vm.program)
+    if vm.run(max_steps=n + 1) == HALT:
+        return (vm["acc"], True) if vm.ip == n else (0, False)
 
-        if ins.op == "jmp":
-            idx += ins.v
-
-        if ins.op == "nop":
-            idx += 1
-
-        if idx == len(data):
-            naturally = True
-            break
-
-    return acc, naturally
+    vm.reset()
+    vm.breakpoints = set(range(n))
+    seen = set()
+    while vm.ip not in seen:
+        seen.add(vm.ip)
+        vm.run()
+    return vm["acc"], False
 
 
 @aoc_part
 def solve_part_a(data) -> int:
     """Solve part A"""
-    acc, _ = run_the_data(data)
+    acc, _ = run_the_vm(RegisterVM(data, "handheld"))
     return acc
 
 
 @aoc_part
 def solve_part_b(data) -> int:
-    """Solve part B"""
+    """Solve part B
+    Swap each instruction in place, recompiling just that one"""
+    vm = RegisterVM(data, "handheld")
     for step, ins in enumerate(data):
         ins: Instruction
         if ins.op == "acc":
             continue
 
-        data_copy = data.copy()
         if ins.op == "nop":
-            data_copy[step] = Instruction("jmp", ins.v)
+            vm.program[step] = Instruction("jmp", ins.v)
         else:
-            data_copy[step] = Instruction("nop", ins.v)
-        acc, halted = run_the_data(data_copy)
-        if halted:
-            return acc
+            vm.program[step] = Instruction("nop", ins.v)
+        vm.invalidate(step)
+        vm.reset()
+        if vm.run(max_steps=len(data) + 1) == HALT and vm.ip == len(data):
+            return vm["acc"]
+        vm.program[step] = ins
+        vm.invalidate(step)
 
     return None
 
@@ -4,12 +4,9 @@
 
 from bisect import bisect_left
 from collections import Counter, defaultdict
-from itertools import pairwise
-import math
 from common.aoc import file_to_list, aoc_part, get_filename
-from common.blocks import BlockResolver
+from common.blocks import Block, BlockMap, BlockResolver
 from common.general import tok
-from blocksets import Block
 
 
 def parse_data(raw_data):
@@ -69,67 +66,6 @@ def parse_data(raw_data):
 #     return len(all_points)
 
 
-def combine_blocks(a: list, b: list) -> list:
-    """A block is a list of dimension pairs (Bx,B'x), (By,B'y), (Bz,B'z)
-    where B and B' are the opposite corners. Each pair is like a side of a block.
-    The return is a set of blocks which represent the resulting possible workspace
-    The client of this function can then determine the relevance of each
-    within its own context.
-    """
-    result = []
-    grid_markers = [sorted(set(list(sides[0]) + list(sides[1]))) for sides in zip(a, b)]
-    dimensions = len(grid_markers)
-
-    def iterate_dimension(other_sides: list):
-        cur_depth = len(other_sides)
-        markers = grid_markers[cur_depth]
-        for side in pairwise(markers):
-            new_list_of_sides = other_sides + [side]
-            if cur_depth < dimensions - 1:
-                iterate_dimension(new_list_of_sides)
-                continue
-            result.append(tuple(new_list_of_sides))
-
-    iterate_dimension([])
-
-    return result
-
-
-def intersection_block(a: list, b: list) -> list:
-    """Intersection: of the workspace which new sub blocks are in a and b
-    Should be 1 or 0 in theory?"""
-    result = []
-    for c in combine_blocks(a, b):
-        c_inside_a = all(
-            a_side[0] <= c_side[0] and c_side[1] <= a_side[1]
-            for a_side, c_side in zip(a, c)
-        )
-        c_inside_b = all(
-            b_side[0] <= c_side[0] and c_side[1] <= b_side[1]
-            for b_side, c_side in zip(b, c)
-        )
-        if c_inside_a and c_inside_b:
-            result.append(c)
-    return result
-
-
-def diff_blocks(a: list, b: list) -> list:
-    """Difference a-b: of the workspace which new sub blocks are in a but not b"""
-    result = []
-    for c in combine_blocks(a, b):
-        c_inside_a = all(
-            a_side[0] <= c_side[0] and c_side[1] <= a_side[1]
-            for a_side, c_side in zip(a, c)
-        )
-        c_inside_b = all(
-            b_side[0] <= c_side[0] and c_side[1] <= b_side[1]
-            for b_side, c_side in zip(b, c)
-        )
-        if c_inside_a and not c_inside_b:
-            result.append(c)
-    return result
-
-
 def get_block(box, trim=0):
     """Prepare the box to make a block
     This means adding 1 to the upper ordinate to work with our
@@ -149,48 +85,16 @@ def get_block(box, trim=0):
 
 
 def solve(data, trim=0) -> int:
-    """Solve: Processing a block means:
-    Check for overlapping existing blocks
-    For each one with an intersection remove it and replace with the difference.
-    This will have the effect of re-constructing a new granular workspace
-    for the existing block whilst leaving a gap for the new addition."""
-
-    # Find the first valid "On" block as initial offs can be ignored
-    start_with = 0
-    for start_with, (inc, box) in enumerate(data):
-        block = get_block(box, trim=trim)
-        if block and inc:
-            break
-
-    # empty space
-    current_universe = set()
-
-    for inc, box in data[start_with:]:
+    """Solve: each step sets its block on or off in a map of disjoint
+    blocks, which splits just the blocks it overlaps and keeps the volume
+    that is on as it goes"""
+    bm = BlockMap()
+    for inc, box in data:
         block = get_block(box, trim=trim)
         if not block:
             continue
-
-        for existing_block in list(current_universe):
-            if intersection_block(existing_block, block):
-                # always diff not a union for On
-                # we want to put back the existing block
-                # in its new sub-block form but with the new block missing
-                replacement_blocks = set(diff_blocks(existing_block, block))
-                current_universe.remove(existing_block)
-                current_universe.update(replacement_blocks)
-                # we only need to fill the space for the addition
-                # if this is an "On" block
-
-        if inc:
-            current_universe.add(block)
-
-    total = 0
-    for block in current_universe:
-        lengths = [(side[1] - side[0]) for side in block]
-        vol = math.prod(lengths)
-        total += vol
-
-    return total
+        bm.set(tuple(zip(*block)), inc)
+    return bm.volume
 
 
 @aoc_part
@@ -385,7 +289,7 @@ solve_part_a(MY_DATA)
 
 # using solve
 solve_part_b(EX_DATA)
-solve_part_b(MY_DATA)  # > 1 min
+solve_part_b(MY_DATA)  # 0.3s
 
 # using Block_Resolver is slower
 # due to the amount of blocks
@@ -3,8 +3,10 @@
 """
 
 from collections import defaultdict, namedtuple
+from functools import lru_cache
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.general import tok
+from common.regvm import RegisterVM
 
 VG = None  #  the SN validity graph
 
@@ -33,54 +35,26 @@ def parse_data(raw_data):
     return data
 
 
+@lru_cache(maxsize=None)
+def alu_vm(instructions: tuple) -> RegisterVM:
+    """One compiled VM for each phase"""
+    return RegisterVM(instructions, "alu")
+
+
 def alu(instructions: list, inputs, reg=None) -> dict:
     """Return the registers"""
-    if reg is None:
-        reg = defaultdict(int)
-    else:
-        reg = reg.copy()
-    input_value = iter(inputs)
-    for ins in instructions:
-        ins: Instruction
-        if ins.op == "inp":
-            # print(reg)
-            v = next(input_value)
-            v = int(v)
-            if not 1 <= v <= 9:
-                raise ValueError(f"Input too big {v}")
-            reg[ins.a] = v
-            continue
-
-        b = ins.b
-        if isinstance(b, str):
-            b = reg[b]
-
-        if ins.op == "add":
-            reg[ins.a] += b
-            continue
-
-        if ins.op == "mul":
-            reg[ins.a] *= b
-            continue
-
-        if ins.op == "div":
-            if b == 0:
-                raise ValueError("ALU: div 0")
-            reg[ins.a] = int(reg[ins.a] / b)
-            continue
-
-        if ins.op == "mod":
-            if b == 0:
-                raise ValueError("ALU: mod 0")
-            if b < 0:
-                raise ValueError(f"ALU: mod -ve, {b}")
-            reg[ins.a] %= b
-            continue
-
-        if ins.op == "eql":
-            reg[ins.a] = 1 if reg[ins.a] == b else 0
-
-    return reg
+    vm = alu_vm(tuple(instructions))
+    vm.reset()
+    if reg is not None:
+        for k, v in reg.items():
+            vm[k] = v
+    for v in inputs:
+        v = int(v)
+        if not 1 <= v <= 9:
+            raise ValueError(f"Input too big {v}")
+        vm.input.append(v)
+    vm.run()
+    return vm.registers()
 
 
 def max_sn(dg, size=14, z=0):
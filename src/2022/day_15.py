@@ -2,10 +2,11 @@
 --- Day 15: Beacon Exclusion Zone ---
 """
 
-from itertools import pairwise, product
+from itertools import product
 import re
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.grid_2d import manhattan
+from common.intervals import IntervalSet
 
 
 def parse_data(raw_data):
@@ -42,17 +43,7 @@ def solve_part_a(data, y=10) -> int:
             b = sensor[0] + width + 1
             regions.append((a, b))
 
-    # build a sorted list of markers for where regions start/end
-    markers = [r[0] for r in regions]
-    markers.extend([r[1] for r in regions])
-    markers = sorted(set(markers))
-
-    coverage = 0
-    for a, b in pairwise(markers):
-        for ra, rb in regions:
-            if ra <= a < rb:
-                coverage += b - a
-                break
+    coverage = IntervalSet(regions).size()
 
     return coverage - len(beacons_on_row)
 
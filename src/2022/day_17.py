@@ -4,6 +4,7 @@
 
 from operator import add
 from common.aoc import file_to_string, aoc_part, get_filename
+from common.cycles import find_cycle
 
 rock_types = (
     ((0, 2), (0, 3), (0, 4), (0, 5)),
@@ -96,36 +97,39 @@ def solve_part_a(data) -> int:
 
 @aoc_part
 def solve_part_b(data) -> int:
-    """Solve part B"""
+    """Solve part B
+    Drop a round of each rock type at a time until the state (jet pointer,
+    cave layout) repeats, the height then grows by the same amount each
+    time round the cycle"""
     n_rocks = 1000000000000
     m = len(rock_types)
-    cave = set()
-    states = {}
-    jc = 0
-    rock_count = 0
-    # look for a repeated state (jet pointer, cave layout)
-    # to get a rock modulus and height difference
-    while True:
+
+    def drop_round(state):
+        jc, cave = state
         jc = run_for_n_rocks(m, data, cave=cave, jet_pointer=jc)
-        rock_count += m
-        height = max([p[0] for p in cave], default=0)
+        return jc, cave
 
-        fc = frozenset((p[0] - height, p[1]) for p in cave)
-        if (jc, fc) in states:
-            rock_modulus = rock_count - states[(jc, fc)][0]
-            height_diff = height - states[(jc, fc)][1]
-            break
-        states[(jc, fc)] = rock_count, height
+    def get_height(state):
+        return max([p[0] for p in state[1]], default=0)
 
-    rounds = n_rocks // rock_modulus
-    remainder = n_rocks % rock_modulus
+    def get_key(state):
+        jc, cave = state
+        height = get_height(state)
+        return jc, frozenset((p[0] - height, p[1]) for p in cave)
 
-    # find the extra height from the remainder by running once more
-    cave = set()
-    run_for_n_rocks(remainder, data, cave=cave)
-    extra_height = max([p[0] for p in cave], default=0)
+    loop = find_cycle(drop_round, (0, set()), key=get_key, value=get_height)
+    rounds, remainder = divmod(n_rocks, m)
+    height = loop.extrapolate(rounds)
 
-    return rounds * height_diff + extra_height
+    # find the extra height from the remainder by running once more
+    if remainder:
+        jc, cave = 0, set()
+        for _ in range(loop.index(rounds)):
+            jc, cave = drop_round((jc, cave))
+        run_for_n_rocks(remainder, data, cave=cave, jet_pointer=jc)
+        height += get_height((jc, cave)) - loop[rounds]
+
+    return height
 
 
 EX_RAW_DATA = file_to_string(get_filename(__file__, "ex"))
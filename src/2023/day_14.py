@@ -4,6 +4,7 @@
 
 from bisect import bisect
 from common.aoc import file_to_list, aoc_part, get_filename
+from common.cycles import find_cycle
 from common.grid_2d import grid_lists_to_dict
 
 
@@ -81,28 +82,14 @@ def cycle(size, dish):
 def solve_part_b(data) -> int:
     """Solve part B"""
     size, dish = data
-    states = {}
-    loads = []
-    cycles = 0
-    repeat_from = None
-    while True:
-        # cycle 0 is the start state
-        load = sum((size - p[0]) for p, t in dish.items() if t == "O")
-        loads.append(load)
-        state = frozenset(p for p, t in dish.items() if t == "O")
-        if state in states:
-            repeat_from = states[state]
-            repeat_to = cycles
-            break
-        states[state] = cycles
-
-        dish = cycle(size, dish)
-        cycles += 1
-
-    m = repeat_to - repeat_from
-    print(f"Repeats between cycle {repeat_from} and {repeat_to}")
-    gc = ((1000000000 - repeat_from) % m) + repeat_from
-    return loads[gc]
+    loop = find_cycle(
+        lambda d: cycle(size, d),
+        dish,
+        key=lambda d: frozenset(p for p, t in d.items() if t == "O"),
+        value=lambda d: sum((size - p[0]) for p, t in d.items() if t == "O"),
+    )
+    print(f"Repeats between cycle {loop.start} and {loop.start + loop.length}")
+    return loop[1000000000]
 
 
 EX_RAW_DATA = file_to_list(get_filename(__file__, "ex"))
@@ -2,46 +2,43 @@
 --- Day 6: Guard Gallivant ---
 """
 
-from operator import add
-
 from common.aoc import (
     file_to_list,
     aoc_part,
     get_filename,
 )
+from common.grid_2d import Grid2D
 
 
 def parse_data(raw_data):
-    """Parse the input"""
-    grid = {}
-    for ri, row in enumerate(raw_data):
-        for ci, ch in enumerate(row):
-            p = (ri, ci)
-            if ch == "^":
-                start = p
-                grid[p] = "."
-                continue
-            grid[p] = ch
-
+    """Parse the input, framed by a border so walking off is seeing a space"""
+    grid = Grid2D.from_lines(raw_data, border=" ")
+    start = grid.find("^")
+    grid[start] = "."
     return start, grid
 
 
-directions = [(-1, 0), (0, 1), (1, 0), (0, -1)]
+def get_directions(grid) -> list:
+    """Offsets in the order of turning right, starting north"""
+    return [grid.offsets[d] for d in "^>v<"]
 
 
-def get_visited(start: tuple, grid: dict) -> set:
+def get_visited(start: int, grid: Grid2D) -> set:
     """Return the visited positions, including the start"""
+    directions = get_directions(grid)
+    cells = grid.cells
+    wall = ord("#")
+    edge = ord(" ")
     d = 0
     p = start
     visited = {start}
     while True:
-        dv = directions[d]
-        np = tuple(map(add, p, dv))
+        np = p + directions[d]
 
-        if np not in grid:
+        if cells[np] == edge:
             break
 
-        if grid[np] == "#":
+        if cells[np] == wall:
             d += 1
             d %= 4
         else:
@@ -61,25 +58,28 @@ def solve_part_a(data) -> int:
 
 def is_loop(start, grid) -> int:
     """Return True if we loop"""
+    directions = get_directions(grid)
+    cells = grid.cells
+    wall = ord("#")
+    edge = ord(" ")
     d = 0
     p = start
-    pos = {(start, d)}
+    pos = {start * 4}
     while True:
-        dv = directions[d]
-        np = tuple(map(add, p, dv))
+        np = p + directions[d]
 
-        if (np, d) in pos:
+        if np * 4 + d in pos:
             return True
 
-        if np not in grid:
+        if cells[np] == edge:
             return False
 
-        if grid[np] == "#":
+        if cells[np] == wall:
             d += 1
             d %= 4
         else:
             p = np
-            pos.add((p, d))
+            pos.add(p * 4 + d)
 
 
 @aoc_part
@@ -2,7 +2,6 @@
 --- Day 12: Garden Groups ---
 """
 
-from collections import deque
 from operator import add
 
 from common.aoc import (
@@ -10,8 +9,8 @@ from common.aoc import (
     aoc_part,
     get_filename,
 )
-from common.graph import tarjan
 from common.grid_2d import directions
+from common.union_find import DisjointSet
 
 
 def parse_data(raw_data):
@@ -25,42 +24,18 @@ def parse_data(raw_data):
     return sz, grid
 
 
-def flood_fill(grid, p) -> set:
-    """Return a set of points matching the value of p in the grid"""
-    ch = grid[p]
-    bfs = deque()
-    seen = set()
-    bfs.append(p)
-    while bfs:
-        p = bfs.popleft()
-        if p in seen:
-            continue
-        seen.add(p)
-
-        for dv in directions.values():
-            np = tuple(map(add, p, dv))
-            if np not in grid:
-                continue
-            if grid[np] != ch:
-                continue
-            bfs.append(np)
-
-    return seen
-
-
 def get_plots(sz, grid) -> list:
     """Return a list of plots, each plot is a set of points"""
-    points_assessed = set()
-    plots = []
+    ds = DisjointSet()
     for r in range(sz):
         for c in range(sz):
             p = (r, c)
-            if p in points_assessed:
-                continue
-            plot = flood_fill(grid, p)
-            plots.append(plot)
-            points_assessed |= plot
-    return plots
+            ds.add(p)
+            # join up with the same plant right and below
+            for np in ((r, c + 1), (r + 1, c)):
+                if grid.get(np) == grid[p]:
+                    ds.union(p, np)
+    return [set(plot) for plot in ds.groups()]
 
 
 def get_perimeter_points(plot) -> set:
@@ -99,30 +74,17 @@ def get_sides(plot) -> int:
     #   the row/col is the same
     #   the col/row differs by 1
 
-    # union find or subgraphs to create the sides (groups of perimeter units)
-
-    # Using a graph where a node is a unit of perimeter
-    # and an edge means they are on the same side and adjacent.
-    # Tarjan's will give us the subgraphs (i.e. a side)
-    # Number of sides = Number of subgraphs
-
+    # union find to create the sides (groups of perimeter units)
+    # joining each unit to the next along the row or column
     pd_set = get_perimeter_points(plot)
-    gph = {}
+    ds = DisjointSet()
     for u in pd_set:
-        gph[u] = {}
-        for v in pd_set:
-            if u == v:
-                continue
-            # adjacent on a row
-            if u[0][0] == v[0][0] and abs(u[0][1] - v[0][1]) == 1 and u[1] == v[1]:
-                gph[u][v] = 1
-                continue
-            # adjacent on a column
-            if u[0][1] == v[0][1] and abs(u[0][0] - v[0][0]) == 1 and u[1] == v[1]:
-                gph[u][v] = 1
-                continue
-    sgs = tarjan(gph)
-    return len(sgs)
+        ds.add(u)
+        (r, c), d = u
+        for v in (((r, c + 1), d), ((r + 1, c), d)):
+            if v in pd_set:
+                ds.union(u, v)
+    return ds.count
 
 
 @aoc_part
@@ -5,6 +5,7 @@
 from collections import deque
 from common.aoc import file_to_list, aoc_part, get_filename
 from common.general import tok
+from common.regvm import RegisterVM, chronospatial_program
 
 
 def parse_data(raw_data):
@@ -154,16 +155,22 @@ class IntCode:
         self.go()
 
 
+def run_for_a_as(vm: RegisterVM, a) -> list:
+    """Return the output for a starting value of A"""
+    vm.reset()
+    vm["A"] = a
+    vm.run()
+    return vm.output
+
+
 @aoc_part
 def solve_part_a(data) -> int:
     """Solve part A"""
     reg, pgm = data
-    ic = IntCode(pgm)
-    ic._registers["A"] = reg[0]
-    ic._registers["B"] = reg[1]
-    ic._registers["C"] = reg[2]
-    ic.go()
-    return ic.get_output()
+    vm = RegisterVM(chronospatial_program(pgm), "chronospatial")
+    vm["A"], vm["B"], vm["C"] = reg
+    vm.run()
+    return ",".join(str(x) for x in vm.output)
 
 
 def analysis(data):
@@ -272,7 +279,7 @@ def analysis(data):
 def solve_part_b(data) -> int:
     """Solve part B"""
     reg, pgm = data
-    ic = IntCode(pgm)
+    vm = RegisterVM(chronospatial_program(pgm), "chronospatial")
 
     answers = []
     bfs = deque()
@@ -287,8 +294,7 @@ def solve_part_b(data) -> int:
             continue
         for v in range(8):
             a = x * 8 + v
-            ic.run_for_a_as(a)
-            if ic.output == pgm[-sz:]:
+            if run_for_a_as(vm, a) == pgm[-sz:]:
                 new_state = a, sz + 1
                 bfs.append(new_state)
 
@@ -1,13 +1,21 @@
 """For handling all AoC kinda stuff"""
 
+from copy import deepcopy
 from functools import wraps
 from os import environ, path
 import sys
-from time import time
+from time import perf_counter, process_time
+import tracemalloc
 
 
 ENCODING = "utf-8"
 
+# When set to a list (i.e. by the runner) every solved part is logged to it
+part_log = None
+
+# Times each part is run when benchmarking, the best time is reported
+repeat_count = int(environ.get("AOC_REPEAT", "1"))
+
 
 def get_filename(fn, input_type):
     """The get filepath
@@ -68,15 +76,33 @@ def file_to_string(filename: str):
     return content
 
 
+def day_of_module(module_name):
+    """Return the (year, day) of a day_nn.py module or (None, None)"""
+    module = sys.modules.get(module_name)
+    fn = getattr(module, "__file__", None)
+    if fn is None:
+        return None, None
+    try:
+        day = int(str(path.basename(fn))[4:6])
+        year = int(path.basename(path.dirname(fn)))
+    except ValueError:
+        return None, None
+    return year, day
+
+
 def aoc_part(func):
     """Decorator which will log the runtime etc."""
 
+    calls = 0
+
     @wraps(func)
     def aoc_part_wrapper(*args, **kwargs):
+        nonlocal calls
+        calls += 1
         part = str(func.__name__)[-1].upper()
         print()
-        # module_name = (sys.modules[func.__module__]).__file__
         print(f"Solving part {part}")
+        input_size = None
         if len(args) > 0:
             try:
                 input_size = len(args[0])
@@ -84,15 +110,61 @@ def aoc_part(func):
             except TypeError:
                 pass
 
-        start_time = time()
-        answer = func(*args, **kwargs)
-        end_time = time()
-
-        elapsed_time = end_time - start_time
-        print(f"Duration: {elapsed_time:.3f} s")
+        repeat = max(1, repeat_count)
+        tracing = tracemalloc.is_tracing()
+        elapsed_time = cpu_time = peak_memory = None
+        for r in range(repeat):
+            # solvers may well consume their input, so repeats get a copy
+            # (made before measuring, the copy is not part of the part's cost)
+            r_args, r_kwargs = args, kwargs
+            if r < repeat - 1:
+                r_args, r_kwargs = deepcopy((args, kwargs))
+            if tracing:
+                # peak over what is already held, i.e. earlier parts and data
+                tracemalloc.reset_peak()
+                start_memory = tracemalloc.get_traced_memory()[0]
+            start_cpu = process_time()
+            start_time = perf_counter()
+            answer = func(*r_args, **r_kwargs)
+            wall = perf_counter() - start_time
+            cpu = process_time() - start_cpu
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1] - start_memory
+                if peak_memory is None or peak > peak_memory:
+                    peak_memory = peak
+            if elapsed_time is None or wall < elapsed_time:
+                elapsed_time = wall
+            if cpu_time is None or cpu < cpu_time:
+                cpu_time = cpu
+
+        if repeat > 1:
+            print(f"Duration: {elapsed_time:.3f} s (best of {repeat})")
+        else:
+            print(f"Duration: {elapsed_time:.3f} s")
 
         print(f"Answer: {answer}")
 
+        year, day = day_of_module(func.__module__)
+        record = {
+            "year": year,
+            "day": day,
+            "part": part,
+            "call": calls,
+            "input_size": input_size,
+            "answer": str(answer),
+            "repeat": repeat,
+            "wall_time": elapsed_time,
+            "cpu_time": cpu_time,
+            "peak_memory": peak_memory,
+        }
+        if part_log is not None:
+            part_log.append(record)
+        elif environ.get("AOC_HISTORY_PATH"):
+            # imported here as benchmark depends on this module
+            from common.benchmark import append_history
+
+            append_history(environ["AOC_HISTORY_PATH"], [record])
+
         return answer
 
     return aoc_part_wrapper
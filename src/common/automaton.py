@@ -0,0 +1,398 @@
+"""Cellular automata on bitboards
+
+The state is a single python int, one bit per cell of an N-D box padded with
+a guard cell at each end of every axis. Neighbours are the board shifted by
+the flat offset of each neighbour, the counts are summed bit-sliced (a binary
+counter over the shifted boards, one int per bit of the count) so every step
+is a handful of whole board operations rather than a loop over the cells.
+
+Rules
+    life-like:  birth and survive collections of neighbour counts
+                (Conway is birth=(3,), survive=(2,3))
+    table:      a lookup on the 3^N window in reading order, the first cell
+                being the most significant bit (2021 day 20), evaluated as a
+                mux tree over the shifted boards
+
+Neighbourhoods (life-like only)
+    MOORE:          all 3^N - 1 neighbours
+    VON_NEUMANN:    the 2N orthogonal neighbours
+
+Borders
+    FIXED:      outside is always the background (dead unless given)
+    TOROIDAL:   the edges wrap
+    INFINITE:   the box grows by one each step and the background follows
+                the rule, so an "infinity flips" table (table[0] == 1) works
+
+Points are coordinate tuples, (r,c) for 2D grids. A mask limits the cells
+that can be alive (e.g. seats) and stuck cells are always alive.
+"""
+
+from itertools import product
+from math import prod
+
+MOORE = "moore"
+VON_NEUMANN = "von_neumann"
+
+FIXED = "fixed"
+TOROIDAL = "toroidal"
+INFINITE = "infinite"
+
+
+def _repeat(pattern, times, stride) -> int:
+    """pattern (narrower than stride) repeated times every stride bits"""
+    if times <= 0:
+        return 0
+    return pattern * (((1 << times * stride) - 1) // ((1 << stride) - 1))
+
+
+class Automaton:  # pylint: disable=R0902
+    """N-D cellular automaton on a python int bitboard"""
+
+    def __init__(
+        self,
+        shape,
+        low=None,
+        birth=(3,),
+        survive=(2, 3),
+        table=None,
+        neighbourhood=MOORE,
+        border=FIXED,
+        background=0,
+        mask=None,
+        stuck=None,
+    ):
+        self.dims = len(shape)
+        self.birth = frozenset(birth)
+        self.survive = frozenset(survive)
+        self.table = None
+        if table is not None:
+            self.table = [1 if t else 0 for t in table]
+            if len(self.table) != 2 ** (3**self.dims):
+                raise ValueError(f"table must have 2^(3^{self.dims}) entries")
+        if neighbourhood not in (MOORE, VON_NEUMANN):
+            raise ValueError(f"Unknown neighbourhood {neighbourhood}")
+        self.neighbourhood = neighbourhood
+        if border not in (FIXED, TOROIDAL, INFINITE):
+            raise ValueError(f"Unknown border {border}")
+        self.border = border
+        if border == INFINITE and (mask is not None or stuck is not None):
+            raise ValueError("mask and stuck need a fixed size")
+        if border == TOROIDAL and background:
+            raise ValueError("a toroidal border has no background")
+        self.background = background
+        self.low = tuple(low) if low is not None else (0,) * self.dims
+        self.board = 0
+        self._layout(tuple(shape))
+        self.mask = None if mask is None else self.points_to_bits(mask)
+        self.stuck = None if stuck is None else self.points_to_bits(stuck)
+
+    @classmethod
+    def from_lines(cls, lines, on="#", **kwargs):
+        """2D automaton from a list of strings"""
+        ca = cls((len(lines), len(lines[0])), **kwargs)
+        ca.set_points(
+            (r, c)
+            for r, line in enumerate(lines)
+            for c, ch in enumerate(line)
+            if ch in on
+        )
+        return ca
+
+    def _layout(self, shape):
+        """Strides and masks for a box of this shape"""
+        self.shape = shape
+        padded = [s + 2 for s in shape]
+        strides = [1] * self.dims
+        for a in range(self.dims - 2, -1, -1):
+            strides[a] = strides[a + 1] * padded[a + 1]
+        self.padded = padded
+        self.strides = strides
+        self.size = prod(padded)
+        self.full = (1 << self.size) - 1
+        self.interior = self._box_mask(1, shape)
+
+        deltas = [d for d in product((-1, 0, 1), repeat=self.dims) if any(d)]
+        if self.neighbourhood == VON_NEUMANN:
+            deltas = [d for d in deltas if sum(map(abs, d)) == 1]
+        self.offsets = [self._offset(d) for d in deltas]
+        self.window = [self._offset(d) for d in product((-1, 0, 1), repeat=self.dims)]
+
+    def _offset(self, delta) -> int:
+        return sum(d * s for d, s in zip(delta, self.strides))
+
+    def _box_mask(self, lo, sizes) -> int:
+        """Mask of the cells with every coordinate a in [lo, lo + sizes[a])
+        (coordinates here include the guard cells)"""
+        m = (1 << sizes[-1]) - 1
+        m <<= lo
+        for a in range(self.dims - 2, -1, -1):
+            m = _repeat(m, sizes[a], self.strides[a]) << lo * self.strides[a]
+        return m
+
+    def _slab(self, a, k) -> int:
+        """Mask of the cells with coordinate k on axis a"""
+        st = self.strides[a]
+        outer = prod(self.padded[:a])
+        return _repeat((1 << st) - 1, outer, st * self.padded[a]) << k * st
+
+    def bit(self, p) -> int:
+        """Bit number of a point"""
+        return sum((x - lo + 1) * s for x, lo, s in zip(p, self.low, self.strides))
+
+    def point(self, i) -> tuple:
+        """Point of a bit number"""
+        p = []
+        for lo, s, n in zip(self.low, self.strides, self.padded):
+            p.append((i // s) % n - 1 + lo)
+        return tuple(p)
+
+    def points_to_bits(self, points) -> int:
+        """Bitboard of the points, points outside the box are ignored"""
+        b = 0
+        for p in points:
+            if all(lo <= x < lo + s for x, lo, s in zip(p, self.low, self.shape)):
+                b |= 1 << self.bit(p)
+        return b
+
+    def set_points(self, points):
+        """Make these the live cells"""
+        self.board = self.points_to_bits(points)
+        if self.mask is not None:
+            self.board &= self.mask
+        if self.stuck is not None:
+            self.board |= self.stuck
+
+    def points(self) -> set:
+        """The live cells (within the box)"""
+        b = self.board & self.interior
+        pts = set()
+        while b:
+            low = b & -b
+            pts.add(self.point(low.bit_length() - 1))
+            b ^= low
+        return pts
+
+    def count(self) -> int:
+        """Number of live cells in the box"""
+        return (self.board & self.interior).bit_count()
+
+    def __str__(self):
+        """2D only, # and ."""
+        rows = []
+        for r in range(self.shape[0]):
+            i = (r + 1) * self.strides[0] + 1
+            bits = (self.board >> i) & ((1 << self.shape[1]) - 1)
+            row = f"{bits:0{self.shape[1]}b}"[::-1]
+            rows.append(row.replace("0", ".").replace("1", "#"))
+        return "\n".join(rows)
+
+    #
+    # Stepping
+    #
+
+    def _grow(self):
+        """Move to a box one bigger at each end of every axis"""
+        old_board = self.board
+        old_strides = self.strides
+        old_shape = self.shape
+        self._layout(tuple(s + 2 for s in old_shape))
+        self.low = tuple(lo - 1 for lo in self.low)
+
+        # copy the last axis runs one at a time
+        run = (1 << old_shape[-1]) - 1
+        board = 0
+        for idx in product(*(range(s) for s in old_shape[:-1])):
+            i = sum((x + 1) * s for x, s in zip(idx, old_strides)) + 1
+            j = sum((x + 2) * s for x, s in zip(idx, self.strides)) + 2
+            board |= ((old_board >> i) & run) << j
+        self.board = board
+        if self.background:
+            self.board |= self.full ^ self._box_mask(2, old_shape)
+
+    def _fill_guard(self):
+        """Set the guard cells ready for a step"""
+        if self.border == TOROIDAL:
+            board = self.board & self.interior
+            for a in range(self.dims):
+                st = self.strides[a]
+                s = self.shape[a]
+                board |= (board & self._slab(a, s)) >> s * st
+                board |= (board & self._slab(a, 1)) << s * st
+            self.board = board
+            return
+
+        self.board &= self.interior
+        if self.background:
+            self.board |= self.full ^ self.interior
+
+    def _counts(self) -> list:
+        """Bit-sliced neighbour counts, the planes of a binary counter"""
+        board = self.board
+        planes = []
+        for o in self.offsets:
+            carry = board >> o if o > 0 else board << -o
+            for k, plane in enumerate(planes):
+                if not carry:
+                    break
+                planes[k] = plane ^ carry
+                carry &= plane
+            else:
+                if carry:
+                    planes.append(carry)
+        return planes
+
+    def _equals(self, planes, n) -> int:
+        """Cells where the count is n"""
+        if n >> len(planes):
+            return 0
+        full = self.full
+        eq = full
+        for k, plane in enumerate(planes):
+            eq &= plane if n >> k & 1 else full ^ plane
+        return eq
+
+    def _life_step(self) -> int:
+        planes = self._counts()
+        born = 0
+        for n in self.birth:
+            born |= self._equals(planes, n)
+        keep = 0
+        for n in self.survive:
+            keep |= self._equals(planes, n)
+        return born ^ ((born ^ keep) & self.board)
+
+    def _table_step(self) -> int:
+        board = self.board
+        inputs = [board >> o if o > 0 else board << -o for o in self.window]
+        full = self.full
+        memo = {}
+
+        def mux(j, lo, hi):
+            # the entries from lo to hi are decided by inputs j onwards
+            if hi - lo == 1:
+                return full if self.table[lo] else 0
+            key = tuple(self.table[lo:hi])
+            if key in memo:
+                return memo[key]
+            mid = (lo + hi) // 2
+            off = mux(j + 1, lo, mid)
+            on = mux(j + 1, mid, hi)
+            if off == on:
+                v = off
+            else:
+                v = off ^ ((off ^ on) & inputs[j])
+            memo[key] = v
+            return v
+
+        return mux(0, 0, len(self.table))
+
+    def _next_background(self) -> int:
+        bg = self.background
+        if self.table is not None:
+            return self.table[-1] if bg else self.table[0]
+        if bg:
+            return 1 if len(self.offsets) in self.survive else 0
+        return 1 if 0 in self.birth else 0
+
+    def step(self, n=1):
+        """Move on n generations"""
+        for _ in range(n):
+            if self.border == INFINITE:
+                self._grow()
+            self._fill_guard()
+            if self.table is not None:
+                board = self._table_step()
+            else:
+                board = self._life_step()
+            board &= self.interior
+            if self.mask is not None:
+                board &= self.mask
+            if self.stuck is not None:
+                board |= self.stuck
+            self.board = board
+            if self.border != TOROIDAL:
+                self.background = self._next_background()
+
+
+def test_automaton():
+    """Against a plain set based life"""
+    glider = [".#...", "..#..", "###..", ".....", "....."]
+
+    def naive(live, shape=None, torus=False, birth=(3,), survive=(2, 3), deltas=None):
+        dims = len(next(iter(live))) if live else len(shape)
+        if deltas is None:
+            deltas = [d for d in product((-1, 0, 1), repeat=dims) if any(d)]
+        counts = {}
+        for p in live:
+            for d in deltas:
+                q = tuple(x + y for x, y in zip(p, d))
+                if torus:
+                    q = tuple(x % s for x, s in zip(q, shape))
+                counts[q] = counts.get(q, 0) + 1
+        new = set()
+        for q, n in counts.items():
+            if shape and not torus and not all(0 <= x < s for x, s in zip(q, shape)):
+                continue
+            if (q in live and n in survive) or (q not in live and n in birth):
+                new.add(q)
+        return new
+
+    ca = Automaton.from_lines(glider, border=TOROIDAL)
+    live = ca.points()
+    for _ in range(25):
+        ca.step()
+        live = naive(live, (5, 5), torus=True)
+        assert ca.points() == live
+
+    ca = Automaton.from_lines(glider)
+    live = ca.points()
+    for _ in range(12):
+        ca.step()
+        live = naive(live, (5, 5))
+        assert ca.points() == live
+
+    # 2020 day 17 example in 3D and 4D
+    start = Automaton.from_lines([".#.", "..#", "###"]).points()
+    for dims, expected in ((3, 112), (4, 848)):
+        pts = {(r, c) + (0,) * (dims - 2) for r, c in start}
+        ca = Automaton((3, 3) + (1,) * (dims - 2), border=INFINITE)
+        ca.set_points(pts)
+        ca.step(6)
+        assert ca.count() == expected
+
+    # von neumann with birth on 1, 2 (2019 day 24)
+    ca = Automaton.from_lines(
+        ["....#", "#..#.", "#..##", "..#..", "#...."],
+        birth=(1, 2),
+        survive=(1,),
+        neighbourhood=VON_NEUMANN,
+    )
+    deltas = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+    live = ca.points()
+    for _ in range(4):
+        ca.step()
+        live = naive(live, (5, 5), birth=(1, 2), survive=(1,), deltas=deltas)
+        assert ca.points() == live
+
+    # a life table with infinity flipping (0 -> 1 and 511 -> 0)
+    table = []
+    for i in range(512):
+        alive = i >> 4 & 1
+        n = (i & ~16).bit_count()
+        table.append(n == 3 or (alive and n == 2))
+    life = Automaton.from_lines(glider, border=INFINITE)
+    ca = Automaton.from_lines(glider, table=table, border=INFINITE)
+    life.step(5)
+    ca.step(5)
+    assert ca.points() == life.points()
+
+    table[0] = 1
+    table[511] = 0
+    ca = Automaton.from_lines(glider, table=table, border=INFINITE)
+    ca.step()
+    assert ca.background == 1
+    ca.step()
+    assert ca.background == 0
+
+
+# test_automaton()
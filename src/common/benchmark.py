@@ -0,0 +1,171 @@
+"""Benchmark history and regression checks
+
+Timings of solved parts are appended to a local history file (JSON lines),
+every record tagged with a run label. Records are keyed on year, day, part and
+call (the order the day module invoked the part, i.e. 1 example, 2 my data).
+
+Recording
+    set AOC_HISTORY_PATH (and optionally AOC_RUN_LABEL, AOC_REPEAT) and
+    run a day as normal, or use the runner
+
+    python -m common.runner -r 3 --history bench.jsonl --label before
+
+Comparing (from the src folder)
+
+    python -m common.benchmark compare before after --history bench.jsonl
+    python -m common.benchmark labels --history bench.jsonl
+
+compare will list every part that got slower than the threshold and exits
+with 1 if there were any.
+"""
+
+import argparse
+from datetime import datetime
+import json
+from os import environ
+import sys
+
+from common.aoc import ENCODING
+
+
+def history_key(rec) -> tuple:
+    """The identity of a part for comparing timings"""
+    return (rec["year"], rec["day"], rec["part"], rec["call"])
+
+
+def default_label() -> str:
+    """Label for a run when not given"""
+    return environ.get("AOC_RUN_LABEL", datetime.now().strftime("%Y%m%d-%H%M%S"))
+
+
+def append_history(filename, records, label=None):
+    """Append the timing records (without errors) to the history file"""
+    if label is None:
+        label = default_label()
+    timestamp = datetime.now().isoformat(timespec="seconds")
+    with open(filename, "a", encoding=ENCODING) as f:
+        for rec in records:
+            if rec.get("error") or rec.get("wall_time") is None:
+                continue
+            entry = {"label": label, "timestamp": timestamp}
+            entry.update(rec)
+            f.write(json.dumps(entry) + "\n")
+
+
+def load_history(filename) -> list:
+    """Return all the records in the history file"""
+    history = []
+    with open(filename, encoding=ENCODING) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                history.append(json.loads(line))
+    return history
+
+
+def run_labels(history) -> list:
+    """Labels in the order they first appear"""
+    labels = {}
+    for rec in history:
+        labels.setdefault(rec["label"], rec["timestamp"])
+    return list(labels)
+
+
+def best_times(history, label, measure="wall_time") -> dict:
+    """Best time for each part for the given run label"""
+    best = {}
+    for rec in history:
+        if rec["label"] != label:
+            continue
+        key = history_key(rec)
+        t = rec[measure]
+        if key not in best or t < best[key]:
+            best[key] = t
+    return best
+
+
+def compare(
+    history,
+    baseline,
+    candidate=None,
+    threshold=0.1,
+    min_time=0.01,
+    measure="wall_time",
+) -> list:
+    """Return a list of (key, baseline time, candidate time, ratio) for every
+    part that is slower than baseline by more than the threshold (a fraction).
+    Parts faster than min_time in both runs are ignored as noise.
+    If no candidate given then the latest run label is used"""
+    if candidate is None:
+        candidate = run_labels(history)[-1]
+    base = best_times(history, baseline, measure)
+    cand = best_times(history, candidate, measure)
+    regressions = []
+    for key in sorted(base.keys() & cand.keys()):
+        b = base[key]
+        c = cand[key]
+        if max(b, c) < min_time:
+            continue
+        ratio = c / b if b else float("inf")
+        if ratio > 1 + threshold:
+            regressions.append((key, b, c, ratio))
+    return regressions
+
+
+def print_regressions(regressions):
+    """Table of regressions"""
+    for (year, day, part, call), b, c, ratio in regressions:
+        print(
+            f"{year} day {day:02d} part {part} call {call}: "
+            f"{b:8.3f} s -> {c:8.3f} s  x{ratio:.2f}"
+        )
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="AoC benchmark history")
+    parser.add_argument(
+        "--history",
+        default=environ.get("AOC_HISTORY_PATH"),
+        help="history file (default AOC_HISTORY_PATH)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("compare", help="flag parts that got slower")
+    cmd.add_argument("baseline", help="label of the baseline run")
+    cmd.add_argument("candidate", nargs="?", help="label to check (default latest)")
+    cmd.add_argument(
+        "-t", "--threshold", type=float, default=0.1, help="allowed slowdown fraction"
+    )
+    cmd.add_argument(
+        "--min-time", type=float, default=0.01, help="ignore parts faster than this"
+    )
+    cmd.add_argument("--cpu", action="store_true", help="compare CPU time not wall")
+
+    commands.add_parser("labels", help="list the run labels")
+
+    args = parser.parse_args(argv)
+    if not args.history:
+        parser.error("no history file given")
+    history = load_history(args.history)
+
+    if args.command == "labels":
+        for label in run_labels(history):
+            print(label)
+        return 0
+
+    regressions = compare(
+        history,
+        args.baseline,
+        args.candidate,
+        threshold=args.threshold,
+        min_time=args.min_time,
+        measure="cpu_time" if args.cpu else "wall_time",
+    )
+    print_regressions(regressions)
+    print(f"{len(regressions)} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
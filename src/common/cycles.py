@@ -0,0 +1,249 @@
+"""Cycle detection for long running simulations
+
+A simulation is a step function f and a start x0, so x(n+1) = f(x(n)).
+Once a state repeats the sequence loops, so x(n) for huge n is found from
+the first start + length states.
+
+brent(f, x0, key):      (start, length) in O(1) memory, f must not change
+                        its argument as two copies of the state are stepped
+find_cycle(f, x0, ..):  a Cycle, stepping once and remembering each state
+                        by its key (or just an 8 byte digest of it if compact)
+
+Cycle keeps the value of every state up to and including the first repeat
+in a list, so a lookup is just arithmetic on the index. A compact Cycle with
+no value function keeps no list and steps a copy of x0 to look one up.
+
+    cycle = find_cycle(step, start, key=to_key, value=load)
+    cycle[1000000000]               value after a billion steps
+    cycle.extrapolate(1000000000)   for values that grow by the same amount
+                                    each time round, like a tower height
+"""
+
+from copy import deepcopy
+from hashlib import blake2b
+
+
+class Cycle:
+    """The start (mu) and length (lambda) of a cycle and the values seen
+    values[i] is the value after i steps for i <= start + length, or if
+    values is None replay(i) works it out"""
+
+    def __init__(
+        self, start: int, length: int, values: list, replay: callable = None
+    ) -> None:
+        self.start = start
+        self.length = length
+        self.values = values
+        self.replay = replay
+
+    def value(self, i: int):
+        """The value after i steps, i <= start + length"""
+        if self.values is None:
+            return self.replay(i)
+        return self.values[i]
+
+    def __repr__(self) -> str:
+        return f"Cycle(start={self.start}, length={self.length})"
+
+    def index(self, n: int) -> int:
+        """The index < start + length of the state that step n is the same as"""
+        if n < self.start:
+            return n
+        return self.start + (n - self.start) % self.length
+
+    def __getitem__(self, n: int):
+        return self.value(self.index(n))
+
+    def congruence_class(self) -> tuple:
+        """(a, m) step n is the same state as step n + m for n >= a"""
+        return self.start, self.length
+
+    def extrapolate(self, n: int):
+        """The value at step n, where each trip around the cycle adds
+        the same amount to the value"""
+        if n < self.start:
+            return self.value(n)
+        q, r = divmod(n - self.start, self.length)
+        gain = self.value(self.start + self.length) - self.value(self.start)
+        return self.value(self.start + r) + q * gain
+
+
+def brent(f: callable, x0, key: callable = None) -> tuple:
+    """Brent's algorithm, return (start, length) of the cycle
+    Only ever holds 2 states, at the cost of stepping about 3 times as much"""
+    if key is None:
+
+        def key(x):
+            return x
+
+    power = length = 1
+    tortoise = x0
+    hare = f(x0)
+    tortoise_key = key(tortoise)
+    hare_key = key(hare)
+    while tortoise_key != hare_key:
+        if power == length:
+            tortoise = hare
+            tortoise_key = hare_key
+            power *= 2
+            length = 0
+        hare = f(hare)
+        hare_key = key(hare)
+        length += 1
+
+    # the hare goes one length ahead, then they walk together to the start
+    tortoise = hare = x0
+    for _ in range(length):
+        hare = f(hare)
+    start = 0
+    while key(tortoise) != key(hare):
+        tortoise = f(tortoise)
+        hare = f(hare)
+        start += 1
+
+    return start, length
+
+
+def brent_state_at(f: callable, x0, n: int, key: callable = None):
+    """Return the state after n steps, using Brent to find the cycle"""
+    start, length = brent(f, x0, key=key)
+    if n >= start:
+        n = start + (n - start) % length
+    x = x0
+    for _ in range(n):
+        x = f(x)
+    return x
+
+
+def fingerprint(k) -> bytes:
+    """8 byte blake2b digest of repr(k)"""
+    return blake2b(repr(k).encode(), digest_size=8).digest()
+
+
+def _key_at(f: callable, x0, n: int, key: callable):
+    """The key of the state after n steps from a copy of x0"""
+    x = deepcopy(x0)
+    for _ in range(n):
+        x = f(x)
+    return x if key is None else key(x)
+
+
+def find_cycle(
+    f: callable,
+    x0,
+    key: callable = None,
+    value: callable = None,
+    compact: bool = False,
+) -> Cycle:
+    """Step until a state repeats, return the Cycle
+
+    key(x) is what is compared, it must be hashable (default x)
+    value(x) is what the Cycle holds for each step (default key(x))
+    compact stores only the fingerprint of the key for each state seen rather
+    than the key, a lot less memory for big states. Equal keys need the same
+    repr for that (so tuples not sets). A copy of x0 is kept and when a
+    fingerprint turns up again it is checked by stepping the copy to the
+    earlier state, so a clash of digests costs time but is never a wrong
+    answer. Only the values are kept if value is given, otherwise nothing,
+    and looking up the Cycle steps the copy of x0 to the state wanted.
+
+    f may update the state in place and return it, as only the keys and
+    values are kept.
+    """
+    seen = {}
+    clashes = {}  # fingerprint -> more indexes, for digests that clashed
+    values = []
+    first = deepcopy(x0) if compact else None
+
+    def replay(i):
+        return _key_at(f, first, i, key)
+
+    x = x0
+    n = 0
+    while True:
+        k = x if key is None else key(x)
+        if value is not None:
+            values.append(value(x))
+        elif not compact:
+            values.append(k)
+        if not compact:
+            if k in seen:
+                start = seen[k]
+                return Cycle(start, n - start, values)
+            seen[k] = n
+        else:
+            fp = fingerprint(k)
+            if fp in seen:
+                for start in [seen[fp]] + clashes.get(fp, []):
+                    if _key_at(f, first, start, key) == k:
+                        if value is None:
+                            return Cycle(start, n - start, None, replay)
+                        return Cycle(start, n - start, values)
+                clashes.setdefault(fp, []).append(n)
+            else:
+                seen[fp] = n
+        x = f(x)
+        n += 1
+
+
+def test_cycles():
+    """Test the methods agree"""
+
+    def f(x):
+        return (x * x + 1) % 255
+
+    start, length = brent(f, 3)
+    cycle = find_cycle(f, 3)
+    assert (cycle.start, cycle.length) == (start, length)
+    assert find_cycle(f, 3, compact=True).congruence_class() == (start, length)
+
+    # hash(-1) == hash(-2), which is not the same state
+    other = find_cycle(lambda x: x - 1 if x > -9 else -1, -1, compact=True)
+    assert other.congruence_class() == (0, 9)
+
+    class Clash(int):
+        """Every one has the same repr, so the same fingerprint"""
+
+        def __repr__(self) -> str:
+            return "Clash"
+
+    other = find_cycle(lambda x: Clash((x * x + 1) % 255), Clash(3), compact=True)
+    assert other.congruence_class() == (start, length)
+
+    # in place state, the copy of x0 is not changed by stepping
+    def spin(state):
+        state[0] = (state[0] * 3) % 10
+        return state
+
+    other = find_cycle(spin, [1], key=tuple, compact=True)
+    assert other.congruence_class() == (0, 4)
+    assert other.values is None
+    assert [other[n] for n in range(6)] == [(1,), (3,), (9,), (7,), (1,), (3,)]
+
+    # compact keeps the values asked for and not the keys
+    other = find_cycle(spin, [1], key=tuple, value=lambda s: s[0] * 2, compact=True)
+    assert other.values == [2, 6, 18, 14, 2]
+
+    x = 3
+    for n in range(200):
+        assert cycle[n] == x
+        assert brent_state_at(f, 3, n) == x
+        x = f(x)
+
+    # a tower that grows 5, 5 then 2, 1, 1 over and over
+    growth = [5, 5, 2, 1, 1]
+
+    def g(state):
+        i, height = state
+        return (i + 1 if i < 4 else 2), height + growth[i]
+
+    cycle = find_cycle(g, (0, 0), key=lambda s: s[0], value=lambda s: s[1])
+    assert (cycle.start, cycle.length) == (2, 3)
+    state = (0, 0)
+    for n in range(50):
+        assert cycle.extrapolate(n) == state[1]
+        state = g(state)
+    assert cycle.extrapolate(2 + 3 * 1000) == 10 + 4 * 1000
+
+
+# test_cycles()
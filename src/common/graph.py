@@ -1,20 +1,27 @@
 """Graphing tools"""
 
+from array import array
 from collections import defaultdict, deque
 from copy import deepcopy
 from heapq import heappop, heappush
-from itertools import count
+from itertools import count, product
 from math import inf
+from random import Random
+from time import perf_counter
 
 from common.general import tok
-from common.heap import BinaryHeap
+from common.heap import BinaryHeap, IndexedHeap
 
 # Adjacency
 #   get_adjacency_matrix:   uses Dijkstra (& options)
 #   floyd_warshall:         cross-product of all nodes in a the graph
 
 # Shortest Paths
-#   Dijkstra        2 functions one for distances and one for the path too
+#   shortest_path_search:   the engine, multi-source, A* heuristic, target
+#                           predicate and predecessors for the paths
+#   Dijkstra        wrappers for distances, a path or all the paths
+#   state_search:   implicit graphs from a neighbours generator, A* or
+#                   bidirectional, with canonical state keys
 #   Bellman-Ford:   -ve & disjoint ssc, just distances
 #   TSP:            optimal_route() options for visit, start, end (& ignore node callable)
 
@@ -32,6 +39,7 @@ from common.heap import BinaryHeap
 # Subgraphs
 #   Tarjan will return subgraphs of strongly connected nodes, so for
 #   directed any SCCs > 1 in size are cycles
+#   Condensation: the SCCs as a DAG, numbered in topological order
 
 # Minimum Cuts
 #   Stoer-Wagner
@@ -58,77 +66,174 @@ def all_nodes(gph):
 #
 
 
-def dijkstra(gph, source, target, weight_attr=None):
-    """Uses Dijkstra's algorithm to find shortest path from source -> target
-    If no specific target given then return them all in a dict keyed on node"""
+def shortest_path_search(
+    sources,
+    neighbours: callable,
+    target: callable = None,
+    heuristic: callable = None,
+    all_predecessors=False,
+):
+    """The engine behind all the Dijkstra functions
+
+    sources:            iterable of start nodes (all at distance 0)
+    neighbours(v):      iterable of (u, cost) for each neighbour u of v
+    target(v):          optional predicate, stop as soon as such a node is settled
+    heuristic(v):       optional (admissible & consistent) estimate of the
+                        remaining distance, making it A*
+    all_predecessors:   keep a list of every predecessor on a shortest path
+                        rather than just the first found
+
+    Returns (dist, pred, reached)
+        dist:       final distance of every settled node
+        pred:       predecessor of every node seen (None for a source) or a
+                    list of them, use path_to() or all_paths_to() for paths
+        reached:    the settled target node or None
+    """
     push = heappush
     pop = heappop
     dist = {}  # dictionary of final distances
     seen = {}
-    # fringe is heapq with 3-tuples (distance,c,node)
+    pred = {}
+    # fringe is heapq with 3-tuples (priority,c,node)
     # use the count c to avoid comparing nodes (may not be able to)
     c = count()
     fringe = []
-    seen[source] = 0
-    push(fringe, (0, next(c), source))
+    for source in sources:
+        seen[source] = 0
+        pred[source] = [] if all_predecessors else None
+        push(fringe, (heuristic(source) if heuristic else 0, next(c), source))
+
     while fringe:
-        (d, _, v) = pop(fringe)
+        (_, _, v) = pop(fringe)
         if v in dist:
             continue  # already searched this node.
+        d = seen[v]
         dist[v] = d
-        if v == target:
-            break
-        for u, attrs in gph[v].items():
-            cost = attrs
-            if weight_attr:
-                cost = attrs[weight_attr]
-            vu_dist = dist[v] + cost
+        if target is not None and target(v):
+            return dist, pred, v
+
+        for u, w in neighbours(v):
+            vu_dist = d + w
+
+            if u in dist:
+                # only possible with zero weight edges, a source keeps no
+                # predecessors and none may close a loop
+                if (
+                    all_predecessors
+                    and vu_dist == dist[u]
+                    and pred[u]
+                    and v not in pred[u]
+                    and not _leads_to(pred, u, v)
+                ):
+                    pred[u].append(v)
+                continue
 
             if u not in seen or vu_dist < seen[u]:
                 seen[u] = vu_dist
-                push(fringe, (vu_dist, next(c), u))
+                pred[u] = [v] if all_predecessors else v
+                priority = vu_dist + heuristic(u) if heuristic else vu_dist
+                push(fringe, (priority, next(c), u))
+            elif all_predecessors and vu_dist == seen[u]:
+                pred[u].append(v)
+
+    return dist, pred, None
+
+
+def _leads_to(preds, u, v) -> bool:
+    """Is u on some path to v using lists of predecessors"""
+    stack = [v]
+    visited = {v}
+    while stack:
+        w = stack.pop()
+        if w == u:
+            return True
+        for x in preds[w]:
+            if x not in visited:
+                visited.add(x)
+                stack.append(x)
+    return False
+
+
+def path_to(pred, node) -> list:
+    """Path from the source to the node using the predecessors"""
+    path = []
+    while node is not None:
+        path.append(node)
+        node = pred[node]
+    return path[::-1]
+
+
+def all_paths_to(preds, node, memo=None) -> list:
+    """All the paths from the source(s) to the node using lists of predecessors
+    Worked out without recursion, the paths to each node only once (share a
+    memo dict between calls to reuse them) and any predecessor that would
+    close a loop is ignored"""
+    paths = {} if memo is None else memo
+    open_nodes = set()
+    stack = [(node, False)]
+    while stack:
+        v, ready = stack.pop()
+        if ready:
+            open_nodes.discard(v)
+            if not preds[v]:
+                paths[v] = [[v]]
+            else:
+                paths[v] = [p + [v] for u in preds[v] for p in paths.get(u, ())]
+            continue
+        if v in paths or v in open_nodes:
+            continue
+        # the open nodes are always the ones v has been reached back from
+        open_nodes.add(v)
+        stack.append((v, True))
+        stack.extend((u, False) for u in preds[v] if u not in paths)
+    return paths[node]
+
+
+def graph_neighbours(gph, weight_attr=None) -> callable:
+    """Neighbours function for a graph, nodes with no edges out need not
+    be present"""
+    empty = {}
+    if weight_attr:
+        return lambda v: (
+            (u, attrs[weight_attr]) for u, attrs in gph.get(v, empty).items()
+        )
+    return lambda v: gph.get(v, empty).items()
+
 
-    if target:
-        if target in dist:
+def dijkstra(gph, source, target, weight_attr=None, heuristic=None):
+    """Uses Dijkstra's algorithm to find shortest path from source -> target
+    If no specific target given then return them all in a dict keyed on node
+    Give a heuristic (remaining distance estimate) to make it A*"""
+    dist, _, reached = shortest_path_search(
+        [source],
+        graph_neighbours(gph, weight_attr),
+        target=None if target is None else lambda v: v == target,
+        heuristic=heuristic,
+    )
+    if target is not None:
+        if reached is not None:
             return dist[target]
         return None
     return dist
 
 
-def dijkstra_paths(gph, source, target=None, weight_attr=None):
+def dijkstra_paths(gph, source, target=None, weight_attr=None, heuristic=None):
     """Uses Dijkstra's algorithm to find shortest path from source -> target
     If no specific target given then return them all"""
-    push = heappush
-    pop = heappop
-    dist = {}  # dictionary of final distances
-    seen = {}
-    paths = {source: [source]}
-    # fringe is heapq with 3-tuples (distance,c,node)
-    # use the count c to avoid comparing nodes (may not be able to)
-    c = count()
-    fringe = []
-    seen[source] = 0
-    push(fringe, (0, next(c), source))
-    while fringe:
-        (d, _, v) = pop(fringe)
-        if v in dist:
-            continue  # already searched this node.
-        dist[v] = d
-        if v == target:
-            break
-        for u, attrs in gph[v].items():
-            cost = attrs
-            if weight_attr:
-                cost = attrs[weight_attr]
-            vu_dist = dist[v] + cost
-
-            if u not in seen or vu_dist < seen[u]:
-                seen[u] = vu_dist
-                push(fringe, (vu_dist, next(c), u))
-                paths[u] = paths[v] + [u]
-
-    if target:
-        return dist[target], paths[target]
+    dist, pred, _ = shortest_path_search(
+        [source],
+        graph_neighbours(gph, weight_attr),
+        target=None if target is None else lambda v: v == target,
+        heuristic=heuristic,
+    )
+    if target is not None:
+        return dist[target], path_to(pred, target)
+
+    # dist is in the order settled so a predecessor's path is always ready
+    paths = {}
+    for v in dist:
+        u = pred[v]
+        paths[v] = [v] if u is None else paths[u] + [v]
     return dist, paths
 
 
@@ -138,40 +243,16 @@ def dijkstra_all_paths(gph, source, target=None, weight_attr=None):
     the second tuple being the dict of paths which is a list of paths
     If target given then just a list of paths (not a dict)
     """
-    push = heappush
-    pop = heappop
-    dist = {}  # dictionary of final distances
-    seen = {}
-    paths = defaultdict(list)
-    paths[source] = [[source]]
-    # fringe is heapq with 3-tuples (distance,c,node)
-    # use the count c to avoid comparing nodes (may not be able to)
-    c = count()
-    fringe = []
-    seen[source] = 0
-    push(fringe, (0, next(c), source))
-    while fringe:
-        (d, _, v) = pop(fringe)
-        if v in dist:
-            continue  # already searched this node.
-        dist[v] = d
-        if v == target:
-            break
-        for u, attrs in gph[v].items():
-            cost = attrs
-            if weight_attr:
-                cost = attrs[weight_attr]
-            vu_dist = dist[v] + cost
-
-            if u not in seen or vu_dist <= seen[u]:
-                seen[u] = vu_dist
-                push(fringe, (vu_dist, next(c), u))
-                for pts in paths[v]:
-                    paths[u].append(pts + [u])
-
-    if target:
-        return dist[target], paths[target]
-    return dist, paths
+    dist, preds, _ = shortest_path_search(
+        [source],
+        graph_neighbours(gph, weight_attr),
+        target=None if target is None else lambda v: v == target,
+        all_predecessors=True,
+    )
+    if target is not None:
+        return dist[target], all_paths_to(preds, target)
+    memo = {}
+    return dist, {v: all_paths_to(preds, v, memo) for v in dist}
 
 
 def dijkstra_options_injection(
@@ -180,38 +261,138 @@ def dijkstra_options_injection(
     """Uses Dijkstra's algorithm without a graph.
     instead the options_func generator function gives neighbouring
     options and their cost"""
+    dist, _, reached = shortest_path_search(
+        [source],
+        lambda v: options_func(v, options_func_data),
+        target=None if target is None else lambda v: v == target,
+    )
+    if target is not None:
+        if reached is not None:
+            return dist[target]
+        return None
+    return dist
+
+
+def state_search(
+    start,
+    target,
+    neighbours: callable,
+    heuristic: callable = None,
+    state_key: callable = None,
+    bidirectional=False,
+    reverse_neighbours: callable = None,
+):
+    """Shortest path through an implicit graph of states
+
+    target:                 a state or a predicate on a state
+    neighbours(s):          iterable of (next state, cost)
+    heuristic(s):           optional (admissible & consistent) estimate of the
+                            remaining cost, making it A*
+    state_key(s):           optional canonical (hashable) key, states with the
+                            same key are only explored once (symmetries)
+    bidirectional:          search from both ends, target must be a state
+    reverse_neighbours(s):  states that lead to s (and the cost), defaults to
+                            neighbours i.e. moves are reversible
+
+    Returns (cost, path of states) or (None, None) if the target can't be
+    reached. The path is made of the first state seen for each key.
+    """
+    if state_key is None:
+        state_key = lambda s: s
+    states = {}
+
+    def keyed(nbrs):
+        def keyed_neighbours(k):
+            for s, w in nbrs(states[k]):
+                sk = state_key(s)
+                if sk not in states:
+                    states[sk] = s
+                yield sk, w
+
+        return keyed_neighbours
+
+    start_key = state_key(start)
+    states[start_key] = start
+
+    if bidirectional:
+        if callable(target):
+            raise ValueError("Bidirectional search needs a target state")
+        if heuristic is not None:
+            raise ValueError("Bidirectional search does not take a heuristic")
+        target_key = state_key(target)
+        states[target_key] = target
+        cost, path = _bidirectional_search(
+            start_key,
+            target_key,
+            keyed(neighbours),
+            keyed(reverse_neighbours or neighbours),
+        )
+        if path is None:
+            return None, None
+        return cost, [states[k] for k in path]
+
+    if callable(target):
+        is_target = lambda k: target(states[k])
+    else:
+        target_key = state_key(target)
+        is_target = lambda k: k == target_key
+
+    dist, pred, reached = shortest_path_search(
+        [start_key],
+        keyed(neighbours),
+        target=is_target,
+        heuristic=None if heuristic is None else lambda k: heuristic(states[k]),
+    )
+    if reached is None:
+        return None, None
+    return dist[reached], [states[k] for k in path_to(pred, reached)]
+
+
+def _bidirectional_search(source, target, neighbours, reverse_neighbours):
+    """Bidirectional Dijkstra, expands the side with the nearer fringe and
+    stops once the two fringes together can not beat the best meeting found.
+    Returns (cost, path) or (None, None)"""
+    if source == target:
+        return 0, [source]
+
     push = heappush
     pop = heappop
-    dist = {}  # dictionary of final distances
-    seen = {}
-    # fringe is heapq with 3-tuples (distance,c,node)
-    # use the count c to avoid comparing nodes (may not be able to)
     c = count()
-    fringe = []
-    seen[source] = 0
-    push(fringe, (0, next(c), source))
-    while fringe:
-        (d, _, v) = pop(fringe)
-        if v in dist:
-            continue  # already searched this node.
-        dist[v] = d
-        if v == target:
+    nbrs = (neighbours, reverse_neighbours)
+    dist = ({}, {})
+    seen = ({source: 0}, {target: 0})
+    pred = ({source: None}, {target: None})
+    fringe = ([(0, next(c), source)], [(0, next(c), target)])
+    best = inf
+    meet = None
+
+    while fringe[0] and fringe[1]:
+        if fringe[0][0][0] + fringe[1][0][0] >= best:
             break
+        side = 0 if fringe[0][0][0] <= fringe[1][0][0] else 1
+        (d, _, v) = pop(fringe[side])
+        if v in dist[side]:
+            continue  # already searched this node.
+        dist[side][v] = d
 
-        # magic happens here
-        # for every neighbour(u) of v with a cost/weight(w)
-        for u, w in options_func(v, options_func_data):
-            vu_dist = dist[v] + w
-
-            if u not in seen or vu_dist < seen[u]:
-                seen[u] = vu_dist
-                push(fringe, (vu_dist, next(c), u))
-
-    if target:
-        if target in dist:
-            return dist[target]
-        return None
-    return dist
+        this_seen = seen[side]
+        other_seen = seen[1 - side]
+        for u, w in nbrs[side](v):
+            if u in dist[side]:
+                continue
+            vu_dist = d + w
+            if u not in this_seen or vu_dist < this_seen[u]:
+                this_seen[u] = vu_dist
+                pred[side][u] = v
+                push(fringe[side], (vu_dist, next(c), u))
+                if u in other_seen and vu_dist + other_seen[u] < best:
+                    best = vu_dist + other_seen[u]
+                    meet = u
+
+    if meet is None:
+        return None, None
+    path = path_to(pred[0], meet) + path_to(pred[1], meet)[-2::-1]
+    return best, path
 
 
 def bellman_ford(graph, source):
@@ -325,7 +506,7 @@ def get_adjacency_matrix(
                     matrix[u][v] = 0
 
     for u in nodes:
-        distances, _ = dijkstra_paths(gph, u, weight_attr=weight_attr)
+        distances = dijkstra(gph, u, None, weight_attr=weight_attr)
         if not include_unreachable:
             matrix[u] = {}
         for v, d in distances.items():
@@ -507,7 +688,7 @@ def merge_nodes_keep_first(g, u, v):
     remove_node(g, v)
 
 
-def stoer_wagner(g):
+def stoer_wagner(g, heap_type=BinaryHeap):
     """Stoer-Wagner using a priority queue
     To return the minimum cut of edges that will divide the graph into 2.
     Keep merging nodes until left with 2, return the best cut and resulting partition
@@ -531,7 +712,7 @@ def stoer_wagner(g):
         # on a minimum binary heap
 
         # so the top of heap is the node most connected to the start node
-        h = BinaryHeap()
+        h = heap_type()
         for v, w in g[any_start].items():
             h.upsert(v, -w)
 
@@ -607,61 +788,160 @@ def which_edges_wagner(gph, sg1, sg2):
 
 
 def tarjan(gph):
-    """Return the strongly connected sub graphs"""
+    """Return the strongly connected sub graphs
+    They come out in reverse topological order, sinks first"""
+    index_of = {}
+    low_link = {}
+    stk = []
+    on_stack = set()
+    sub_graphs = []
+    idx = 0
+    for root in gph:
+        if root in index_of:
+            continue
 
-    def strong_connect(v):
-        nonlocal idx
-        low_link[v] = idx
-        index_of[v] = idx
+        index_of[root] = low_link[root] = idx
         idx += 1
-        stk.append(v)
-        on_stack.add(v)
-
-        if v in gph:
-            for w in gph[v]:
+        stk.append(root)
+        on_stack.add(root)
+        # an explicit stack of (node, its unexplored neighbours)
+        work = [(root, iter(gph[root]))]
+        while work:
+            v, neighbours = work[-1]
+            for w in neighbours:
                 if w not in index_of:
-                    strong_connect(w)
-                    low_link[v] = min(low_link[v], low_link[w])
-                elif w in on_stack:
-                    low_link[v] = min(low_link[v], index_of[w])
-
-        if low_link[v] == index_of[v]:
-            scc = []
-            while True:
-                w = stk.pop()
-                scc.append(w)
-                on_stack.discard(w)
-                if w == v:
+                    index_of[w] = low_link[w] = idx
+                    idx += 1
+                    stk.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(gph[w] if w in gph else ())))
                     break
-            sub_graphs.append(scc)
-
-    idx = 0
-    stk = deque()
-    low_link = {}
-    index_of = {}
-    sub_graphs = []
-    on_stack = set()
-    for n in gph:
-        if n in low_link:
-            continue
-        strong_connect(n)
+                if w in on_stack and index_of[w] < low_link[v]:
+                    low_link[v] = index_of[w]
+            else:
+                # all done with v, so back to its parent
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low_link[v] < low_link[u]:
+                        low_link[u] = low_link[v]
+
+                if low_link[v] == index_of[v]:
+                    scc = []
+                    while True:
+                        w = stk.pop()
+                        scc.append(w)
+                        on_stack.discard(w)
+                        if w == v:
+                            break
+                    sub_graphs.append(scc)
 
     return sub_graphs
 
 
-def minimal_spanning_tree(gph):
+class Condensation:
+    """The strongly connected components of a directed graph and the DAG
+    of the edges between them
+
+    Components are numbered in topological order (sources first) so a DP
+    over the DAG is just a loop over the ids, backwards for "best from here".
+
+    nodes:      every node, numbered by position
+    component:  component id of each node number
+    members:    the nodes of each component
+    dag:        the set of successor ids of each component
+    """
+
+    def __init__(self, gph) -> None:
+        sccs = tarjan(gph)
+        n = len(sccs)
+        self.members = sccs[::-1]
+        self.nodes = []
+        self.index = {}
+        self.component = array("I")
+        for c, scc in enumerate(self.members):
+            for v in scc:
+                self.index[v] = len(self.nodes)
+                self.nodes.append(v)
+                self.component.append(c)
+
+        self.dag = [set() for _ in range(n)]
+        for u, edges in gph.items():
+            cu = self[u]
+            for v in edges:
+                cv = self[v]
+                if cu != cv:
+                    self.dag[cu].add(cv)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __getitem__(self, node) -> int:
+        """The component id of the node"""
+        return self.component[self.index[node]]
+
+    def sizes(self) -> list:
+        """Number of nodes in each component"""
+        return [len(m) for m in self.members]
+
+    def longest_path(self, weight: callable = len) -> int:
+        """The heaviest path through the DAG, where a component weighs
+        weight(members), by default the number of nodes, so
+        the most nodes that can be visited on a walk"""
+        best = [0] * len(self)
+        for c in range(len(self) - 1, -1, -1):
+            best[c] = weight(self.members[c]) + max(
+                (best[d] for d in self.dag[c]), default=0
+            )
+        return max(best, default=0)
+
+
+def test_tarjan():
+    """Test Tarjan and the condensation"""
+    gph = {
+        "a": {"b": 1},
+        "b": {"c": 1, "e": 1},
+        "c": {"a": 1, "d": 1},
+        "d": {"f": 1},
+        "e": {"f": 1},
+        "f": {"g": 1},
+        "g": {"f": 1},
+    }
+    sccs = tarjan(gph)
+    assert sorted(map(sorted, sccs)) == [["a", "b", "c"], ["d"], ["e"], ["f", "g"]]
+    assert sorted(sccs[0]) == ["f", "g"]
+
+    cd = Condensation(gph)
+    assert len(cd) == 4
+    assert cd["a"] == cd["c"] == 0
+    assert cd["f"] == cd["g"] == 3
+    assert cd.dag[0] == {cd["d"], cd["e"]}
+    assert all(d > c for c in range(len(cd)) for d in cd.dag[c])
+    assert cd.longest_path() == 6
+
+    # far too deep for recursion
+    n = 50000
+    chain = {i: {i + 1: 1} for i in range(n)}
+    chain[n - 1] = {0: 1}
+    assert len(tarjan(chain)) == 1
+    chain[n - 1] = {}
+    assert len(tarjan(chain)) == n
+    assert Condensation(chain).longest_path() == n
+
+
+def minimal_spanning_tree(gph, heap_type=BinaryHeap):
     """Applies Prim's algorithm to compute a minimum spanning tree on an undirected graph
     Returns a graph
     """
     mst = defaultdict(dict)
-    h = BinaryHeap()
+    h = heap_type()
     parent = {}
 
     for v in gph:
         parent[v] = None
         h.upsert(v, inf)
 
-    while h._dict:
+    while h:
         v, _ = h.pop()
 
         predecessor = parent[v]
@@ -1137,9 +1417,122 @@ e 4 5 5 22
         pass
 
 
+def test_state_search():
+    """Plain, A* and bidirectional all agree with dijkstra"""
+    gph = random_graph(300, 6, max_weight=9, seed=7)
+    nbrs = lambda u: gph[u].items()
+    for target in range(0, 300, 7):
+        d = dijkstra(gph, 0, target)
+        for bidirectional in (False, True):
+            cost, path = state_search(0, target, nbrs, bidirectional=bidirectional)
+            assert cost == d
+            assert path[0] == 0 and path[-1] == target
+            assert sum(gph[u][v] for u, v in zip(path, path[1:])) == d
+
+    # knight moves, A* with a heuristic, symmetric about the diagonal
+    knight = [(1, 2), (2, 1), (-1, 2), (-2, 1), (1, -2), (2, -1), (-1, -2), (-2, -1)]
+    moves = lambda p: (((p[0] + dx, p[1] + dy), 1) for dx, dy in knight)
+    goal = (20, 17)
+    h = lambda p: (abs(p[0] - goal[0]) + abs(p[1] - goal[1])) // 3
+    cost, _ = state_search((0, 0), goal, moves)
+    assert state_search((0, 0), goal, moves, heuristic=h)[0] == cost
+    assert state_search((0, 0), goal, moves, bidirectional=True)[0] == cost
+    is_goal = lambda p: p in (goal, goal[::-1])
+    cost, _ = state_search((0, 0), is_goal, moves, state_key=lambda p: tuple(sorted(p)))
+    assert state_search((0, 0), goal, moves)[0] == cost
+
+    assert state_search(0, 1, lambda u: []) == (None, None)
+    assert state_search(0, 1, lambda u: [], bidirectional=True) == (None, None)
+
+
+def test_dijkstra_all_paths():
+    """Equal paths, zero weight edges (even back to the source) and a long
+    chain of predecessors"""
+    gph = {"a": {"b": 0}, "b": {"a": 0, "c": 1}, "c": {}}
+    assert dijkstra_all_paths(gph, "a", "c") == (1, [["a", "b", "c"]])
+
+    # the same paths whichever of x, y is settled first
+    for s_edges in ({"x": 0, "y": 0}, {"y": 0, "x": 0}):
+        gph = {"s": s_edges, "x": {"y": 0, "t": 1}, "y": {"t": 1}, "t": {}}
+        cost, paths = dijkstra_all_paths(gph, "s", "t")
+        assert cost == 1
+        assert sorted(paths) == [
+            ["s", "x", "t"],
+            ["s", "x", "y", "t"],
+            ["s", "y", "t"],
+        ]
+
+    # zero weight loops
+    gph = {"a": {"b": 0}, "b": {"c": 0}, "c": {"b": 0, "a": 0, "d": 1}, "d": {}}
+    assert dijkstra_all_paths(gph, "a", "d") == (1, [["a", "b", "c", "d"]])
+
+    # a ladder doubles the paths at each rung after the first
+    gph = defaultdict(dict)
+    for i in range(10):
+        for a, b in product("lr", repeat=2):
+            gph[(i, a)][(i + 1, b)] = 1
+    dist, paths = dijkstra_all_paths(gph, (0, "l"))
+    assert dist[(10, "r")] == 10 and len(paths[(10, "r")]) == 2**9
+    assert all(len(p) == 11 for p in paths[(10, "l")])
+
+    chain = {i: {i + 1: 1} for i in range(5000)}
+    assert dijkstra_all_paths(chain, 0, 5000) == (5000, [list(range(5001))])
+
+    # predecessors given with a loop in them
+    preds = {"a": [], "b": ["a", "c"], "c": ["b"]}
+    assert all_paths_to(preds, "c") == [["a", "b", "c"]]
+
+
+def random_graph(nodes, degree, max_weight=1, seed=1):
+    """Connected undirected graph, every node joined to the next 2 (so a
+    minimum degree of 4) plus random chords"""
+    rnd = Random(seed)
+    gph = defaultdict(dict)
+    for u in range(nodes):
+        set_edge(gph, u, (u + 1) % nodes, rnd.randint(1, max_weight))
+        set_edge(gph, u, (u + 2) % nodes, rnd.randint(1, max_weight))
+    for _ in range(nodes * (degree - 4) // 2):
+        u, v = rnd.sample(range(nodes), 2)
+        set_edge(gph, u, v, rnd.randint(1, max_weight))
+    return gph
+
+
+def benchmark_heaps():
+    """Compare the lazy BinaryHeap with the IndexedHeap in
+    Stoer-Wagner (2023.25 like graph, 2 halves joined by 3 edges) and Prim"""
+    half = random_graph(200, 6)
+    cut_gph = deepcopy(half)
+    for u, e in half.items():
+        for v, w in e.items():
+            set_edge(cut_gph, u + 200, v + 200, w)
+    for u in range(3):
+        set_edge(cut_gph, u * 50, 200 + u * 50)
+    cases = [
+        ("stoer_wagner", stoer_wagner, cut_gph),
+        ("prim", minimal_spanning_tree, random_graph(20000, 6, max_weight=100)),
+    ]
+    for name, func, gph in cases:
+        results = []
+        for heap_type in (BinaryHeap, IndexedHeap):
+            start_time = perf_counter()
+            res = func(gph, heap_type=heap_type)
+            elapsed_time = perf_counter() - start_time
+            print(f"{name:12s} {heap_type.__name__:12s} {elapsed_time:.3f} s")
+            if name == "prim":
+                res = sum(directed_edges(res).values())
+            else:
+                res = res[0]
+            results.append(res)
+        assert results[0] == results[1]
+
+
 # test_bellman_ford()
+# test_dijkstra_all_paths()
 # test_floyd()
 # test_prim()
+# test_state_search()
+# test_tarjan()
+# benchmark_heaps()
 
 #
 # Some directed graph util to turn list of intro,cycle
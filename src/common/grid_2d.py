@@ -606,6 +606,266 @@ def dict_set_col(g, c, lst):
         g[p] = v
 
 
+#
+# Flat grid
+#
+
+
+class Grid2D:
+    """A grid of single char cells held in a flat bytearray.
+
+    Cells are referred to by an integer index, moving is adding an offset
+    from offsets (keyed on the same >^<v as directions) so no tuples are made.
+    With a border char the grid is framed by a ring of it, so a walk can
+    check for the border char rather than the bounds. Indexes include the
+    frame, use index() and rc() to convert from and to (r,c).
+    """
+
+    def __init__(self, rows, cols, fill=".", border=None):
+        self.rows = rows
+        self.cols = cols
+        self.border = border
+        pad = 0 if border is None else 1
+        self.pad = pad
+        self.width = cols + 2 * pad
+        self.cells = bytearray((border or fill).encode()) * (
+            (rows + 2 * pad) * self.width
+        )
+        if border is not None:
+            for r in range(rows):
+                self.set_row(r, fill * cols)
+
+        w = self.width
+        self.offsets = {">": 1, "^": -w, "<": -1, "v": w}
+        # same order as rotations, so +1 ACW, -1 CW
+        self.rotations = [1, -w, -1, w]
+        self.all_offsets = [-w - 1, -w, -w + 1, -1, 1, w - 1, w, w + 1]
+
+    @classmethod
+    def from_lines(cls, lines, border=None):
+        """From a list of strings (or list of lists of chars)"""
+        grid = cls(len(lines), len(lines[0]), border=border)
+        for r, line in enumerate(lines):
+            grid.set_row(r, "".join(line))
+        return grid
+
+    @classmethod
+    def from_dict(cls, d: dict, size=None, fill=".", border=None):
+        """From a dict of (r,c) keys, size (rows, cols) defaults to the limits"""
+        if size is None:
+            _, _, max_r, max_c = get_grid_limits(d)
+            size = max_r + 1, max_c + 1
+        grid = cls(*size, fill=fill, border=border)
+        for (r, c), ch in d.items():
+            grid.cells[grid.index(r, c)] = ord(ch)
+        return grid
+
+    def to_dict(self, content_filter=None) -> dict:
+        """As a dict of (r,c) keys like grid_lists_to_dict"""
+        return grid_lists_to_dict(self.to_lines(), content_filter=content_filter)
+
+    def to_lines(self) -> list:
+        """The rows as strings"""
+        return [self.row(r) for r in range(self.rows)]
+
+    def copy(self):
+        """A copy sharing nothing but the shape"""
+        grid = Grid2D.__new__(Grid2D)
+        grid.__dict__.update(self.__dict__)
+        grid.cells = bytearray(self.cells)
+        return grid
+
+    def index(self, r, c) -> int:
+        """Cell index of (r,c)"""
+        return (r + self.pad) * self.width + c + self.pad
+
+    def rc(self, i) -> tuple:
+        """(r,c) of the cell index"""
+        r, c = divmod(i, self.width)
+        return r - self.pad, c - self.pad
+
+    def in_bounds(self, r, c) -> bool:
+        """Is (r,c) on the grid (not the border)"""
+        return 0 <= r < self.rows and 0 <= c < self.cols
+
+    def __getitem__(self, i) -> str:
+        """Char at index i or at (r,c)"""
+        if isinstance(i, tuple):
+            i = self.index(*i)
+        return chr(self.cells[i])
+
+    def __setitem__(self, i, ch):
+        if isinstance(i, tuple):
+            i = self.index(*i)
+        self.cells[i] = ord(ch)
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    def __str__(self):
+        return "\n".join(self.to_lines())
+
+    def step(self, i, offset):
+        """Index after the step or None if off the grid.
+        With a border it is just i + offset"""
+        if self.border is not None:
+            return i + offset
+        w = self.width
+        if w < 3:
+            raise ValueError(f"Stepping needs a border or a width of 3+, not {w}")
+        j = i + offset
+        # the column change of a single step (needs a width of 3 or more)
+        c = i % w + (offset + 1) % w - 1
+        if not 0 <= j < len(self.cells) or not 0 <= c < w:
+            return None
+        return j
+
+    def neighbours(self, i, offsets=None):
+        """Indexes of the cells next to i (orthogonal by default) that are on
+        the grid"""
+        if offsets is None:
+            offsets = self.rotations
+        if self.border is not None:
+            border = ord(self.border)
+            cells = self.cells
+            for o in offsets:
+                if cells[i + o] != border:
+                    yield i + o
+            return
+        for o in offsets:
+            j = self.step(i, o)
+            if j is not None:
+                yield j
+
+    def indexes(self):
+        """Index of every cell on the grid in row order"""
+        for r in range(self.rows):
+            start = self.index(r, 0)
+            yield from range(start, start + self.cols)
+
+    def find(self, ch) -> int:
+        """Index of the first ch on the grid or None"""
+        i = self.cells.find(ord(ch))
+        return None if i < 0 else i
+
+    def find_all(self, ch) -> list:
+        """Indexes of all the ch on the grid"""
+        b = ord(ch)
+        cells = self.cells
+        return [i for i in self.indexes() if cells[i] == b]
+
+    def count(self, ch) -> int:
+        """Number of ch on the grid"""
+        return sum(self.row(r).count(ch) for r in range(self.rows))
+
+    def row(self, r, beg=0, end=None) -> str:
+        """Row r (from beg to end) as a string"""
+        if end is None:
+            end = self.cols
+        i = self.index(r, 0)
+        return self.cells[i + beg : i + end].decode()
+
+    def col(self, c, beg=0, end=None) -> str:
+        """Column c (from beg to end) as a string"""
+        if end is None:
+            end = self.rows
+        w = self.width
+        i = self.index(0, c)
+        return self.cells[i + beg * w : i + end * w : w].decode()
+
+    def set_row(self, r, s: str):
+        """Overwrite row r with the string"""
+        i = self.index(r, 0)
+        self.cells[i : i + len(s)] = s.encode()
+
+    def set_col(self, c, s: str):
+        """Overwrite column c with the string"""
+        i = self.index(0, c)
+        self.cells[i : i + len(s) * self.width : self.width] = s.encode()
+
+
+def test_grid_2d():
+    """Flat grid round trips and walks"""
+    lines = ["#..", ".#.", "..#", "##."]
+    for border in (None, "@"):
+        g = Grid2D.from_lines(lines, border=border)
+        assert g.to_lines() == lines
+        assert g.to_dict() == grid_lists_to_dict(lines)
+        assert Grid2D.from_dict(g.to_dict(), border=border).cells == g.cells
+        assert g.col(1) == ".#.#" and g.col(2, 1, 3) == ".#"
+        assert g.row(3, 1) == "#."
+        assert g.count("#") == 5
+        assert [g.rc(i) for i in g.find_all("#")] == [
+            (0, 0),
+            (1, 1),
+            (2, 2),
+            (3, 0),
+            (3, 1),
+        ]
+        i = g.index(0, 2)
+        assert g.rc(i) == (0, 2) and g[i] == "." and g[2, 2] == "#"
+        assert sorted(g.rc(j) for j in g.neighbours(i)) == [(0, 1), (1, 2)]
+        corner = g.index(3, 0)
+        assert len(list(g.neighbours(corner, g.all_offsets))) == 3
+        h = g.copy()
+        h.set_col(0, "xxxx")
+        assert g.col(0) == "#..#" and h.col(0) == "xxxx"
+    g = Grid2D(2, 3)
+    assert g.step(g.index(0, 0), g.offsets["<"]) is None
+    assert g.rc(g.step(g.index(1, 1), g.all_offsets[0])) == (0, 0)
+    assert g.step(g.index(0, 2), g.offsets[">"]) is None
+    assert g.step(g.index(1, 0), g.offsets["<"]) is None
+    assert g.step(g.index(1, 0), g.offsets["v"]) is None
+    assert g.rc(g.step(g.index(1, 0), g.offsets["^"])) == (0, 0)
+    narrow = Grid2D(3, 2)
+    try:
+        narrow.step(0, narrow.offsets[">"])
+        assert False, "a width of 2 can't be stepped without a border"
+    except ValueError:
+        pass
+    narrow = Grid2D(3, 2, border="#")
+    assert narrow.rc(narrow.step(narrow.index(0, 0), narrow.offsets[">"])) == (0, 1)
+
+
+#
+# Bitmaps
+#
+def bitmap_regions(rows, width: int) -> int:
+    """Count the regions of set bits orthogonally connected in a bitmap
+    given as a list of ints, bit c of rows[r] being cell (r, c).
+    The rows are packed into one int with a clear guard bit after each, so
+    a region grows with a few shifts over the whole grid at once."""
+    stride = width + 1
+    mask = (1 << width) - 1
+    grid = 0
+    for r, row in enumerate(rows):
+        grid |= (row & mask) << (r * stride)
+
+    regions = 0
+    while grid:
+        region = grid & -grid
+        while True:
+            grown = region | region << 1 | region >> 1
+            grown = (grown | region << stride | region >> stride) & grid
+            if grown == region:
+                break
+            region = grown
+        grid ^= region
+        regions += 1
+    return regions
+
+
+def test_bitmap_regions():
+    """Against the lines they came from"""
+    lines = ["##.#", "#..#", ".##.", "#..#"]
+    rows = [sum(1 << c for c, x in enumerate(line) if x == "#") for line in lines]
+    assert bitmap_regions(rows, 4) == 5
+    # a region that wraps round the row end is not joined up
+    assert bitmap_regions([0b1000, 0b0001], 4) == 2
+    assert bitmap_regions([0b1111, 0b1001, 0b1111], 4) == 1
+    assert bitmap_regions([], 4) == 0
+
+
 #
 # Generators
 #
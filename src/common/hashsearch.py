@@ -0,0 +1,298 @@
+"""MD5 searches over a salt followed by an index
+
+The puzzles hash salt + str(i) for i = 0, 1, 2 .. looking for the digests
+that start with some zeros, or want every hash in order (stretched or not).
+
+The md5 of the salt is made once and copied for each index, and a prefix is
+tested on the raw digest bytes rather than the hex. The indexes are split
+into chunks, which a process pool can work on ahead of what has been used so
+far, with the results still given back lazily and in order.
+
+    search(salt, "00000")       (i, digest) for each digest with the prefix
+    hashes(salt, stretch=2016)  hex digest of each index, stretched
+    salted(salt)                suffix -> digest, for hashing other suffixes
+
+By default (workers=1) it is all done in this process. The day files solve
+at import time with no __main__ guard, so where processes are spawned rather
+than forked (Windows, macOS) each worker would import the day again and start
+a pool of its own, and under the runner every worker would have a pool too.
+workers=None uses all the cpus, but only where processes are forked, and
+workers=n > 1 always uses a pool of n for callers that are safe to spawn.
+
+hashes(.., cache=True) keeps the digests on disk in a HashCache, one file per
+(salt, stretch) holding the 16 byte digest of index i at offset 16 * i. The
+files go in AOC_CACHE_PATH (or the temp folder), so re-runs, benchmark
+repeats and the runner's workers all pick up what has been done before.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import md5
+from itertools import count, islice
+import multiprocessing
+import os
+import tempfile
+
+DIGEST_SIZE = 16
+
+
+def salted(salt: str):
+    """Return a function giving the md5 digest of salt + suffix"""
+    base = md5(salt.encode())
+
+    def digest(suffix) -> bytes:
+        h = base.copy()
+        h.update(str(suffix).encode())
+        return h.digest()
+
+    return digest
+
+
+def _split_prefix(prefix: str) -> tuple:
+    """The whole bytes of a hex prefix and the odd nibble after (or None)"""
+    whole = bytes.fromhex(prefix[: len(prefix) // 2 * 2])
+    nibble = int(prefix[-1], 16) if len(prefix) % 2 else None
+    return whole, nibble
+
+
+def _search_chunk(salt, lo, hi, prefix, test) -> list:
+    """(i, digest) for i in [lo, hi) where the digest has the prefix and
+    passes the test (if any)"""
+    base = md5(salt.encode())
+    whole, nibble = _split_prefix(prefix)
+    n = len(whole)
+    found = []
+    for i in range(lo, hi):
+        h = base.copy()
+        h.update(str(i).encode())
+        d = h.digest()
+        if not d.startswith(whole):
+            continue
+        if nibble is not None and d[n] >> 4 != nibble:
+            continue
+        if test is None or test(d):
+            found.append((i, d))
+    return found
+
+
+def _hash_chunk(salt, lo, hi, stretch) -> list:
+    """The hex digests for i in [lo, hi), each hashed again stretch times"""
+    base = md5(salt.encode())
+    found = []
+    for i in range(lo, hi):
+        h = base.copy()
+        h.update(str(i).encode())
+        d = h.hexdigest().encode()
+        for _ in range(stretch):
+            d = md5(d).hexdigest().encode()
+        found.append(d.decode())
+    return found
+
+
+def _chunks(fn, args, start, chunk, workers):
+    """Generate fn(*args, lo, hi, ..) for consecutive chunks from start
+    The pool keeps a couple of chunks per worker in hand ahead of the one
+    being used. args is (before, after) the lo, hi arguments."""
+    before, after = args
+    bounds = ((lo, lo + chunk) for lo in count(start, chunk))
+    if workers is None:
+        workers = 1
+        if multiprocessing.get_start_method() == "fork":
+            workers = os.cpu_count() or 1
+    if workers <= 1:
+        for lo, hi in bounds:
+            yield fn(*before, lo, hi, *after)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        ahead = deque(
+            pool.submit(fn, *before, lo, hi, *after)
+            for lo, hi in islice(bounds, 2 * workers)
+        )
+        while True:
+            result = ahead.popleft().result()
+            lo, hi = next(bounds)
+            ahead.append(pool.submit(fn, *before, lo, hi, *after))
+            yield result
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def search(salt, prefix, test=None, start=0, chunk=1 << 15, workers=1):
+    """Generate (i, digest) in order of i >= start, for the digests of
+    salt + str(i) starting with the hex prefix and passing test(digest).
+    The test has to be picklable (a module level function) for a pool."""
+    args = (salt,), (prefix, test)
+    for found in _chunks(_search_chunk, args, start, chunk, workers):
+        yield from found
+
+
+def hashes(
+    salt, start=0, stretch=0, chunk=1 << 10, workers=1, cache=False, folder=None
+):
+    """Generate the hex digest of salt + str(i) for i = start, start + 1 ..
+    re-hashing the hex stretch times, worked out ahead in the background.
+    With cache the digests are read from and saved to a HashCache file."""
+    if cache:
+        yield from _cached_hashes(salt, start, stretch, chunk, workers, folder)
+        return
+    args = (salt,), (stretch,)
+    for found in _chunks(_hash_chunk, args, start, chunk, workers):
+        yield from found
+
+
+def cache_folder() -> str:
+    """Where the hash caches are kept, AOC_CACHE_PATH or the temp folder"""
+    folder = os.environ.get("AOC_CACHE_PATH")
+    if folder is None:
+        folder = os.path.join(tempfile.gettempdir(), "aoc_cache")
+    return folder
+
+
+class HashCache:
+    """The digests of salt + str(i) for i = 0, 1, .. n - 1 (stretched) kept in
+    a file named from the md5 of the (salt, stretch), so every process asking
+    for the same hashes finds the same file.
+
+    The file is read in one go and closed straight away, nothing is held open
+    whilst the hashes are used. New digests are added in memory and saved by
+    writing a whole new file and replacing the old one, which is atomic, so
+    readers only ever see complete files. If two processes save at once the
+    longer file wins, both being correct as far as they go. Where the file
+    can't be replaced (on Windows whilst another process is reading it) the
+    save is skipped, those hashes are just worked out again next time.
+    """
+
+    def __init__(self, salt: str, stretch: int = 0, folder: str = None) -> None:
+        self.salt = salt
+        self.stretch = stretch
+        self.folder = cache_folder() if folder is None else folder
+        key = md5(f"{stretch}:{salt}".encode()).hexdigest()
+        self.filename = os.path.join(self.folder, f"md5_{key}.bin")
+        self.data = b""
+        self.new = bytearray()
+        self.load()
+
+    def __len__(self) -> int:
+        return (len(self.data) + len(self.new)) // DIGEST_SIZE
+
+    def __getitem__(self, i: int) -> bytes:
+        """The digest of index i"""
+        if i < 0 or i >= len(self):
+            raise IndexError(i)
+        offset = i * DIGEST_SIZE
+        n = len(self.data)
+        if offset < n:
+            return self.data[offset : offset + DIGEST_SIZE]
+        return bytes(self.new[offset - n : offset - n + DIGEST_SIZE])
+
+    def load(self):
+        """Read whatever is in the file, ignoring any torn digest at the end"""
+        try:
+            with open(self.filename, "rb") as f:
+                data = f.read()
+        except (FileNotFoundError, PermissionError):
+            data = b""
+        self.data = data[: len(data) - len(data) % DIGEST_SIZE]
+
+    def append(self, digest: bytes):
+        """Add the digest of the next index"""
+        self.new += digest
+
+    def save(self) -> bool:
+        """Write out the digests if there are more than in the file now,
+        return whether the file was written"""
+        if not self.new:
+            return False
+        n = len(self)
+        try:
+            on_disk = os.stat(self.filename).st_size // DIGEST_SIZE
+        except FileNotFoundError:
+            on_disk = 0
+        saved = False
+        if on_disk < n:
+            os.makedirs(self.folder, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.data)
+                f.write(self.new)
+            try:
+                os.replace(tmp, self.filename)
+                saved = True
+            except PermissionError:
+                os.remove(tmp)
+        self.data += self.new
+        self.new = bytearray()
+        return saved
+
+
+def _cached_hashes(salt, start, stretch, chunk, workers, folder):
+    """hashes() with the digests kept in a HashCache"""
+    cache = HashCache(salt, stretch, folder=folder)
+    try:
+        i = start
+        while i < len(cache):
+            yield cache[i].hex()
+            i += 1
+        todo = hashes(salt, len(cache), stretch, chunk, workers)
+        for j, h in enumerate(todo, len(cache)):
+            cache.append(bytes.fromhex(h))
+            if j >= start:
+                yield h
+    finally:
+        cache.save()
+
+
+def _second_byte_small(d) -> bool:
+    return d[1] < 0x10
+
+
+def test_hashsearch():
+    """Test against hexdigest, in this process and in a pool"""
+
+    def slow(salt, prefix, n):
+        found = []
+        for i in count():
+            h = md5(f"{salt}{i}".encode()).hexdigest()
+            if h.startswith(prefix):
+                found.append((i, bytes.fromhex(h)))
+                if len(found) == n:
+                    return found
+        return found
+
+    for workers in (1, 2):
+        for prefix, n in (("0", 20), ("00", 20), ("a1", 20), ("000", 2)):
+            expected = slow("abc", prefix, n)
+            got = list(islice(search("abc", prefix, chunk=500, workers=workers), n))
+            assert got == expected
+
+        # the same as a 3 zero prefix, after the 1 byte one
+        got = next(search("abc", "00", _second_byte_small, workers=workers))
+        assert got == slow("abc", "000", 1)[0]
+
+        got = hashes("abc", start=5, stretch=2, chunk=3, workers=workers)
+        for i, h in enumerate(islice(got, 7), start=5):
+            expected = md5(f"abc{i}".encode()).hexdigest()
+            for _ in range(2):
+                expected = md5(expected.encode()).hexdigest()
+            assert h == expected
+
+    digest = salted("ihgpwlah")
+    assert digest("DR").hex() == md5(b"ihgpwlahDR").hexdigest()
+
+    # the cache gets filled in as far as it has been used and saved on close
+    with tempfile.TemporaryDirectory() as folder:
+        expected = list(islice(hashes("abc", stretch=3, workers=1), 40))
+        for start, n in ((5, 10), (0, 20), (12, 28), (0, 40)):
+            got = hashes("abc", start, 3, 8, workers=1, cache=True, folder=folder)
+            assert list(islice(got, n)) == expected[start : start + n]
+            got.close()
+        cache = HashCache("abc", 3, folder=folder)
+        assert len(cache) == 40
+        assert cache[39].hex() == expected[39]
+        assert not cache.save()
+        assert len(HashCache("abc", 2, folder=folder)) == 0
+
+
+# test_hashsearch()
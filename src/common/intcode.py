@@ -1,20 +1,193 @@
-"""The inner workings of the intcode processor"""
+"""The inner workings of the intcode processor
+
+Memory is a flat list which grows on demand (unset addresses are 0).
+
+Every distinct instruction value (opcode + parameter modes) is compiled once
+into a small handler with the modes baked in, the processor keeps a dispatch
+table of instruction value -> handler. A handler executes the instruction at
+address p and returns the address of the next one (or PAUSE/HALT). Keying on
+the value rather than the address means self modifying code is handled for free.
+
+For searching over processor states there is
+    fork():         a new processor sharing the code with a copy of the memory
+    snapshot():     a compact state, only the memory pages that differ from the code
+    restore(state): go back to a snapshot
+
+Writes mark their page dirty, so a snapshot only copies the pages written since
+the last snapshot or restore (the rest are shared with the previous one) and a
+restore only patches the pages that are not already the same.
+
+IntCodeNetwork runs a number of processors passing packets between them.
+"""
+
+from collections import deque, namedtuple
+
+# parameter modes
+POSITION = 0
+IMMEDIATE = 1
+RELATIVE = 2
+
+# opcode: (mnemonic, parameter types I(nput)/O(utput), body, next address)
+# in the body a, b, c are the parameters
+OPCODES = {
+    1: ("add", "IIO", "c = a + b", "p + 4"),
+    2: ("mlt", "IIO", "c = a * b", "p + 4"),
+    3: ("inp", "O", None, "p + 2"),
+    4: ("out", "I", "out.append(a)", "p + 2"),
+    5: ("jit", "II", None, "b if a != 0 else p + 3"),
+    6: ("jif", "II", None, "b if a == 0 else p + 3"),
+    7: ("clt", "IIO", "c = 1 if a < b else 0", "p + 4"),
+    8: ("ceq", "IIO", "c = 1 if a == b else 0", "p + 4"),
+    9: ("off", "I", "vm._relative_base += a", "p + 2"),
+    99: ("hlt", "", None, None),
+}
+
+# signals returned by handlers instead of an address
+PAUSE = -1
+HALT = -2
+
+# snapshots hold memory as a diff against the code in pages of this size
+PAGE_SHIFT = 6
+PAGE_SIZE = 1 << PAGE_SHIFT
+
+IntCodeState = namedtuple(
+    "IntCodeState",
+    ["p", "relative_base", "running", "size", "pages", "input", "output"],
+)
+
+
+def decode(value) -> tuple:
+    """Decode an instruction value into (opcode, modes) checking it is valid"""
+    op = value % 100
+    if op not in OPCODES:
+        raise ValueError(f"Invalid instruction {value}")
+    _, types, _, _ = OPCODES[op]
+    modes = tuple(value // 10 ** (i + 2) % 10 for i in range(len(types)))
+    for typ, mode in zip(types, modes):
+        if mode not in (POSITION, IMMEDIATE, RELATIVE) or typ + str(mode) == "O1":
+            raise ValueError(f"Invalid instruction {value}")
+    return op, modes
+
+
+def _operand(typ, mode, idx) -> str:
+    """Source for reading (or the address of) the parameter idx"""
+    at = f"mem[p + {idx}]"
+    if mode == RELATIVE:
+        at = f"mem[p + {idx}] + vm._relative_base"
+    if typ == "O":
+        return at
+    if mode == IMMEDIATE:
+        return at
+    return f"mem[{at}]"
+
+
+_factories = {}
+
+
+def handler_factory(value) -> callable:
+    """Return a function (vm, mem, inp, out, dirty) -> handler(p) for the
+    instruction value. These are compiled once and shared by all processors.
+    The page of every address written to is added to the dirty set."""
+    if value in _factories:
+        return _factories[value]
+
+    op, modes = decode(value)
+    _, types, body, nxt = OPCODES[op]
+    params = {}
+    for idx, (typ, mode) in enumerate(zip(types, modes)):
+        params["abc"[idx]] = (typ, _operand(typ, mode, idx + 1))
+
+    lines = [
+        "def factory(vm, mem, inp, out, dirty):",
+        "    mark = dirty.add",
+        "    def handler(p):",
+    ]
+    if op == 3:
+        lines += [
+            "        if not inp:",
+            "            vm._p = p",
+            "            return PAUSE",
+            f"        a = {params['a'][1]}",
+            "        if a >= len(mem):",
+            "            vm._grow(a)",
+            "        mem[a] = inp.pop(0)",
+            "        mark(a >> PAGE_SHIFT)",
+        ]
+    elif op == 99:
+        lines += [
+            "        vm._p = p",
+            "        vm._running = False",
+            "        return HALT",
+        ]
+    else:
+        # load the inputs, do the body and then store the output
+        for name, (typ, src) in params.items():
+            if typ == "I":
+                lines.append(f"        {name} = {src}")
+        if body:
+            lines.append(f"        {body}")
+        for name, (typ, src) in params.items():
+            if typ == "O":
+                lines.append(f"        at = {src}")
+                lines.append(f"        mem[at] = {name}")
+                lines.append("        mark(at >> PAGE_SHIFT)")
+    if nxt:
+        lines.append(f"        return {nxt}")
+    lines.append("    return handler")
+
+    namespace = {"PAUSE": PAUSE, "HALT": HALT, "PAGE_SHIFT": PAGE_SHIFT}
+    exec("\n".join(lines), namespace)  # pylint: disable=W0122
+    _factories[value] = namespace["factory"]
+    return namespace["factory"]
+
+
+class Memory:
+    """View of the processor memory, grows on write and reads 0 beyond the end"""
+
+    __slots__ = ("_ic",)
+
+    def __init__(self, ic) -> None:
+        self._ic = ic
+
+    def __getitem__(self, a):
+        mem = self._ic._mem  # pylint: disable=W0212
+        if 0 <= a < len(mem):
+            return mem[a]
+        if a < 0:
+            raise IndexError(f"Negative address {a}")
+        return 0
+
+    def __setitem__(self, a, v):
+        self._ic._grow(a)  # pylint: disable=W0212
+        self._ic._mem[a] = v  # pylint: disable=W0212
+        self._ic._dirty.add(a >> PAGE_SHIFT)  # pylint: disable=W0212
+
+    def __len__(self):
+        return len(self._ic._mem)  # pylint: disable=W0212
 
-from collections import defaultdict
+    def __iter__(self):
+        return iter(self._ic._mem)  # pylint: disable=W0212
 
 
 class IntCode:  # pylint: disable=R0902
     """The intcode processor"""
 
+    # head room given to memory beyond the code
+    MEMORY_MARGIN = 4096
+
     def __init__(self, code) -> None:
-        """Store the code in a default dict for unlimited memory"""
+        """Store the code, memory is a flat list of ints that grows on demand"""
 
-        self.memory = defaultdict(int)
         if isinstance(code, list):
             self.code = code
         if isinstance(code, str):
             self.code = [int(i) for i in code.split(",")]
 
+        self._mem = []
+        # pages written since the last snapshot/restore, and the pages of the
+        # last one (page number -> tuple) that differ from the code
+        self._dirty = set()
+        self._pages = {}
         self.input = []
         self.output = []
         self.trace = False
@@ -25,20 +198,29 @@ class IntCode:  # pylint: disable=R0902
         self._relative_base = 0
         self._running = False
 
-        self._arg_types = None
-        self._modes = None
-        self._jump = None
-        self._op = None
-        self._desc = ""
-        self._args = []
+        # dispatch table of instruction value -> handler
+        self._handlers = {}
+        self._binding = (None, None, None, None)
 
         self.reset()
 
+    def __getstate__(self):
+        """Handlers are bound to this processor so are not copied/pickled"""
+        state = self.__dict__.copy()
+        state["_handlers"] = {}
+        state["_binding"] = (None, None, None, None)
+        return state
+
     @property
     def is_running(self) -> bool:
         """In case we are pausing for input, check the state"""
         return self._running
 
+    @property
+    def memory(self) -> Memory:
+        """Indexable view of memory"""
+        return Memory(self)
+
     def reset(self):
         """Reset all inputs, outputs, pointers and memory"""
         self._p = 0
@@ -47,35 +229,91 @@ class IntCode:  # pylint: disable=R0902
         self.input = []
         self.output = []
         self._running = True
-        for a, v in enumerate(self.code):
-            self.memory[a] = v
-
-    def _get_args(self) -> tuple:
-
-        sz = len(self._arg_types)
-        args = []
-        mode = self._modes
-        for idx, addr in enumerate(range(self._p + 1, self._p + 1 + sz)):
-
-            typ = self._arg_types[idx]
-            arg = self.memory[addr]
-            am = mode % 10
-            mode = mode // 10
-
-            v = arg
-            if typ == "I":
-                if am == 0:  # position mode
-                    v = self.memory[arg]
-                if am == 2:  # relative
-                    v = self.memory[arg + self._relative_base]
-            if typ == "O":
-                if am == 2:  # relative
-                    v = arg + self._relative_base
-
-            args.append(v)
-
-        self._args = tuple(args)
-        return tuple(args)
+        self._mem = self.code + [0] * self.MEMORY_MARGIN
+        self._dirty = set()
+        self._pages = {}
+
+    def fork(self):
+        """Return a new processor in the same state, the code is shared"""
+        other = IntCode.__new__(IntCode)
+        other.__dict__.update(self.__getstate__())
+        other._mem = self._mem.copy()  # pylint: disable=W0212
+        other._dirty = self._dirty.copy()  # pylint: disable=W0212
+        other._pages = self._pages.copy()  # pylint: disable=W0212
+        other.input = self.input.copy()
+        other.output = self.output.copy()
+        other.watch = self.watch.copy()
+        return other
+
+    def _code_page(self, n) -> tuple:
+        """Page n as it is in the code (zeros beyond it)"""
+        a = n << PAGE_SHIFT
+        page = self.code[a : a + PAGE_SIZE]
+        return tuple(page) + (0,) * (PAGE_SIZE - len(page))
+
+    def snapshot(self) -> IntCodeState:
+        """Return the current state, memory is held as the pages that differ
+        from the code. Only the pages written since the last snapshot or
+        restore are copied, the rest are shared with it."""
+        mem = self._mem
+        pages = self._pages
+        for n in self._dirty:
+            a = n << PAGE_SHIFT
+            page = tuple(mem[a : a + PAGE_SIZE])
+            page += (0,) * (PAGE_SIZE - len(page))
+            if page == self._code_page(n):
+                pages.pop(n, None)
+            else:
+                pages[n] = page
+        # cleared rather than replaced as the handlers are bound to it
+        self._dirty.clear()
+
+        return IntCodeState(
+            self._p,
+            self._relative_base,
+            self._running,
+            len(mem),
+            tuple(sorted(pages.items())),
+            tuple(self.input),
+            tuple(self.output),
+        )
+
+    def restore(self, state: IntCodeState):
+        """Restore the processor to a snapshot, patching only the pages of
+        memory that are not already as they were"""
+        mem = self._mem
+        target = dict(state.pages)
+        # pages not the same as the code now, but may be in the snapshot
+        changed = self._dirty.union(self._pages)
+        for n in changed.union(target):
+            page = target.get(n)
+            if n not in self._dirty and page is not None and page is self._pages.get(n):
+                continue
+            if page is None:
+                page = self._code_page(n)
+            a = n << PAGE_SHIFT
+            if a + PAGE_SIZE > len(mem):
+                mem.extend([0] * (a + PAGE_SIZE - len(mem)))
+            mem[a : a + PAGE_SIZE] = page
+        if len(mem) > state.size:
+            del mem[state.size :]
+        elif len(mem) < state.size:
+            mem.extend([0] * (state.size - len(mem)))
+        self._pages = target
+        self._dirty.clear()
+        self._p = state.p
+        self._relative_base = state.relative_base
+        self._running = state.running
+        self.input[:] = state.input
+        self.output[:] = state.output
+
+    def _grow(self, a):
+        """Make sure address a exists"""
+        if a < 0:
+            raise IndexError(f"Negative address {a}")
+        mem = self._mem
+        if a >= len(mem):
+            mem.extend([0] * (a + 1 - len(mem) + self.MEMORY_MARGIN))
 
     def run(self, input_values: list | None = None) -> list:
         """Run some input and return the output"""
@@ -126,172 +364,178 @@ class IntCode:  # pylint: disable=R0902
         return out
 
     def go(self):
-        """Run the processor"""
+        """Run the processor until it halts or pauses for input"""
         self._running = True
-        while self.is_running:
+        if self.trace or self.watch:
+            self._go_traced()
+            return
+
+        handlers = self._dispatch_table()
+        mem = self._mem
+        p = self._p
+        while p >= 0:
+            try:
+                handler = handlers[mem[p]]
+            except KeyError:
+                handler = handlers[mem[p]] = handler_factory(mem[p])(
+                    self, mem, self.input, self.output, self._dirty
+                )
+            try:
+                p = handler(p)
+            except IndexError:
+                # addressed beyond the end of memory, grow it and retry
+                self._grow(len(mem) * 2)
+
+    def _dispatch_table(self) -> dict:
+        """The handlers are bound to the memory, input and output lists
+        so start a new table if any of them have been replaced"""
+        binding = (self._mem, self.input, self.output, self._dirty)
+        if any(a is not b for a, b in zip(binding, self._binding)):
+            self._binding = binding
+            self._handlers = {}
+        return self._handlers
 
-            # reset operation level attributes
-            self._arg_types = ""
-            self._modes = None
-            self._jump = None
+    def get_memory(self):
+        """Get the memory in list form"""
+        mem = self._mem
+        last = len(mem) - 1
+        while last > 0 and mem[last] == 0:
+            last -= 1
+        return mem[: last + 1]
+
+    def _go_traced(self):
+        """Run a step at a time, printing the trace and watched addresses"""
+        memory = self.memory
+        while self._running:
             self._cnt += 1
-
-            # get op and modes
-            op = self.memory[self._p]
-            self._modes = op // 100
-            op = op % 100
-            self._op = op
-            self._desc = ""
-            self._args = None
-
+            p = self._p
+            value = memory[p]
+            op, modes = decode(value)
+            name, types, _, _ = OPCODES[op]
+            args = tuple(memory[a] for a in range(p + 1, p + 1 + len(types)))
             if self.watch:
-                print({w: self.memory[w] for w in self.watch})
+                print({w: memory[w] for w in self.watch})
 
-            # do the operation and break if pausing for input
-            pause = self._do_op(op)
+            self._grow(p + len(types))
+            handler = handler_factory(value)(
+                self, self._mem, self.input, self.output, self._dirty
+            )
+            try:
+                nxt = handler(p)
+            except IndexError:
+                self._grow(len(self._mem) * 2)
+                continue
 
             if self.trace:
                 print(
-                    f"{self._cnt:#5d} {self._p:#5d} {self._desc:30s}"
-                    f"{self._op:#3d} {self._args} {self._modes}"
+                    f"{self._cnt:#5d} {p:#5d} {name:4s}"
+                    f"{op:#3d} {args} {modes} rb={self._relative_base}"
                 )
 
-            if pause:
+            if nxt < 0:
                 break
-
-            # jump or next
-            if self._jump is None:
-                self._p += len(self._arg_types) + 1
-            else:
-                self._p = self._jump
-
-    def get_memory(self):
-        """Get the memory in list form"""
-        return [self.memory[a] for a in range(max(self.memory) + 1)]
-
-    def _do_op(self, op) -> bool:
-
-        if op == 99:
-            self._desc = "HALT"
-            self._running = False
-
-        if op == 1:
-            self._add()
-
-        if op == 2:
-            self._mlt()
-
-        if op == 3:
-            if self._input():
-                return False
-            return True
-
-        if op == 4:
-            self._output()
-
-        if op == 5:
-            self._jump_if_true()
-
-        if op == 6:
-            self._jump_if_false()
-
-        if op == 7:
-            self._less_than()
-
-        if op == 8:
-            self._equal()
-
-        if op == 9:
-            self._rel_offset()
-
-        return False
-
-    def _add(self):
-        """01"""
-        self._arg_types = "IIO"
-        args = self._get_args()
-        a, b, s = args  # pylint: disable=W0632
-        r = a + b
-        self.memory[s] = r
-        self._desc = f"add {a} + {b} = {r} -> {s}"
-
-    def _mlt(self):
-        """02"""
-        self._arg_types = "IIO"
-        args = self._get_args()
-        a, b, s = args  # pylint: disable=W0632
-        r = a * b
-        self.memory[s] = r
-        self._desc = f"mlt {a} x {b} = {r} -> {s}"
-
-    def _input(self):
-        """03"""
-        self._arg_types = "O"
-        if not self.input:
-            self._desc = "inp pausing ..."
-            return False
-        args = self._get_args()
-        a = args[0]
-        v = self.input.pop(0)
-        self.memory[a] = v
-        self._desc = f"inp {v} -> {a}"
-        return True
-
-    def _output(self):
-        """04"""
-        self._arg_types = "I"
-        args = self._get_args()
-        v = args[0]
-        self.output.append(v)
-        self._desc = f"out -> {v}"
-
-    def _jump_if_true(self):
-        """05"""
-        self._arg_types = "II"
-        args = self._get_args()
-        cmp, jmp = args  # pylint: disable=W0632
-        if cmp != 0:
-            self._jump = jmp
-        self._desc = f"jit {cmp} != 0: {self._jump}"
-
-    def _jump_if_false(self):
-        """06"""
-        self._arg_types = "II"
-        args = self._get_args()
-        cmp, jmp = args  # pylint: disable=W0632
-        if cmp == 0:
-            self._jump = jmp
-        self._desc = f"jif {cmp} == 0: {self._jump}"
-
-    def _less_than(self):
-        """07"""
-        self._arg_types = "IIO"
-        args = self._get_args()
-        a, b, s = args  # pylint: disable=W0632
-        r = 0
-        if a < b:
-            r = 1
-        self.memory[s] = r
-        self._desc = f"cmp {a}<{b}: {r} -> {s}"
-
-    def _equal(self):
-        """08"""
-        self._arg_types = "IIO"
-        args = self._get_args()
-        a, b, s = args  # pylint: disable=W0632
-        r = 0
-        if a == b:
-            r = 1
-        self.memory[s] = r
-        self._desc = f"cmp {a}=={b}: {r} -> {s}"
-
-    def _rel_offset(self):
-        """09"""
-        self._arg_types = "I"
-        args = self._get_args()
-        v = args[0]
-        self._relative_base += v
-        self._desc = f"off {v}: {self._relative_base}"
+            self._p = nxt
+
+
+class IntCodeNetwork:
+    """Run processors that pass packets between each other
+
+    Processors wait on a ready queue and each one runs until it blocks on input
+    (or halts). Its output is cut into packets of packet_size for the router to
+    deliver using send(). A blocked processor is not run again until it is sent
+    something, so it costs nothing whilst waiting.
+
+    router(network, sender, packet)
+        Deliver a packet. By default packet[0] is the address and the rest is
+        sent to it.
+
+    on_idle(network)
+        Called when every processor is blocked with nothing to read. Return True
+        if it sent anything (i.e. a NAT) to keep the network going.
+
+    empty_input
+        If given a processor reading an empty queue gets this instead (i.e. -1)
+        and is then considered idle if that run produced no packets.
+
+    run() returns when stopped via stop(result), all the processors have halted
+    or the network is idle, giving the result.
+    """
+
+    def __init__(
+        self,
+        processors: list,
+        packet_size=1,
+        router=None,
+        on_idle=None,
+        empty_input=None,
+    ) -> None:
+        self.processors = processors
+        self.packet_size = packet_size
+        self.router = router or IntCodeNetwork.route_by_address
+        self.on_idle = on_idle
+        self.empty_input = empty_input
+        self.result = None
+        self._stopped = False
+        self._ready = deque(range(len(processors)))
+        self._queued = [True] * len(processors)
+
+    @staticmethod
+    def route_by_address(network, sender, packet):  # pylint: disable=W0613
+        """Default router: first value is the address"""
+        network.send(packet[0], packet[1:])
+
+    def send(self, address, values):
+        """Send values to a processor's input and wake it up"""
+        ic = self.processors[address]
+        ic.input.extend(values)
+        if not self._queued[address]:
+            self._queued[address] = True
+            self._ready.append(address)
+
+    def stop(self, result=None):
+        """Stop the network, run() will return the result"""
+        self.result = result
+        self._stopped = True
+
+    def run(self):
+        """Schedule processors until stopped, halted or idle"""
+        ready = self._ready
+        queued = self._queued
+        size = self.packet_size
+        empty_input = self.empty_input
+        while not self._stopped:
+            if not ready:
+                if self.on_idle is None or not self.on_idle(self) or not ready:
+                    break
+                continue
+
+            address = ready.popleft()
+            queued[address] = False
+            ic = self.processors[address]
+            if not ic.is_running:
+                continue
+
+            polled = False
+            if not ic.input and empty_input is not None:
+                ic.input.append(empty_input)
+                polled = True
+            ic.go()
+
+            out = ic.output
+            sent = len(out) >= size
+            while len(out) >= size and not self._stopped:
+                packet = out[:size]
+                del out[:size]
+                self.router(self, address, packet)
+
+            # once given the empty input, if nothing came of it then it is idle
+            if ic.is_running and not queued[address]:
+                active = sent or not polled
+                if ic.input or (empty_input is not None and active):
+                    queued[address] = True
+                    ready.append(address)
+
+        return self.result
 
 
 def test_day_02_add():
@@ -367,11 +611,73 @@ def test_day_09_rel():
     assert o[0] == 1125899906842624
 
 
+def test_snapshot_fork():
+    """Branching from a paused state"""
+    ic = IntCode("3,9,8,9,10,9,4,9,99,-1,8")
+    ic.go()
+    state = ic.snapshot()
+    assert len(state.pages) == 0
+
+    fic = ic.fork()
+    fic.input.append(8)
+    fic.go()
+    assert fic.output == [1]
+    assert not fic.is_running
+    assert ic.is_running and ic.memory[9] == -1
+
+    ic.input.append(7)
+    ic.go()
+    assert ic.output == [0]
+    changed = ic.snapshot()
+    assert len(changed.pages) == 1
+
+    ic.restore(state)
+    ic.input.append(8)
+    ic.go()
+    assert ic.output == [1]
+
+    ic.restore(changed)
+    assert ic.output == [0] and ic.memory[9] == 0 and not ic.is_running
+
+    # pages not written to since are shared with the last snapshot
+    ic.memory[5000] = 7
+    again = ic.snapshot()
+    assert len(again.pages) == 2 and again.pages[0][1] is changed.pages[0][1]
+    ic.memory[9] = -1
+    ic.memory[5000] = 0
+    assert ic.snapshot().pages == ()
+    ic.restore(again)
+    assert ic.memory[9] == 0 and ic.memory[5000] == 7
+    ic.restore(state)
+    assert ic.get_memory() == ic.code and ic.is_running
+
+
+def test_network():
+    """Day 7 amplifier feedback loop"""
+    pgm = (
+        "3,26,1001,26,-4,26,3,27,1002,27,2,27,1,27,26,27,"
+        "4,27,1001,28,-1,28,1005,28,6,99,0,0,5"
+    )
+    amps = []
+    for phase in (9, 8, 7, 6, 5):
+        ic = IntCode(pgm)
+        ic.input = [phase]
+        amps.append(ic)
+    amps[0].input.append(0)
+    net = IntCodeNetwork(
+        amps, router=lambda net, src, pkt: net.send((src + 1) % 5, pkt)
+    )
+    net.run()
+    assert amps[0].input == [139629729]
+
+
 def test_all():
     """Run all tests"""
     test_day_02_add()
     test_day_05_cmp_jmp()
     test_day_09_rel()
+    test_snapshot_fork()
+    test_network()
 
 
 test_all()
@@ -30,9 +30,28 @@ Interval Set functions all return a set of intervals objects
     - Functions acting as a binary operation on 2 sets of intervals:
         union, intersection, minus
 
+IntervalSet holds isolated intervals as sorted lists of starts and ends, so
+the set algebra is a linear sweep and a point query is a bisect. The set
+functions above are done with it. Use it directly when there are thousands
+of intervals.
+
+    - operators: | & - (union, intersection, minus) and `x in s`
+    - methods: negation(window), crop(window), size, find, next_outside
+
+PiecewiseMap is a map of the integers adding an offset over each piece
+(start, end, offset) and the identity elsewhere (like the 2023 day 5 almanac).
+Maps chain into one with then() or compose(), apply to an IntervalSet in a
+single sweep and invert when they are one to one.
+
 """
 
-from typing import Self
+from bisect import bisect_left, bisect_right
+from functools import reduce
+from heapq import merge
+from itertools import pairwise
+from math import inf
+from random import Random
+from typing import Iterable, Self
 
 
 class Interval:
@@ -151,6 +170,273 @@ class Interval:
         return Interval(self.start + adj, self.end + adj)
 
 
+class IntervalSet:
+    """Isolated intervals kept as sorted lists of starts and ends.
+    Built from Interval objects or (start, end) tuples, empty ones are ignored.
+    Intervals that overlap or border each other are merged."""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals: Iterable = ()) -> None:
+        pairs = sorted(
+            (i.tuple() if isinstance(i, Interval) else tuple(i)) for i in intervals
+        )
+        self.starts, self.ends = self._merge_sorted(pairs)
+
+    @staticmethod
+    def _merge_sorted(pairs) -> tuple[list, list]:
+        """Merge (start, end) pairs sorted by start into isolated lists"""
+        starts = []
+        ends = []
+        for a, b in pairs:
+            if a >= b:
+                continue
+            if ends and a <= ends[-1]:
+                if b > ends[-1]:
+                    ends[-1] = b
+                continue
+            starts.append(a)
+            ends.append(b)
+        return starts, ends
+
+    @classmethod
+    def _from_lists(cls, starts: list, ends: list) -> Self:
+        """Wrap lists that are already isolated and sorted"""
+        result = cls.__new__(cls)
+        result.starts = starts
+        result.ends = ends
+        return result
+
+    def __iter__(self):
+        """(start, end) tuples in order"""
+        return zip(self.starts, self.ends)
+
+    def __len__(self) -> int:
+        """The number of intervals"""
+        return len(self.starts)
+
+    def __bool__(self) -> bool:
+        return bool(self.starts)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IntervalSet):
+            return NotImplemented
+        return self.starts == other.starts and self.ends == other.ends
+
+    def __repr__(self) -> str:
+        return f"IntervalSet({list(self)})"
+
+    def __contains__(self, x) -> bool:
+        """Is the point within one of the intervals"""
+        i = bisect_right(self.starts, x) - 1
+        return i >= 0 and x < self.ends[i]
+
+    def find(self, x) -> Interval | None:
+        """The interval containing the point"""
+        i = bisect_right(self.starts, x) - 1
+        if i >= 0 and x < self.ends[i]:
+            return Interval(self.starts[i], self.ends[i])
+        return None
+
+    def next_outside(self, x) -> int:
+        """The first point from x (inclusive) not in the set"""
+        i = bisect_right(self.starts, x) - 1
+        if i >= 0 and x < self.ends[i]:
+            return self.ends[i]
+        return x
+
+    def size(self) -> int:
+        """Total size of all the intervals"""
+        return sum(self.ends) - sum(self.starts)
+
+    def intervals(self) -> set[Interval]:
+        """As a set of Interval objects"""
+        return {Interval(a, b) for a, b in self}
+
+    def covering_interval(self) -> Interval:
+        """The minimum interval covering the set"""
+        return Interval(self.starts[0], self.ends[-1])
+
+    def union(self, other: Self) -> Self:
+        """Intervals in either"""
+        return IntervalSet._from_lists(*self._merge_sorted(merge(self, other)))
+
+    def intersection(self, other: Self) -> Self:
+        """Intervals in both"""
+        starts = []
+        ends = []
+        a_starts, a_ends = self.starts, self.ends
+        b_starts, b_ends = other.starts, other.ends
+        i = j = 0
+        while i < len(a_starts) and j < len(b_starts):
+            lo = max(a_starts[i], b_starts[j])
+            hi = min(a_ends[i], b_ends[j])
+            if lo < hi:
+                starts.append(lo)
+                ends.append(hi)
+            # move on whichever finishes first
+            if a_ends[i] < b_ends[j]:
+                i += 1
+            else:
+                j += 1
+        return IntervalSet._from_lists(starts, ends)
+
+    def minus(self, other: Self) -> Self:
+        """Intervals in this but not the other"""
+        starts = []
+        ends = []
+        b_starts, b_ends = other.starts, other.ends
+        j = 0
+        for a, b in self:
+            # skip those of the other ending before this starts
+            while j < len(b_starts) and b_ends[j] <= a:
+                j += 1
+            k = j
+            while k < len(b_starts) and b_starts[k] < b:
+                if a < b_starts[k]:
+                    starts.append(a)
+                    ends.append(b_starts[k])
+                a = max(a, b_ends[k])
+                k += 1
+            if a < b:
+                starts.append(a)
+                ends.append(b)
+        return IntervalSet._from_lists(starts, ends)
+
+    def crop(self, window: Interval) -> Self:
+        """Only what is within the window"""
+        lo = bisect_right(self.ends, window.start)
+        hi = bisect_right(self.starts, window.end - 1)
+        starts = self.starts[lo:hi]
+        ends = self.ends[lo:hi]
+        if starts:
+            starts[0] = max(starts[0], window.start)
+            ends[-1] = min(ends[-1], window.end)
+        return IntervalSet._from_lists(starts, ends)
+
+    def negation(self, window: Interval) -> Self:
+        """The gaps within the window"""
+        return IntervalSet._from_lists([window.start], [window.end]).minus(self)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = minus
+
+
+class PiecewiseMap:
+    """x -> x + offset, the offset is constant between breakpoints.
+    points are the sorted breakpoints and offsets[i] applies to
+    points[i-1] <= x < points[i], with offsets[0] and offsets[-1] for
+    everything before and after (0, the identity, when built from pieces)"""
+
+    __slots__ = ("points", "offsets")
+
+    def __init__(self, pieces: Iterable = ()) -> None:
+        """From (start, end, offset) pieces, which must not overlap"""
+        points = []
+        offsets = [0]
+        for a, b, o in sorted(pieces):
+            if a >= b:
+                continue
+            if points and a < points[-1]:
+                raise ValueError(f"Piece {(a, b, o)} overlaps another")
+            if points and a == points[-1]:
+                offsets[-1] = o
+            else:
+                points.append(a)
+                offsets.append(o)
+            points.append(b)
+            offsets.append(0)
+        self.points, self.offsets = self._compress(points, offsets)
+
+    @staticmethod
+    def _compress(points: list, offsets: list) -> tuple[list, list]:
+        """Drop breakpoints with the same offset either side"""
+        new_points = []
+        new_offsets = offsets[:1]
+        for p, o in zip(points, offsets[1:]):
+            if o == new_offsets[-1]:
+                continue
+            new_points.append(p)
+            new_offsets.append(o)
+        return new_points, new_offsets
+
+    @classmethod
+    def _from_lists(cls, points: list, offsets: list) -> Self:
+        result = cls.__new__(cls)
+        result.points, result.offsets = cls._compress(points, offsets)
+        return result
+
+    def __call__(self, x: int) -> int:
+        return x + self.offsets[bisect_right(self.points, x)]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PiecewiseMap):
+            return NotImplemented
+        return self.points == other.points and self.offsets == other.offsets
+
+    def __repr__(self) -> str:
+        return f"PiecewiseMap({list(self.pieces())})"
+
+    def segments(self):
+        """Every (start, end, offset) including the infinite ends"""
+        bounds = [-inf] + self.points + [inf]
+        for (a, b), o in zip(pairwise(bounds), self.offsets):
+            yield a, b, o
+
+    def pieces(self):
+        """The finite (start, end, offset) pieces that move something"""
+        for a, b, o in self.segments():
+            if o and a != -inf and b != inf:
+                yield a, b, o
+
+    def then(self, other: Self) -> Self:
+        """The map x -> other(self(x))"""
+        points = set(self.points)
+        for a, b, o in self.segments():
+            # other's breakpoints within the image of this segment
+            lo = bisect_right(other.points, a + o)
+            hi = bisect_left(other.points, b + o)
+            points.update(q - o for q in other.points[lo:hi])
+        points = sorted(points)
+        if not points:
+            return PiecewiseMap._from_lists([], [self.offsets[0] + other.offsets[0]])
+        x = points[0] - 1
+        offsets = [other(self(x)) - x]
+        for p in points:
+            offsets.append(other(self(p)) - p)
+        return PiecewiseMap._from_lists(points, offsets)
+
+    def invert(self) -> Self:
+        """The inverse map, raises ValueError if this is not one to one"""
+        images = sorted((a + o, b + o, -o) for a, b, o in self.segments())
+        for (_, end, _), (start, _, _) in pairwise(images):
+            if end != start:
+                raise ValueError("The map is not one to one")
+        points = [a for a, _, _ in images[1:]]
+        offsets = [o for _, _, o in images]
+        return PiecewiseMap._from_lists(points, offsets)
+
+    def apply(self, intervals: IntervalSet) -> IntervalSet:
+        """The image of the intervals"""
+        points = self.points
+        offsets = self.offsets
+        mapped = []
+        for a, b in intervals:
+            i = bisect_right(points, a)
+            while i < len(points) and points[i] < b:
+                mapped.append((a + offsets[i], points[i] + offsets[i]))
+                a = points[i]
+                i += 1
+            mapped.append((a + offsets[i], b + offsets[i]))
+        return IntervalSet(mapped)
+
+
+def compose(*maps: PiecewiseMap) -> PiecewiseMap:
+    """Chain the maps into one, applying the first one first"""
+    return reduce(PiecewiseMap.then, maps, PiecewiseMap())
+
+
 #
 # functions for handling sets of Intervals
 #
@@ -199,119 +485,147 @@ def mergability(intervals: set[Interval]) -> tuple[set[Interval]]:
     isolated = set()
     mergable = set()
 
-    for interval in intervals:
-        if mergable_intervals(intervals, interval):
+    ordered = sorted(intervals, key=lambda x: x.start)
+    furthest = None
+    for idx, interval in enumerate(ordered):
+        # could merge with an earlier one or the next one
+        if furthest is not None and interval.start <= furthest:
             mergable.add(interval)
+            mergable.add(ordered[idx - 1])
         else:
             isolated.add(interval)
+        furthest = interval.end if furthest is None else max(furthest, interval.end)
 
+    isolated -= mergable
     return isolated, mergable
 
 
 def normalize(intervals: set[Interval]) -> set[Interval]:
     """Returns a set of isolated intervals covering the same space
     (a merge or squash if you like)"""
-    isolated: set
-    mergable: set
-    result: set
-    result, mergable = mergability(intervals)
-    while mergable:
-        print(len(mergable))
-        # find 2 mergable intervals in the mergable set
-        interval_a: Interval = mergable.pop()
-        interval_b: Interval = None
-        for other in mergable:
-            if interval_a == other:
-                continue
-            if interval_a.could_merge(other):
-                interval_b = other
-                break
-
-        # both are removed and replaced by a single interval
-        mergable.remove(interval_b)
-        merged_interval = interval_a.merge(interval_b)
-        mergable.add(merged_interval)
-
-        # iterate until we only have isolated intervals
-        isolated, mergable = mergability(mergable)
-        result.update(isolated)
-
-    return result
+    return IntervalSet(intervals).intervals()
 
 
 def union(set_a: set[Interval], set_b: set[Interval]) -> set[Interval]:
     """Returns a normalized union of 2 interval sets"""
-    result = set_a.copy()
-    result.update(set_b)
-    result = normalize(result)
-    return result
+    return (IntervalSet(set_a) | IntervalSet(set_b)).intervals()
 
 
 def intersection(set_a: set[Interval], set_b: set[Interval]) -> set[Interval]:
-    """Returns a normalized intersection of 2 interval sets
-    Effectively a cross product to create all possible overlaps and
-    then normalised union of the result gives the overall intersection
-    """
-    result = set()
-    for interval_a in set_a:
-        for interval_b in set_b:
-            overlap = interval_a.overlap(interval_b)
-            if overlap:
-                result.add(overlap)
-    result = normalize(result)
-    return result
+    """Returns a normalized intersection of 2 interval sets"""
+    return (IntervalSet(set_a) & IntervalSet(set_b)).intervals()
 
 
 def ordered_list(intervals: set[Interval]) -> list[Interval]:
-    """Returns the set normalized and in an ordered list
-    Primarily for negation, but available for general use"""
-    intervals = normalize(intervals)
-    sorted_intervals = sorted(list(intervals), key=lambda x: x.start)
-    return sorted_intervals
+    """Returns the set normalized and in an ordered list"""
+    return [Interval(a, b) for a, b in IntervalSet(intervals)]
 
 
 def negation(intervals: set[Interval], window: Interval) -> set[Interval]:
-    """Returns the inverse or negative as a new set (limits defined by the given window)
-    Primarily for use by the minus function, but available generally"""
-    intervals = crop(normalize(intervals), window)
-
-    if not intervals:
-        # if there are no intervals in the window
-        # then result is the window (set of 1)
-        return {window}
-
-    inverse = set()
-    sorted_intervals = ordered_list(intervals)
-
-    # add all the gaps in between
-    for idx in range(len(sorted_intervals) - 1):
-        interval_a = sorted_intervals[idx]
-        interval_b = sorted_intervals[idx + 1]
-        gap = interval_a.gap(interval_b)
-        inverse.add(gap)
-
-    # then a possible gap at the start
-    if window.start < sorted_intervals[0].start:
-        inverse.add(Interval(window.start, sorted_intervals[0].start))
-
-    # and at the end
-    if window.end > sorted_intervals[-1].end:
-        inverse.add(Interval(sorted_intervals[-1].end, window.end))
-
-    return inverse
+    """Returns the inverse or negative as a new set
+    (limits defined by the given window)"""
+    return IntervalSet(intervals).negation(window).intervals()
 
 
 def minus(set_a: set[Interval], set_b: set[Interval]) -> set[Interval]:
-    """Returns a normalized result of A - B
-
-    Since:
-       A - B   <=>   A and ~B
-
-    We make use of the negation function on B and intersect it with A
-    ( the ~B is scoped/windowed by the coverage of A as anything outside of A is not relevant )
-    """
-    set_a = normalize(set_a)
-    window = covering_interval(set_a)
-    neg_b = negation(set_b, window)
-    result = intersection(set_a, neg_b)
-    return result
+    """Returns a normalized result of A - B"""
+    return (IntervalSet(set_a) - IntervalSet(set_b)).intervals()
+
+
+def test_interval_set():
+    """Against a set of the points"""
+    rnd = Random(11)
+
+    def random_set():
+        intervals = set()
+        for _ in range(rnd.randint(0, 12)):
+            a = rnd.randint(0, 100)
+            intervals.add(Interval(a, a + rnd.randint(1, 15)))
+        return intervals
+
+    def points(intervals):
+        return {x for i in intervals for x in range(i.start, i.end)}
+
+    window = Interval(20, 90)
+    for _ in range(500):
+        set_a = random_set()
+        set_b = random_set()
+        pa = points(set_a)
+        pb = points(set_b)
+        a = IntervalSet(set_a)
+        b = IntervalSet(set_b)
+        assert points(normalize(set_a)) == pa
+        assert len(normalize(set_a)) == len(a)
+        ordered = ordered_list(set_a)
+        assert all(x.end < y.start for x, y in pairwise(ordered))
+        assert points((a | b).intervals()) == pa | pb
+        assert points((a & b).intervals()) == pa & pb
+        assert points((a - b).intervals()) == pa - pb
+        assert points(a.crop(window).intervals()) == pa & points({window})
+        assert points(negation(set_a, window)) == points({window}) - pa
+        assert a.size() == len(pa)
+        for x in range(-1, 120):
+            assert (x in a) == (x in pa)
+            y = a.next_outside(x)
+            assert y not in pa and all(z in pa for z in range(x, y))
+        isolated, mergable = mergability(set_a)
+        assert isolated | mergable == set_a
+        assert all(not mergable_intervals(set_a, i) for i in isolated)
+        assert all(mergable_intervals(set_a, i) for i in mergable)
+
+
+def test_piecewise_map():
+    """Against plain functions over a range of points"""
+    rnd = Random(5)
+
+    def random_map():
+        pieces = []
+        a = rnd.randint(-5, 10)
+        for _ in range(rnd.randint(0, 6)):
+            b = a + rnd.randint(1, 12)
+            pieces.append((a, b, rnd.randint(-20, 20)))
+            a = b + rnd.randint(0, 5)
+        return PiecewiseMap(pieces)
+
+    def permutation_map():
+        # shuffle some blocks of a range like the almanac does
+        cuts = sorted(rnd.sample(range(1, 60), 5))
+        blocks = list(pairwise([0] + cuts + [60]))
+        targets = blocks[:]
+        rnd.shuffle(targets)
+        pieces = []
+        dst = 0
+        for a, b in targets:
+            pieces.append((a, b, dst - a))
+            dst += b - a
+        return PiecewiseMap(pieces)
+
+    xs = range(-40, 120)
+    for _ in range(300):
+        f = random_map()
+        g = random_map()
+        h = f.then(g)
+        assert all(h(x) == g(f(x)) for x in xs)
+        assert compose(f, g, f) == h.then(f)
+
+        intervals = IntervalSet(
+            (a, a + rnd.randint(1, 10)) for a in rnd.sample(range(-30, 100), 6)
+        )
+        points = [x for a, b in intervals for x in range(a, b)]
+        expected = IntervalSet((h(x), h(x) + 1) for x in points)
+        assert h.apply(intervals) == expected
+
+        p = compose(permutation_map(), permutation_map())
+        q = p.invert()
+        assert all(q(p(x)) == x for x in xs)
+        assert p.then(q) == PiecewiseMap()
+
+    try:
+        PiecewiseMap([(0, 10, 5)]).invert()
+        assert False
+    except ValueError:
+        pass
+
+
+# test_interval_set()
+# test_piecewise_map()
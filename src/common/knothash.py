@@ -0,0 +1,109 @@
+"""Knot hash (2017 days 10 and 14)
+
+The list is kept rotated so the current position is always at the front.
+Each twist is then a reversal of the leading slice followed by a rotation,
+both done with slices rather than swapping one pair at a time with modular
+indexes. The rotations are added up and undone at the end.
+
+    sparse_hash(lengths, size, rounds)  the list after the rounds of twists
+    knot_hash(s)                        the 16 byte dense hash of a string
+    knot_hashes(keys)                   the dense hashes of many strings
+    disk_rows(key)                      2017.14 rows as ints, bit c = column c
+
+The dense hash is bytes, so dense.hex() is the usual output, to_bits(dense)
+the binary string and to_int(dense) a 128 bit row of a bitmap.
+"""
+
+from functools import reduce
+from operator import xor
+
+SUFFIX = (17, 31, 73, 47, 23)
+
+
+def sparse_hash(lengths, size: int = 256, rounds: int = 1) -> list:
+    """The list 0..size-1 after twisting by each length for each round"""
+    lst = list(range(size))
+    offset = 0  # where the front of lst is in the original list
+    skip = 0
+    for _ in range(rounds):
+        for l in lengths:
+            k = (l + skip) % size
+            twisted = lst[l - 1 :: -1] if l else []
+            if k >= l:
+                lst = lst[k:] + twisted + lst[l:k]
+            else:
+                lst = twisted[k:] + lst[l:] + twisted[:k]
+            offset += k
+            skip += 1
+    front = -offset % size
+    return lst[front:] + lst[:front]
+
+
+def dense_hash(sparse: list) -> bytes:
+    """xor each block of 16"""
+    return bytes(reduce(xor, sparse[i : i + 16]) for i in range(0, len(sparse), 16))
+
+
+def key_lengths(s: str) -> list:
+    """The lengths for a string key"""
+    return [ord(c) for c in s] + list(SUFFIX)
+
+
+def knot_hash(s: str) -> bytes:
+    """The dense hash of the string s"""
+    return dense_hash(sparse_hash(key_lengths(s), rounds=64))
+
+
+def knot_hashes(keys) -> list:
+    """The dense hashes of all the keys"""
+    return [knot_hash(s) for s in keys]
+
+
+def to_bits(dense: bytes) -> str:
+    """The dense hash as a binary string"""
+    return "".join(f"{d:08b}" for d in dense)
+
+
+def to_int(dense: bytes) -> int:
+    """The dense hash as an int with the first bit of the hash as bit 0"""
+    return int(to_bits(dense)[::-1], 2)
+
+
+def disk_rows(key: str, n: int = 128) -> list:
+    """The 2017.14 disk as a bitmap, n rows of 128 bits"""
+    return [to_int(d) for d in knot_hashes(f"{key}-{r}" for r in range(n))]
+
+
+def test_knothash():
+    """Test against the one swap at a time version"""
+
+    def slow(lengths, size, rounds):
+        lst = list(range(size))
+        cp = skip = 0
+        for _ in range(rounds):
+            for l in lengths:
+                for i in range((l + 1) // 2):
+                    i1 = (cp + i) % size
+                    i2 = (cp - i + l - 1) % size
+                    lst[i1], lst[i2] = lst[i2], lst[i1]
+                cp += l + skip
+                skip += 1
+        return lst
+
+    for lengths, size in (([3, 4, 1, 5], 5), ([0, 5, 2, 5, 1], 5), ([7, 0, 9], 9)):
+        for rounds in (1, 2, 7):
+            assert sparse_hash(lengths, size, rounds) == slow(lengths, size, rounds)
+    assert sparse_hash([3, 4, 1, 5], 5) == [3, 4, 2, 1, 0]
+
+    assert knot_hash("").hex() == "a2582a3a0e66e6e86e3812dcb672a272"
+    assert knot_hash("AoC 2017").hex() == "33efeb34ea91902bb2f59c9920caa6cd"
+    assert knot_hash("1,2,3").hex() == "3efbe78a8d82f29979031a4aa0b16a9d"
+
+    rows = disk_rows("flqrgnkx", 8)
+    bits = [to_bits(d) for d in knot_hashes(f"flqrgnkx-{r}" for r in range(8))]
+    assert [b[:8] for b in bits[:3]] == ["11010100", "01010101", "00001010"]
+    for row, b in zip(rows, bits):
+        assert all((row >> c & 1) == int(x) for c, x in enumerate(b))
+
+
+# test_knothash()
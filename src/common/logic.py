@@ -69,11 +69,267 @@ def resolve_injective_mappings(possibilities):
     return False, current_map
 
 
-def exact_cover(X, Y):
-    """We are looking for any Y* ⊂ Y such that Y* partitions X"""
-    X = transform_X_constraints(X, Y)
-    for solution in alg_x(X, Y, []):
-        yield solution
+def exact_cover(X, Y, secondary=(), first_only=False):
+    """We are looking for any Y* ⊂ Y such that Y* partitions X
+
+    secondary constraints may be met at most once rather than exactly once.
+    With first_only the search stops at the first solution."""
+    dlx = DancingLinks(X, Y, secondary=secondary)
+    yield from dlx.solutions(first_only=first_only)
+
+
+def count_exact_covers(X, Y, secondary=()) -> int:
+    """Return the number of solutions without building any of them"""
+    return DancingLinks(X, Y, secondary=secondary).count()
+
+
+#
+# Dancing links
+#
+
+
+class DancingLinks:
+    """Knuth's Algorithm X using dancing links (DLX)
+
+    The sparse matrix is held in flat lists indexed by node, the left, right,
+    up and down links plus the column of each node. Node 0 is the root, nodes
+    1..n are the column headers and the rest are the 1s, row by row. Covering
+    a column unlinks it and the rows that meet it, uncovering just relinks
+    them in reverse, so nothing is rebuilt going up and down the search.
+
+    Secondary columns are not linked to the root, so they are never chosen
+    to branch on and need not be met, but a row using one still covers it.
+    """
+
+    def __init__(self, X, Y: dict, secondary=()) -> None:
+        columns = list(X) + [j for j in secondary if j not in X]
+        self.primary = len(X)
+        col_index = {j: c + 1 for c, j in enumerate(columns)}
+        n = len(columns)
+
+        # headers, linking only the primary columns to the root
+        self.left = left = list(range(-1, n))
+        self.right = right = list(range(1, n + 2))
+        left[0] = self.primary
+        right[self.primary] = 0
+        for c in range(self.primary + 1, n + 1):
+            left[c] = right[c] = c
+        self.up = up = list(range(n + 1))
+        self.down = down = list(range(n + 1))
+        self.column = column = list(range(n + 1))
+        self.size = size = [0] * (n + 1)
+        self.row_of = row_of = [None] * (n + 1)
+
+        for key, row in Y.items():
+            first = None
+            for j in dict.fromkeys(row):
+                c = col_index[j]
+                x = len(column)
+                column.append(c)
+                row_of.append(key)
+                # add to the bottom of the column
+                up.append(up[c])
+                down.append(c)
+                down[up[c]] = x
+                up[c] = x
+                size[c] += 1
+                # and to the end of the row
+                if first is None:
+                    first = x
+                    left.append(x)
+                    right.append(x)
+                else:
+                    left.append(left[first])
+                    right.append(first)
+                    right[left[first]] = x
+                    left[first] = x
+
+    def _cover(self, c):
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, c):
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    def _choose(self):
+        """The primary column with the fewest rows, None when all are met"""
+        right, size = self.right, self.size
+        c = right[0]
+        if c == 0:
+            return None
+        best = c
+        while c != 0:
+            if size[c] < size[best]:
+                best = c
+                if size[c] < 2:
+                    break
+            c = right[c]
+        return best
+
+    def _select(self, r):
+        """Cover the other columns of the row r"""
+        j = self.right[r]
+        while j != r:
+            self._cover(self.column[j])
+            j = self.right[j]
+
+    def _deselect(self, r):
+        j = self.left[r]
+        while j != r:
+            self._uncover(self.column[j])
+            j = self.left[j]
+
+    def _search(self, solution):
+        c = self._choose()
+        if c is None:
+            yield [self.row_of[r] for r in solution]
+            return
+        if self.size[c] == 0:
+            return
+
+        self._cover(c)
+        down = self.down
+        r = down[c]
+        while r != c:
+            solution.append(r)
+            self._select(r)
+            yield from self._search(solution)
+            self._deselect(r)
+            solution.pop()
+            r = down[r]
+        self._uncover(c)
+
+    def solutions(self, first_only=False):
+        """Generate the solutions as lists of the keys of Y"""
+        for solution in self._search([]):
+            yield solution
+            if first_only:
+                return
+
+    def count(self) -> int:
+        """The number of solutions"""
+        c = self._choose()
+        if c is None:
+            return 1
+        if self.size[c] == 0:
+            return 0
+
+        total = 0
+        self._cover(c)
+        down = self.down
+        r = down[c]
+        while r != c:
+            self._select(r)
+            total += self.count()
+            self._deselect(r)
+            r = down[r]
+        self._uncover(c)
+        return total
+
+
+def test_exact_cover():
+    """Test DLX against the dict based Algorithm X"""
+    # Knuth's example
+    X = "ABCDEFG"
+    Y = {
+        "a": "CEF",
+        "b": "ADG",
+        "c": "BCF",
+        "d": "AD",
+        "e": "BG",
+        "f": "DEG",
+    }
+    assert [sorted(s) for s in exact_cover(X, Y)] == [["a", "d", "e"]]
+    assert count_exact_covers(X, Y) == 1
+    assert list(exact_cover(X, {})) == []
+    assert list(exact_cover([], {})) == [[]]
+
+    # domino tilings of a 6x6 board
+    def domino_tilings(sz):
+        X = [(r, c) for r in range(sz) for c in range(sz)]
+        Y = {}
+        for r, c in X:
+            if c + 1 < sz:
+                Y[(r, c, "h")] = [(r, c), (r, c + 1)]
+            if r + 1 < sz:
+                Y[(r, c, "v")] = [(r, c), (r + 1, c)]
+        return X, Y
+
+    X, Y = domino_tilings(4)
+    assert count_exact_covers(X, Y) == 36
+    found = {frozenset(s) for s in exact_cover(X, Y)}
+    expected = {frozenset(s) for s in alg_x(transform_X_constraints(X, Y), Y, [])}
+    assert found == expected
+    X, Y = domino_tilings(6)
+    assert count_exact_covers(X, Y) == 6728
+
+    # n queens, the diagonals are secondary
+    def queens(n):
+        X = [("r", i) for i in range(n)] + [("c", i) for i in range(n)]
+        diagonals = [("d", i) for i in range(2 * n - 1)]
+        diagonals += [("a", i) for i in range(2 * n - 1)]
+        Y = {
+            (r, c): [("r", r), ("c", c), ("d", r + c), ("a", r - c + n - 1)]
+            for r in range(n)
+            for c in range(n)
+        }
+        return X, Y, diagonals
+
+    X, Y, diagonals = queens(8)
+    assert count_exact_covers(X, Y, secondary=diagonals) == 92
+    assert len(list(exact_cover(X, Y, secondary=diagonals, first_only=True))) == 1
+
+    # a sudoku
+    puzzle = (
+        "53..7....6..195....98....6.8...6...34..8.3.."
+        "17...2...6.6....28....419..5....8..79"
+    )
+    X = []
+    for i in range(9):
+        for j in range(9):
+            X += [("rc", i, j), ("rn", i, j + 1), ("cn", i, j + 1), ("bn", i, j + 1)]
+    Y = {}
+    for r in range(9):
+        for c in range(9):
+            b = (r // 3) * 3 + c // 3
+            for n in range(1, 10):
+                if puzzle[r * 9 + c] in (".", str(n)):
+                    Y[(r, c, n)] = [
+                        ("rc", r, c),
+                        ("rn", r, n),
+                        ("cn", c, n),
+                        ("bn", b, n),
+                    ]
+    solutions = list(exact_cover(X, Y))
+    assert len(solutions) == 1
+    grid = {(r, c): n for r, c, n in solutions[0]}
+    assert "".join(str(grid[(0, c)]) for c in range(9)) == "534678912"
+
+
+# test_exact_cover()
 
 
 def transform_X_constraints(X, Y):
@@ -1,9 +1,11 @@
 """Number theory stuff"""
 
-from collections import Counter, defaultdict
-from functools import lru_cache, reduce
-from itertools import combinations, islice, pairwise, product
-from math import ceil, comb, floor, lcm, prod, sqrt, gcd
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+from itertools import combinations, compress, islice, pairwise, product
+from math import ceil, comb, floor, isqrt, lcm, prod, sqrt, gcd
 from sys import getrecursionlimit, setrecursionlimit
 
 
@@ -58,73 +60,106 @@ def integer_root(n: int, e: int):
     return None
 
 
-def prime_list(n):
-    """Return all the primes up to n
-    PREFER list_of_primes()"""
-    if n <= 2:
-        return []
-    sieve = [True] * (n + 1)
-    for x in range(3, int(n**0.5) + 1, 2):
-        for y in range(3, (n // x) + 1, 2):
-            sieve[(x * y)] = False
-
-    return [2] + [i for i in range(3, n, 2) if sieve[i]]
+#
+# Primes
+#
+# One odd-only bytearray sieve, run in segments, feeds a module level cache
+# of primes that is extended on demand. A smallest prime factor table is
+# cached in the same way, so factorising lots of numbers costs one sieve.
+#
 
+SIEVE_SEGMENT = 1 << 18
+SPF_LIMIT = 1 << 21
 
-# or if generating primes with no limit
+_prime_cache = {"primes": [2, 3, 5, 7], "limit": 11}
+_spf_cache = {"table": array("I", [0, 1]), "limit": 1}
 
 
-def generate_primes():
-    """Generate an infinite sequence of prime numbers."""
-    # Maps composites to primes witnessing their compositeness.
-    # This is memory efficient, as the sieve is not "run forward"
-    # indefinitely, but only as long as required by the current
-    # number being tested.
-    #
-    D = {}
-
-    # The running integer that's checked for primeness
-    q = 2
-
-    while True:
-        if q not in D:
-            # q is a new prime.
-            # Yield it and mark its first multiple that isn't
-            # already marked in previous iterations
-            #
-            yield q
-            D[q * q] = [q]
-        else:
-            # q is composite. D[q] is the list of primes that
-            # divide it. Since we've reached q, we no longer
-            # need it in the map, but we'll mark the next
-            # multiples of its witnesses to prepare for larger
-            # numbers
-            #
-            for p in D[q]:
-                D.setdefault(p + q, []).append(p)
-            del D[q]
+def _sieve_segment(lo, hi, base_primes) -> list:
+    """Return the primes in [lo, hi), lo is odd
+    base_primes are the odd primes up to sqrt(hi)"""
+    size = (hi - lo + 1) // 2
+    seg = bytearray(b"\x01") * size
+    for p in base_primes:
+        pp = p * p
+        if pp >= hi:
+            break
+        start = max(pp, (lo + p - 1) // p * p)
+        if start % 2 == 0:
+            start += p
+        i = (start - lo) // 2
+        if i < size:
+            seg[i::p] = bytes(len(range(i, size, p)))
+    return list(compress(range(lo, hi, 2), seg))
+
+
+def _extend_primes(n):
+    """Make sure the cache holds all the primes <= n"""
+    if n < _prime_cache["limit"]:
+        return
+    hi = max(n + 1, 2 * _prime_cache["limit"])
+    root = isqrt(hi)
+    _extend_primes(root)
+    limit = _prime_cache["limit"]
+    primes = _prime_cache["primes"]
+    base_primes = primes[1 : bisect_right(primes, root)]
+    for lo in range(limit, hi, 2 * SIEVE_SEGMENT):
+        seg_hi = min(lo + 2 * SIEVE_SEGMENT, hi)
+        primes.extend(_sieve_segment(lo, seg_hi, base_primes))
+    # keep the limit odd so segments always start on an odd number
+    _prime_cache["limit"] = hi | 1
 
-        q += 1
 
+def list_of_primes(n):
+    """Return all the primes <= n as a list"""
+    _extend_primes(n)
+    primes = _prime_cache["primes"]
+    return primes[: bisect_right(primes, n)]
 
-# for x in generate_primes():
-#     print(x)
-#     if x > 100:
-#         break
 
-# l = list(islice(generate_primes(), 50))
-# print(l)
+def prime_list(n):
+    """Return all the primes up to n, same as list_of_primes()"""
+    return list_of_primes(n)
 
 
-def list_of_primes(n):
-    """Return all the primes <= n as a list"""
-    l = []
-    for p in generate_primes():
-        if p > n:
-            break
-        l.append(p)
-    return l
+def generate_primes():
+    """Generate an infinite sequence of prime numbers
+    Walks the cache, doubling it when we run off the end"""
+    i = 0
+    while True:
+        primes = _prime_cache["primes"]
+        while i < len(primes):
+            yield primes[i]
+            i += 1
+        _extend_primes(_prime_cache["limit"])
+
+
+def spf_table(n) -> array:
+    """Return a table of the smallest prime factor of 0..n (at least)
+    The same cached table grows as needed, so don't change it"""
+    if n <= _spf_cache["limit"]:
+        return _spf_cache["table"]
+    n = max(n, 2 * _spf_cache["limit"])
+    spf = array("I", range(n + 1))
+    primes = list_of_primes(isqrt(n))
+    # largest first, so the smallest prime is the one left behind
+    for p in reversed(primes):
+        start = p * p
+        spf[start::p] = array("I", [p]) * len(range(start, n + 1, p))
+    _spf_cache["table"] = spf
+    _spf_cache["limit"] = n
+    return spf
+
+
+def phi_table(n) -> list:
+    """Return Euler's totient of 0..n as a list"""
+    spf = spf_table(n)
+    phis = [0, 1] + [0] * (n - 1)
+    for i in range(2, n + 1):
+        p = spf[i]
+        m = i // p
+        phis[i] = phis[m] * (p if m % p == 0 else p - 1)
+    return phis
 
 
 # def phi_safe(n):
@@ -140,10 +175,21 @@ def list_of_primes(n):
 
 def prime_factors(n):
     """Return all the prime factors of n
-    360: [2, 2, 2, 3, 3, 5]"""
-    primes = list_of_primes(int(sqrt(n)) + 1)
+    360: [2, 2, 2, 3, 3, 5]
+    Read off the smallest prime factor table when n is small enough,
+    otherwise trial division by the cached primes"""
     factors = []
-    for p in primes:
+    if n <= SPF_LIMIT:
+        spf = spf_table(n)
+        while n > 1:
+            p = spf[n]
+            factors.append(p)
+            n //= p
+        return factors
+
+    for p in list_of_primes(isqrt(n)):
+        if p * p > n:
+            break
         while n % p == 0:
             factors.append(p)
             n = n // p
@@ -171,11 +217,10 @@ def phi(n):
 
 
 def factors(n):
-    return set(
-        reduce(
-            list.__add__, ([i, n // i] for i in range(1, int(n**0.5) + 1) if n % i == 0)
-        )
-    )
+    """Return the set of all the factors of n"""
+    if n == 1:
+        return {1}
+    return factors_from_prime_factors(prime_factorized(n))
 
 
 def factors_from_prime_factors(pfs):
@@ -188,6 +233,112 @@ def factors_from_prime_factors(pfs):
 # assert f1 == f2
 
 
+def test_primes():
+    """Test the sieve and the factor tables against the slow ways"""
+
+    def is_prime(n):
+        return n > 1 and all(n % d for d in range(2, isqrt(n) + 1))
+
+    assert list_of_primes(1) == []
+    assert list_of_primes(2) == [2]
+    assert list_of_primes(30) == [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    assert list(islice(generate_primes(), 10)) == list_of_primes(29)
+    assert list_of_primes(5000) == [n for n in range(5001) if is_prime(n)]
+    big = list_of_primes(2_000_000)
+    assert len(big) == 148933
+    assert list_of_primes(1000) == big[:168]
+
+    assert prime_factors(360) == [2, 2, 2, 3, 3, 5]
+    assert prime_factorized(360) == [(2, 3), (3, 2), (5, 1)]
+    assert prime_factors(2**31 - 1) == [2**31 - 1]
+    assert prime_factors(600851475143) == [71, 839, 1471, 6857]
+    assert factors(1) == {1}
+    assert factors(28) == {1, 2, 4, 7, 14, 28}
+
+    phis = phi_table(1000)
+    for n in range(1, 1001):
+        assert phis[n] == sum(1 for k in range(1, n + 1) if gcd(n, k) == 1)
+        assert phis[n] == phi(n)
+        assert prod(prime_factors(n)) == n
+
+
+#
+# Divisor sums
+#
+
+
+def divisor_sums(lo, hi, max_multiples=None) -> list:
+    """Return the sum of the divisors of each n in [lo, hi), lo > 0
+
+    With max_multiples = k a divisor d of n only counts if n is one of its
+    first k multiples, i.e. n / d <= k.
+
+    Each divisor d = n / j is added by striding over the multiples of j, so
+    the work for the range is about (hi - lo) x log(k). With no limit the
+    divisors are taken in pairs (j, n / j) for j < sqrt(n), so j only runs
+    up to sqrt(hi).
+    """
+    size = hi - lo
+    sums = [0] * size
+
+    def add_strided(first, step, extra):
+        # sums[n] += n // step + extra, for n = first, first + step, ...
+        i = first - lo
+        q = first // step + extra
+        terms = range(q, q + len(range(i, size, step)))
+        sums[i::step] = [s + t for s, t in zip(sums[i::step], terms)]
+
+    if max_multiples is None:
+        for j in range(1, isqrt(hi - 1) + 1):
+            # pairs (j, n // j) with j < n // j
+            first = max(j * (j + 1), -(-lo // j) * j)
+            if first < hi:
+                add_strided(first, j, j)
+            if lo <= j * j < hi:
+                sums[j * j - lo] += j
+        return sums
+
+    for j in range(1, min(max_multiples, hi - 1) + 1):
+        first = max(j, -(-lo // j) * j)
+        if first < hi:
+            add_strided(first, j, 0)
+    return sums
+
+
+def first_divisor_sum_at_least(
+    target, max_multiples=None, start=1, chunk=1 << 16
+) -> int:
+    """Return the first n >= start whose divisor sum is >= target
+    The sums are found a chunk at a time so memory stays bounded"""
+    lo = start
+    while True:
+        sums = divisor_sums(lo, lo + chunk, max_multiples)
+        for i, s in enumerate(sums):
+            if s >= target:
+                return lo + i
+        lo += chunk
+
+
+def test_divisor_sums():
+    """Test against the sum of the factors"""
+    n = 2000
+    expected = [sum(factors(i)) for i in range(1, n)]
+    assert divisor_sums(1, n) == expected
+    assert divisor_sums(700, 1300) == expected[699:1299]
+
+    k = 50
+    expected = [sum(d for d in factors(i) if i // d <= k) for i in range(1, n)]
+    assert divisor_sums(1, n, k) == expected
+    assert divisor_sums(777, 1234, k) == expected[776:1233]
+
+    assert first_divisor_sum_at_least(1000) == 360
+    assert first_divisor_sum_at_least(1000, chunk=7) == 360
+    assert first_divisor_sum_at_least(100, max_multiples=2) == 68
+
+
+# test_divisor_sums()
+
+
 def necklace_arrangements_2_colours(n):
     """Only rotational symmetry considered i.e. BBwwB = wwBBB
     Reflection symmetry is ignored i.e. counted twice
@@ -229,6 +380,9 @@ def extended_euclid(a: int, b: int):
     return prv_s, prv_t
 
 
+# test_primes()
+
+
 def test_extended_euclid():
     """Test extended Euclid"""
     a, b = 11, 7
@@ -621,6 +775,20 @@ class Lindenmayer:
 # assert l1 == l2
 
 
+class StateIndex(dict):
+    """Maps each state to its index in the iteration, with .states the list
+    of them in index order so the state at an index is a lookup"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.states = []
+
+    def add(self, state, idx: int):
+        """Record state as seen at idx (the next index)"""
+        self[state] = idx
+        self.states.append(state)
+
+
 def get_congruence_classes_from_simulation(
     iter_func: callable, initial_model, state_transform=None
 ):
@@ -631,7 +799,8 @@ def get_congruence_classes_from_simulation(
 
     iter_func should return the next iterative state given the current state.
 
-    Previous states list of dicts, each one maps state to index in the iteration.
+    Previous states list of StateIndex, each one maps state to index in the
+    iteration and holds the states in index order.
     """
     model = initial_model
 
@@ -642,7 +811,7 @@ def get_congruence_classes_from_simulation(
 
     cnt = 0
     congruence_classes = [None] * dimensions
-    prv_states = [defaultdict(int)] * dimensions
+    prv_states = [StateIndex() for _ in range(dimensions)]
     while any(cc is None for cc in congruence_classes):
         for d in range(dimensions):
             dimension_state = state[d]
@@ -653,7 +822,7 @@ def get_congruence_classes_from_simulation(
                 m = cnt - a
                 congruence_classes[d] = (a, m)
                 continue
-            prv_states[d][dimension_state] = cnt
+            prv_states[d].add(dimension_state, cnt)
 
         model = iter_func(model)
         state = model
@@ -672,11 +841,9 @@ def get_state_at_index(congruence_classes, prev_states, idx):
     state = []
     dimensions = len(congruence_classes)
     for d in range(dimensions):
-        # reverse the mapping so we have index -> state
-        state_list = [s for s, _ in sorted(prev_states[d].items(), key=lambda x: x[1])]
         a, m = congruence_classes[d]
-        psi = ((idx - a) % m) + a
-        state.append(state_list[psi])
+        psi = idx if idx < a else ((idx - a) % m) + a
+        state.append(prev_states[d].states[psi])
     return tuple(state)
 
 
@@ -685,7 +852,8 @@ def get_congruence_classes_from_simulation_1D(
 ):
     """Return tuple (Congruence Class, Previous States)
     Congruence Class: (a,m) repeats every m from index a
-    Previous States : dict keyed on state giving the iteration index
+    Previous States : StateIndex, dict keyed on state giving the iteration
+                      index, with the states in index order
 
     Use get_state_at_index_1D(Congruence Class, Previous States, idx) to
     get the state at a given iteration index.
@@ -701,7 +869,7 @@ def get_congruence_classes_from_simulation_1D(
 
     cnt = 0
     congruence_class = None
-    prv_states = {}
+    prv_states = StateIndex()
     while True:
 
         if state in prv_states:
@@ -710,7 +878,7 @@ def get_congruence_classes_from_simulation_1D(
             congruence_class = (a, m)
             break
 
-        prv_states[state] = cnt
+        prv_states.add(state, cnt)
 
         model = iter_func(model)
         state = model
@@ -723,8 +891,6 @@ def get_congruence_classes_from_simulation_1D(
 
 def get_state_at_index_1D(congruence_classes, prev_states, idx):
     """state as a single dimension, so we return a single state value"""
-    # reverse the mapping so we have index -> state
-    state_list = [s for s, _ in sorted(prev_states.items(), key=lambda x: x[1])]
     a, m = congruence_classes
-    psi = ((idx - a) % m) + a
-    return state_list[psi]
+    psi = idx if idx < a else ((idx - a) % m) + a
+    return prev_states.states[psi]
@@ -0,0 +1,1074 @@
+"""Register machines for the assembly style puzzles
+
+The source is parsed into a list of tuples (op, *args) where an arg is an
+int or a register name. This is the IR, and what tgl style instructions
+change as the program runs.
+
+Rather than dispatch on the op string for every instruction, the machine
+compiles a basic block at a time into a python function with exec. A block
+runs from its entry point to the first jump (or anything that needs the
+machine, like tgl or reading input) and returns the next ip. The blocks are
+cached on their entry point so after the first time round a loop it is all
+straight python.
+
+    vm = RegisterVM.from_lines(raw_data, "assembunny")
+    vm["c"] = 1
+    vm.run()
+    vm["a"]
+
+Dialects
+
+    assembunny:     2016/12, 23, 25     cpy inc dec jnz tgl out
+    turing:         2015/23             hlf tpl inc jmp jie jio
+    duet:           2017/18, 23         snd set add sub mul mod rcv jgz jnz
+    elfcode:        2018/16, 19, 21     addr .. eqrr and #ip binding
+    handheld:       2020/08             acc jmp nop
+    alu:            2021/24             inp add mul div mod eql
+    chronospatial:  2024/17             the 3 bit opcodes with combo operands
+
+run() returns why it stopped, one of HALT, WAIT (input needed), LIMIT
+(max_steps reached, checked per block), OUTPUT (max_output reached) or
+BREAK (about to run a breakpoint). Calling run() again carries on. step()
+runs just one instruction, returning BREAK unless it halted.
+
+Loop idioms
+
+With optimise=True the compiler looks for loops it knows, like adding by
+counting down to 0, multiplying with a nested pair of those, or scanning for
+divisors. Such a loop gets a fast path in front of it, guarded on the
+register values it is exact for; when the guard fails the loop runs as it
+is. The loops found and how often each fast path ran are in idioms().
+Skipped iterations are not counted in steps or op_counts().
+
+    assembunny:     decrement to zero, multiply add
+    duet:           divisor scan, nested divisor scan (2017/23)
+    elfcode:        divisor sum, nested divisor sum (2018/19), division (2018/21)
+"""
+
+from collections import Counter, deque, namedtuple
+from common.numty import factors
+
+HALT = "halt"
+WAIT = "wait"
+LIMIT = "limit"
+OUTPUT = "output"
+BREAK = "break"
+
+
+def _tdiv(a, b):
+    """Integer division truncating towards 0"""
+    q = a // b
+    if q < 0 and q * b != a:
+        q += 1
+    return q
+
+
+#
+# Dialects
+#
+
+
+class Dialect:
+    """How to parse and compile an instruction set
+
+    emit(vm, ins, k) returns (lines, exit) for the instruction at k, the
+    lines of python and an expression for the next ip if it ends the block
+    (None to carry on). Or None if the machine has to do it, in which case
+    execute(vm, ins, k) does it and returns the next ip (None to wait).
+    Each of idioms(vm, k) returns an Idiom if its loop starts at k.
+    """
+
+    def __init__(
+        self,
+        name,
+        emit,
+        registers=None,
+        parse=None,
+        execute=None,
+        toggle=None,
+        idioms=(),
+    ) -> None:
+        self.name = name
+        self.emit = emit
+        self.registers = registers
+        self.parse = parse or parse_words
+        self.execute = execute
+        self.toggle = toggle
+        self.idioms = idioms
+
+
+def parse_words(lines) -> list:
+    """One instruction per line, words split on spaces and commas"""
+    program = []
+    for line in lines:
+        words = line.replace(",", " ").split()
+        if not words:
+            continue
+        args = []
+        for w in words[1:]:
+            try:
+                w = int(w)
+            except ValueError:
+                pass
+            args.append(w)
+        program.append((words[0], *args))
+    return program
+
+
+def _jump(vm, k, cond, offset) -> str:
+    """Expression for a relative jump if cond (python) is true"""
+    if isinstance(offset, int):
+        target = str(k + offset)
+    else:
+        target = f"({k} + {vm.value(offset, k)})"
+    if cond is None:
+        return target
+    return f"{target} if {cond} else {k + 1}"
+
+
+def _emit_assembunny(vm, ins, k):
+    op = ins[0]
+    if op == "tgl":
+        return None
+    if op == "out":
+        return [f"out({vm.value(ins[1], k)})"], str(k + 1)
+    if op == "jnz":
+        x, y = ins[1], ins[2]
+        if isinstance(x, int):
+            return [], (_jump(vm, k, None, y) if x else None)
+        return [], _jump(vm, k, vm.value(x, k), y)
+
+    # anything toggled into nonsense (like cpy 1 2) is skipped
+    dst = ins[2] if op == "cpy" else ins[1]
+    if not vm.is_register(dst):
+        return [], None
+    if op == "cpy":
+        return [f"{vm.target(dst)} = {vm.value(ins[1], k)}"], None
+    if op == "inc":
+        return [f"{vm.target(dst)} += 1"], None
+    if op == "dec":
+        return [f"{vm.target(dst)} -= 1"], None
+    raise ValueError(f"Unknown instruction {ins}")
+
+
+def _execute_assembunny(vm, ins, k):
+    """tgl"""
+    q = k + vm.read(ins[1])
+    if 0 <= q < len(vm.program):
+        vm.program[q] = _toggle_assembunny(vm.program[q])
+        vm.invalidate(q)
+    return k + 1
+
+
+def _toggle_assembunny(ins):
+    op = ins[0]
+    if len(ins) == 2:
+        return ("dec" if op == "inc" else "inc", *ins[1:])
+    return ("cpy" if op == "jnz" else "jnz", *ins[1:])
+
+
+def _emit_turing(vm, ins, k):
+    op, x = ins[0], ins[1]
+    if op == "hlf":
+        return [f"{vm.target(x)} //= 2"], None
+    if op == "tpl":
+        return [f"{vm.target(x)} *= 3"], None
+    if op == "inc":
+        return [f"{vm.target(x)} += 1"], None
+    if op == "jmp":
+        return [], _jump(vm, k, None, x)
+    if op == "jie":
+        return [], _jump(vm, k, f"{vm.value(x, k)} % 2 == 0", ins[2])
+    if op == "jio":
+        return [], _jump(vm, k, f"{vm.value(x, k)} == 1", ins[2])
+    raise ValueError(f"Unknown instruction {ins}")
+
+
+_DUET_OPS = {"set": "=", "add": "+=", "sub": "-=", "mul": "*=", "mod": "%="}
+
+
+def _emit_duet(vm, ins, k):
+    op, x = ins[0], ins[1]
+    if op == "rcv":
+        return None
+    if op == "snd":
+        return [f"out({vm.value(x, k)})"], str(k + 1)
+    if op == "jgz":
+        return [], _jump(vm, k, f"{vm.value(x, k)} > 0", ins[2])
+    if op == "jnz":
+        return [], _jump(vm, k, f"{vm.value(x, k)} != 0", ins[2])
+    if op in _DUET_OPS:
+        return [f"{vm.target(x)} {_DUET_OPS[op]} {vm.value(ins[2], k)}"], None
+    raise ValueError(f"Unknown instruction {ins}")
+
+
+def _execute_read(vm, ins, k):
+    """rcv or inp, take the next input or wait for it"""
+    if not vm.input:
+        return None
+    vm[ins[1]] = vm.input.popleft()
+    return k + 1
+
+
+# op: (expression, a is a register, b is a register)
+ELFCODE_OPS = {
+    "addr": ("{a} + {b}", True, True),
+    "addi": ("{a} + {b}", True, False),
+    "mulr": ("{a} * {b}", True, True),
+    "muli": ("{a} * {b}", True, False),
+    "banr": ("{a} & {b}", True, True),
+    "bani": ("{a} & {b}", True, False),
+    "borr": ("{a} | {b}", True, True),
+    "bori": ("{a} | {b}", True, False),
+    "setr": ("{a}", True, None),
+    "seti": ("{a}", False, None),
+    "gtir": ("1 if {a} > {b} else 0", False, True),
+    "gtri": ("1 if {a} > {b} else 0", True, False),
+    "gtrr": ("1 if {a} > {b} else 0", True, True),
+    "eqir": ("1 if {a} == {b} else 0", False, True),
+    "eqri": ("1 if {a} == {b} else 0", True, False),
+    "eqrr": ("1 if {a} == {b} else 0", True, True),
+}
+
+
+_ELFCODE_FUNCS = {
+    op: eval("lambda a, b: " + fmt.format(a="a", b="b"))  # pylint: disable=eval-used
+    for op, (fmt, _, _) in ELFCODE_OPS.items()
+}
+
+
+def elfcode_op(op, args, registers) -> list:
+    """Return the registers after doing a single instruction (a new list)"""
+    _, a_reg, b_reg = ELFCODE_OPS[op]
+    a, b, c = args
+    after = list(registers)
+    after[c] = _ELFCODE_FUNCS[op](
+        registers[a] if a_reg else a,
+        registers[b] if b_reg else b,
+    )
+    return after
+
+
+def _emit_elfcode(vm, ins, k):
+    op, a, b, c = ins
+    fmt, a_reg, b_reg = ELFCODE_OPS[op]
+    expr = fmt.format(
+        a=vm.value(a, k) if a_reg else a,
+        b=vm.value(b, k) if b_reg else b,
+    )
+    target = vm.target(c)
+    if c == vm.ip_register:
+        # a jump, the ip register is written back to the ip and moved on
+        return [f"{target} = {expr}"], f"{target} + 1"
+    return [f"{target} = {expr}"], None
+
+
+def _emit_handheld(vm, ins, k):
+    op, x = ins
+    if op == "acc":
+        return [f"{vm.target('acc')} += {x}"], None
+    if op == "jmp":
+        return [], str(k + x)
+    if op == "nop":
+        return [], None
+    raise ValueError(f"Unknown instruction {ins}")
+
+
+_ALU_OPS = {"add": "{a} + {b}", "mul": "{a} * {b}", "mod": "{a} % {b}"}
+
+
+def _emit_alu(vm, ins, k):
+    op, a = ins[0], ins[1]
+    if op == "inp":
+        return None
+    b = vm.value(ins[2], k)
+    if op in _ALU_OPS:
+        expr = _ALU_OPS[op].format(a=vm.value(a, k), b=b)
+    elif op == "div":
+        expr = f"tdiv({vm.value(a, k)}, {b})"
+    elif op == "eql":
+        expr = f"1 if {vm.value(a, k)} == {b} else 0"
+    else:
+        raise ValueError(f"Unknown instruction {ins}")
+    return [f"{vm.target(a)} = {expr}"], None
+
+
+CHRONOSPATIAL_OPS = ("adv", "bxl", "bst", "jnz", "bxc", "out", "bdv", "cdv")
+
+
+def chronospatial_program(codes) -> list:
+    """The 3 bit codes as op/operand pairs"""
+    return [
+        (CHRONOSPATIAL_OPS[codes[i]], codes[i + 1]) for i in range(0, len(codes) - 1, 2)
+    ]
+
+
+def parse_chronospatial(lines) -> list:
+    """Register lines are skipped, the program is op/operand pairs"""
+    for line in lines:
+        if line.startswith("Program:"):
+            return chronospatial_program([int(x) for x in line[8:].split(",")])
+    return []
+
+
+def _emit_chronospatial(vm, ins, k):
+    op, x = ins
+    combo = ("0", "1", "2", "3", "r[0]", "r[1]", "r[2]")[x] if x < 7 else None
+    if op in ("adv", "bdv", "cdv"):
+        dst = "r[{}]".format(("adv", "bdv", "cdv").index(op))
+        return [f"{dst} = r[0] >> {combo}"], None
+    if op == "bxl":
+        return [f"r[1] ^= {x}"], None
+    if op == "bst":
+        return [f"r[1] = {combo} & 7"], None
+    if op == "jnz":
+        if x % 2:
+            raise ValueError("jnz to an odd address is not supported")
+        return [], f"{x // 2} if r[0] else {k + 1}"
+    if op == "bxc":
+        return ["r[1] ^= r[2]"], None
+    if op == "out":
+        return [f"out({combo} & 7)"], str(k + 1)
+    raise ValueError(f"Unknown instruction {ins}")
+
+
+#
+# Loop idioms
+#
+
+# A fast path for the loop from k to last. The setup lines can only assign
+# locals, the body runs if guard (python, None for always) then exits to exit.
+Idiom = namedtuple("Idiom", ("name", "setup", "guard", "body", "exit", "last"))
+
+_COMMUTATIVE = {"addr", "mulr", "banr", "borr", "eqrr"}
+
+
+def _bind(env, pattern, args):
+    env = dict(env)
+    for p, a in zip(pattern, args):
+        if isinstance(p, str) and p.startswith("$"):
+            if p != "$_" and env.setdefault(p[1:], a) != a:
+                return None
+        elif p != a:
+            return None
+    return env
+
+
+def _unify(program, k, template, env=None):
+    """Match the program from k against a template, $x binds x to the arg
+    and $_ matches anything. Return the bindings or None
+    The args of commutative ops are tried both ways round."""
+    if env is None:
+        env = {}
+    if not template:
+        return env
+    if k >= len(program):
+        return None
+    pattern, ins = template[0], program[k]
+    if len(pattern) != len(ins) or pattern[0] != ins[0]:
+        return None
+    orders = [ins[1:]]
+    if ins[0] in _COMMUTATIVE:
+        orders.append((ins[2], ins[1], *ins[3:]))
+    for args in orders:
+        found = _bind(env, pattern[1:], args)
+        if found is not None:
+            found = _unify(program, k + 1, template[1:], found)
+            if found is not None:
+                return found
+    return None
+
+
+def _registers_ok(vm, changed, read):
+    """The changed are distinct registers (not the ip) and none are read"""
+    if len(set(changed)) != len(changed):
+        return False
+    if vm.ip_register in changed:
+        return False
+    if not all(vm.is_register(x) for x in changed):
+        return False
+    return not any(vm.is_register(x) and x in changed for x in read)
+
+
+def _multiples(d, b, lo, hi) -> int:
+    """How many e in [lo, hi) have d * e == b"""
+    if d == 0:
+        return max(hi - lo, 0) if b == 0 else 0
+    if b % d:
+        return 0
+    return 1 if lo <= b // d < hi else 0
+
+
+def _counted_loop(vm, head, start):
+    """inc/dec from start then a jnz back to head on a register that moves
+    by 1 each time round. Return (deltas, counter, ip of the jnz)"""
+    program = vm.program
+    deltas = Counter()
+    j = start
+    while j < len(program) and program[j][0] in ("inc", "dec"):
+        ins = program[j]
+        if len(ins) != 2 or not vm.is_register(ins[1]):
+            return None
+        deltas[ins[1]] += 1 if ins[0] == "inc" else -1
+        j += 1
+    if j >= len(program):
+        return None
+    ins = program[j]
+    if len(ins) != 3 or ins[0] != "jnz" or not vm.is_register(ins[1]):
+        return None
+    if ins[2] != head - j or abs(deltas[ins[1]]) != 1:
+        return None
+    return deltas, ins[1], j
+
+
+def _idiom_add_loop(vm, k):
+    """inc a, dec c, jnz c -2 adds c to a"""
+    loop = _counted_loop(vm, k, k)
+    if loop is None:
+        return None
+    deltas, c, j = loop
+    rc = vm.target(c)
+    body = [f"{vm.target(x)} += {d} * n" for x, d in deltas.items() if x != c and d]
+    body.append(f"{rc} = 0")
+    n = rc if deltas[c] < 0 else f"-{rc}"
+    return Idiom("decrement to zero", [f"n = {n}"], "n > 0", body, j + 1, j)
+
+
+def _idiom_multiply_add(vm, k):
+    """cpy x c, an add loop on c, then more inc/dec and jnz d back to the cpy
+    adds x * d times round"""
+    ins = vm.program[k]
+    if ins[0] != "cpy" or len(ins) != 3 or not vm.is_register(ins[2]):
+        return None
+    x, c = ins[1], ins[2]
+    inner = _counted_loop(vm, k + 1, k + 1)
+    if inner is None or inner[1] != c:
+        return None
+    inner_deltas, _, j = inner
+    outer = _counted_loop(vm, k, j + 1)
+    if outer is None:
+        return None
+    outer_deltas, d, last = outer
+    if d == c or inner_deltas[d] or outer_deltas[c]:
+        return None
+    if vm.is_register(x) and (x in (c, d) or inner_deltas[x] or outer_deltas[x]):
+        return None
+
+    rc, rd = vm.target(c), vm.target(d)
+    m = vm.value(x, k)
+    setup = [
+        f"m = {m}" if inner_deltas[c] < 0 else f"m = -{m}",
+        f"n = {rd}" if outer_deltas[d] < 0 else f"n = -{rd}",
+    ]
+    body = []
+    for y in sorted(set(inner_deltas) | set(outer_deltas), key=str):
+        a, b = inner_deltas[y], outer_deltas[y]
+        if y not in (c, d) and (a or b):
+            body.append(f"{vm.target(y)} += ({a} * m + {b}) * n")
+    body += [f"{rc} = 0", f"{rd} = 0"]
+    return Idiom("multiply add", setup, "m > 0 and n > 0", body, last + 1, last)
+
+
+_DUET_SCAN = (
+    ("set", "$g", "$d"),
+    ("mul", "$g", "$e"),
+    ("sub", "$g", "$b"),
+    ("jnz", "$g", 2),
+    ("set", "$f", "$x"),
+    ("sub", "$e", -1),
+    ("set", "$g", "$e"),
+    ("sub", "$g", "$b"),
+    ("jnz", "$g", -8),
+)
+
+_DUET_NESTED_SCAN = (
+    ("set", "$e", "$e0"),
+    *_DUET_SCAN,
+    ("sub", "$d", -1),
+    ("set", "$g", "$d"),
+    ("sub", "$g", "$b"),
+    ("jnz", "$g", -13),
+)
+
+
+def _idiom_divisor_scan(vm, k):
+    """For e counting up to b, set f to x if d * e == b"""
+    env = _unify(vm.program, k, _DUET_SCAN)
+    if env is None:
+        return None
+    g, d, e, b, f, x = (env[v] for v in "gdebfx")
+    if not _registers_ok(vm, (g, e, f), (d, b, x)):
+        return None
+    setup = [f"d = {vm.value(d, k)}", f"e = {vm.value(e, k)}", f"b = {vm.value(b, k)}"]
+    body = [
+        "if multiples(d, b, e, b):",
+        f"    {vm.target(f)} = {vm.value(x, k)}",
+        f"{vm.target(e)} = b",
+        f"{vm.target(g)} = 0",
+    ]
+    return Idiom("divisor scan", setup, "e < b", body, k + 9, k + 8)
+
+
+def _idiom_nested_divisor_scan(vm, k):
+    """For d and e counting up to b, set f to x if d * e == b"""
+    env = _unify(vm.program, k, _DUET_NESTED_SCAN)
+    if env is None:
+        return None
+    g, d, e, b, f, x, e0 = (env[v] for v in ("g", "d", "e", "b", "f", "x", "e0"))
+    if not _registers_ok(vm, (g, d, e, f), (b, x, e0)):
+        return None
+    setup = [
+        f"d = {vm.value(d, k)}",
+        f"e0 = {vm.value(e0, k)}",
+        f"b = {vm.value(b, k)}",
+    ]
+    body = [
+        "if any(d <= q < b and e0 <= b // q < b for q in factors(b)):",
+        f"    {vm.target(f)} = {vm.value(x, k)}",
+        f"{vm.target(d)} = b",
+        f"{vm.target(e)} = b",
+        f"{vm.target(g)} = 0",
+    ]
+    guard = "0 < d < b and e0 < b"
+    return Idiom("nested divisor scan", setup, guard, body, k + 14, k + 13)
+
+
+_ELFCODE_SCAN = (
+    ("mulr", "$o", "$i", "$t"),
+    ("eqrr", "$t", "$n", "$t"),
+    ("addr", "$t", "$p", "$p"),
+    ("addi", "$p", 1, "$p"),
+    ("addr", "$o", "$s", "$s"),
+    ("addi", "$i", 1, "$i"),
+    ("gtrr", "$i", "$n", "$t"),
+    ("addr", "$p", "$t", "$p"),
+    ("seti", "$back", "$_", "$p"),
+)
+
+_ELFCODE_NESTED_SCAN = (
+    ("seti", "$i0", "$_", "$i"),
+    *_ELFCODE_SCAN,
+    ("addi", "$o", 1, "$o"),
+    ("gtrr", "$o", "$n", "$t"),
+    ("addr", "$t", "$p", "$p"),
+    ("seti", "$back2", "$_", "$p"),
+)
+
+_ELFCODE_DIVISION = (
+    ("addi", "$q", 1, "$u"),
+    ("muli", "$u", "$m", "$u"),
+    ("gtrr", "$u", "$d", "$u"),
+    ("addr", "$u", "$p", "$p"),
+    ("addi", "$p", 1, "$p"),
+    ("seti", "$out", "$_", "$p"),
+    ("addi", "$q", 1, "$q"),
+    ("seti", "$back", "$_", "$p"),
+)
+
+
+def _idiom_divisor_sum(vm, k):
+    """For i counting up to n, add o to s if o * i == n"""
+    env = _unify(vm.program, k, _ELFCODE_SCAN)
+    if env is None or env["p"] != vm.ip_register or env["back"] != k - 1:
+        return None
+    o, i, t, n, s, p = (env[v] for v in "oitnsp")
+    if not _registers_ok(vm, (i, t, s), (o, n)) or p in (o, n):
+        return None
+    setup = [f"o = {vm.value(o, k)}", f"i = {vm.value(i, k)}", f"n = {vm.value(n, k)}"]
+    body = [
+        f"{vm.target(s)} += o * multiples(o, n, i, n + 1)",
+        f"{vm.target(i)} = n + 1",
+        f"{vm.target(t)} = 1",
+        f"{vm.target(p)} = {k + 8}",
+    ]
+    return Idiom("divisor sum", setup, "i <= n", body, k + 9, k + 8)
+
+
+def _idiom_nested_divisor_sum(vm, k):
+    """For o and then i counting up to n, add o to s if o * i == n"""
+    env = _unify(vm.program, k, _ELFCODE_NESTED_SCAN)
+    if env is None or env["p"] != vm.ip_register:
+        return None
+    if env["back"] != k or env["back2"] != k - 1:
+        return None
+    o, i, t, n, s, p, i0 = (env[v] for v in ("o", "i", "t", "n", "s", "p", "i0"))
+    if not _registers_ok(vm, (o, i, t, s), (n,)) or p == n:
+        return None
+    setup = [f"o = {vm.value(o, k)}", f"n = {vm.value(n, k)}"]
+    body = [
+        f"{vm.target(s)} += sum(q for q in factors(n) if q >= o and n // q >= {i0})",
+        f"{vm.target(o)} = n + 1",
+        f"{vm.target(i)} = n + 1",
+        f"{vm.target(t)} = 1",
+        f"{vm.target(p)} = {k + 13}",
+    ]
+    guard = f"0 < o <= n and {i0} <= n"
+    return Idiom("nested divisor sum", setup, guard, body, k + 14, k + 13)
+
+
+def _idiom_division(vm, k):
+    """Count q up until (q + 1) * m > d, leaving q as d // m"""
+    env = _unify(vm.program, k, _ELFCODE_DIVISION)
+    if env is None or env["p"] != vm.ip_register or env["back"] != k - 1:
+        return None
+    q, u, d, p, m = (env[v] for v in "qudpm")
+    if m <= 0 or not _registers_ok(vm, (q, u), (d,)) or p == d:
+        return None
+    rq = vm.target(q)
+    body = [
+        f"{rq} = max({rq}, {vm.value(d, k)} // {m})",
+        f"{vm.target(u)} = 1",
+        f"{vm.target(p)} = {env['out']}",
+    ]
+    return Idiom("division", [], None, body, env["out"] + 1, k + 7)
+
+
+DIALECTS = {
+    d.name: d
+    for d in (
+        Dialect(
+            "assembunny",
+            _emit_assembunny,
+            registers="abcd",
+            execute=_execute_assembunny,
+            toggle=_toggle_assembunny,
+            idioms=(_idiom_multiply_add, _idiom_add_loop),
+        ),
+        Dialect("turing", _emit_turing, registers="ab"),
+        Dialect(
+            "duet",
+            _emit_duet,
+            execute=_execute_read,
+            idioms=(_idiom_nested_divisor_scan, _idiom_divisor_scan),
+        ),
+        Dialect(
+            "elfcode",
+            _emit_elfcode,
+            registers=range(6),
+            idioms=(_idiom_nested_divisor_sum, _idiom_divisor_sum, _idiom_division),
+        ),
+        Dialect("handheld", _emit_handheld, registers=("acc",)),
+        Dialect("alu", _emit_alu, registers="wxyz", execute=_execute_read),
+        Dialect(
+            "chronospatial",
+            _emit_chronospatial,
+            registers="ABC",
+            parse=parse_chronospatial,
+        ),
+    )
+}
+
+
+#
+# The machine
+#
+
+
+class RegisterVM:
+    """Runs a program of (op, *args) tuples for a dialect"""
+
+    def __init__(
+        self, program, dialect, registers=None, ip_register=None, optimise=False
+    ):
+        self.dialect = DIALECTS[dialect] if isinstance(dialect, str) else dialect
+        self.program = list(program)
+        if registers is None:
+            registers = self.dialect.registers
+        if registers is None:
+            # every name used in the program
+            registers = sorted(
+                {a for ins in self.program for a in ins[1:] if isinstance(a, str)}
+            )
+        self.names = list(registers)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.r = [0] * len(self.names)
+        self.ip_register = ip_register
+        self.ip = 0
+        self.steps = 0
+        self.input = deque()
+        self.output = []
+        self.breakpoints = set()
+        self.count_ops = False
+        self.optimise = optimise
+        self._blocks = {}
+        self._compiled_breakpoints = set()
+        self._hits = Counter()
+        self._op_counts = Counter()
+        self._idiom_names = {}
+        self._idiom_hits = Counter()
+
+    @classmethod
+    def from_lines(cls, lines, dialect, registers=None, optimise=False):
+        """Parse the source, picking up an #ip n binding"""
+        dialect = DIALECTS[dialect] if isinstance(dialect, str) else dialect
+        ip_register = None
+        source = []
+        for line in lines:
+            if line.startswith("#ip"):
+                ip_register = int(line.split()[1])
+            else:
+                source.append(line)
+        program = dialect.parse(source)
+        return cls(
+            program,
+            dialect,
+            registers=registers,
+            ip_register=ip_register,
+            optimise=optimise,
+        )
+
+    def __getitem__(self, name):
+        return self.r[self.index[name]]
+
+    def __setitem__(self, name, value):
+        self.r[self.index[name]] = value
+
+    def registers(self) -> dict:
+        """Register values by name"""
+        return dict(zip(self.names, self.r))
+
+    def reset(self):
+        """Back to the start, registers, input and output cleared
+        The program (as it is now) and its compiled blocks are kept"""
+        self.r[:] = [0] * len(self.r)
+        self.ip = 0
+        self.steps = 0
+        self.input.clear()
+        self.output.clear()
+
+    #
+    # For the dialects
+    #
+
+    def is_register(self, x) -> bool:
+        """True if x names a register (ints never do outside elfcode)"""
+        if isinstance(x, str):
+            return x in self.index
+        return self.dialect.name == "elfcode"
+
+    def value(self, x, k) -> str:
+        """Python for reading x at instruction k"""
+        if not self.is_register(x):
+            return repr(x)
+        if x == self.ip_register:
+            # the ip is written to its register before every instruction
+            return str(k)
+        return f"r[{self.index[x]}]"
+
+    def target(self, x) -> str:
+        """Python for writing to register x"""
+        return f"r[{self.index[x]}]"
+
+    def read(self, x):
+        """Current value of x"""
+        return self[x] if self.is_register(x) else x
+
+    def invalidate(self, ip=None):
+        """The program has changed, forget the compiled blocks
+        or just the ones containing ip"""
+        self._fold_hits()
+        if ip is None:
+            self._blocks.clear()
+            return
+        for entry, (_, _, _, last) in list(self._blocks.items()):
+            if entry <= ip <= last:
+                del self._blocks[entry]
+
+    #
+    # Compiling
+    #
+
+    def _compile(self, ip, single=False):
+        """Compile the block starting at ip, cache and return it
+        single compiles just the one instruction and doesn't cache it"""
+        emit = self.dialect.emit
+        n = len(self.program)
+        lines = []
+        ops = []
+        exit_expr = None
+        last = ip
+        k = ip
+        while k < n:
+            if k != ip and (single or k in self.breakpoints):
+                break
+            ins = self.program[k]
+            emitted = emit(self, ins, k)
+            if emitted is None:
+                if k == ip:
+                    # just this one, done by the machine
+                    block = (None, 1, (ins[0],), ip)
+                    if not single:
+                        self._blocks[ip] = block
+                    return block
+                break
+            if self.optimise and not single:
+                idiom = self._idiom(k)
+                if idiom is not None:
+                    lines.extend(self._idiom_lines(k, idiom))
+                    last = max(last, idiom.last)
+            code, exit_expr = emitted
+            lines.extend(code)
+            ops.append(ins[0])
+            k += 1
+            if exit_expr is not None:
+                break
+
+        if exit_expr is None:
+            if self.ip_register is not None:
+                lines.append(f"{self.target(self.ip_register)} = {k - 1}")
+            exit_expr = str(k)
+
+        body = "".join(f"    {line}\n" for line in lines)
+        src = f"def block(r):\n{body}    return {exit_expr}\n"
+        scope = {
+            "out": self.output.append,
+            "tdiv": _tdiv,
+            "multiples": _multiples,
+            "factors": factors,
+            "fired": self._idiom_hits,
+        }
+        exec(src, scope)  # pylint: disable=exec-used
+        block = (scope["block"], k - ip, tuple(ops), max(last, k - 1))
+        if not single:
+            self._blocks[ip] = block
+        return block
+
+    def _idiom(self, k):
+        """The first idiom of the dialect for a loop at k, if any
+        A breakpoint inside the loop would be skipped over, so none then"""
+        for match in self.dialect.idioms:
+            idiom = match(self, k)
+            if idiom is None:
+                continue
+            if any(k < b <= idiom.last for b in self.breakpoints):
+                return None
+            self._idiom_names[k] = idiom.name
+            return idiom
+        return None
+
+    @staticmethod
+    def _idiom_lines(k, idiom):
+        lines = list(idiom.setup)
+        indent = ""
+        if idiom.guard is not None:
+            lines.append(f"if {idiom.guard}:")
+            indent = "    "
+        lines.extend(indent + line for line in idiom.body)
+        lines.append(f"{indent}fired[{k}] += 1")
+        lines.append(f"{indent}return {idiom.exit}")
+        return lines
+
+    def idioms(self) -> dict:
+        """The loop idioms found, {ip: (name, times its fast path ran)}"""
+        return {
+            k: (name, self._idiom_hits[k])
+            for k, name in sorted(self._idiom_names.items())
+        }
+
+    def _fold_hits(self):
+        for ip, hits in self._hits.items():
+            for op in self._blocks[ip][2]:
+                self._op_counts[op] += hits
+        self._hits.clear()
+
+    def op_counts(self) -> Counter:
+        """How many times each op has run, if count_ops was set"""
+        self._fold_hits()
+        return Counter(self._op_counts)
+
+    #
+    # Running
+    #
+
+    def run(self, max_steps=None, max_output=None) -> str:
+        """Run until it halts, waits for input or a limit or breakpoint"""
+        r = self.r
+        n = len(self.program)
+        breakpoints = self.breakpoints
+        if breakpoints != self._compiled_breakpoints:
+            # blocks end before a breakpoint, so these need compiling again
+            self.invalidate()
+            self._compiled_breakpoints = set(breakpoints)
+        blocks = self._blocks
+        hits = self._hits if self.count_ops else None
+        limit = None if max_steps is None else self.steps + max_steps
+        output = self.output
+        ip = self.ip
+        first = True
+        status = HALT
+        while 0 <= ip < n:
+            if breakpoints and not first and ip in breakpoints:
+                status = BREAK
+                break
+            first = False
+
+            block = blocks.get(ip) or self._compile(ip)
+            fn, length, _, _ = block
+            if hits is not None:
+                hits[ip] += 1
+            if fn is None:
+                nxt = self.dialect.execute(self, self.program[ip], ip)
+                if nxt is None:
+                    status = WAIT
+                    break
+                ip = nxt
+            else:
+                ip = fn(r)
+            self.steps += length
+
+            if max_output is not None and len(output) >= max_output:
+                status = OUTPUT
+                break
+            if limit is not None and self.steps >= limit:
+                status = LIMIT
+                break
+
+        self.ip = ip
+        if status == BREAK and self.ip_register is not None:
+            r[self.ip_register] = ip
+        return status
+
+    def step(self) -> str:
+        """Run a single instruction, without caching it as a block"""
+        ip = self.ip
+        if not 0 <= ip < len(self.program):
+            return HALT
+        fn, length, _, _ = self._compile(ip, single=True)
+        if fn is None:
+            nxt = self.dialect.execute(self, self.program[ip], ip)
+            if nxt is None:
+                return WAIT
+        else:
+            nxt = fn(self.r)
+        self.steps += length
+        self.ip = nxt
+        return HALT if not 0 <= nxt < len(self.program) else BREAK
+
+
+def test_regvm():
+    """Test each dialect on a small program"""
+    vm = RegisterVM.from_lines(
+        ["cpy 41 a", "inc a", "inc a", "dec a", "jnz a 2", "dec a"], "assembunny"
+    )
+    assert vm.run() == HALT
+    assert vm["a"] == 42
+
+    # the example from 2016/23
+    lines = ["cpy 2 a", "tgl a", "tgl a", "tgl a", "cpy 1 a", "dec a", "dec a"]
+    vm = RegisterVM.from_lines(lines, "assembunny")
+    vm.run()
+    assert vm["a"] == 3
+    assert vm.program[3] == ("inc", "a")
+
+    vm = RegisterVM.from_lines(["inc a", "jio a, +2", "tpl a", "inc a"], "turing")
+    vm.run()
+    assert vm["a"] == 2
+
+    # duet part B, both send and receive
+    lines = ["snd 1", "snd 2", "snd p", "rcv a", "rcv b", "rcv c", "rcv d"]
+    a = RegisterVM.from_lines(lines, "duet")
+    b = RegisterVM.from_lines(lines, "duet")
+    b["p"] = 1
+    assert a.run() == WAIT
+    b.input.extend(a.output)
+    assert b.run() == WAIT
+    assert b.registers()["c"] == 0
+    assert (b["a"], b["b"], b["c"]) == (1, 2, 0)
+
+    # 2018/19 example, the ip register is written back at the end
+    lines = [
+        "#ip 0",
+        "seti 5 0 1",
+        "seti 6 0 2",
+        "addi 0 1 0",
+        "addr 1 2 3",
+        "setr 1 0 0",
+        "seti 8 0 4",
+        "seti 9 0 5",
+    ]
+    vm = RegisterVM.from_lines(lines, "elfcode")
+    vm.count_ops = True
+    vm.run()
+    assert vm.r == [6, 5, 6, 0, 0, 9]
+    assert vm.steps == 5
+    assert vm.op_counts()["seti"] == 3
+    assert elfcode_op("gtri", (1, 5, 2), [0, 7, 0, 0]) == [0, 7, 1, 0]
+
+    lines = ["nop +0", "acc +1", "jmp +4", "acc +3", "jmp -3", "acc -99", "acc +1"]
+    vm = RegisterVM.from_lines(lines, "handheld")
+    vm.run()
+    assert vm["acc"] == 2
+
+    lines = ["inp w", "add z w", "mod z 2", "div w 2", "mul w -1", "div w 2"]
+    vm = RegisterVM.from_lines(lines, "alu")
+    assert vm.run() == WAIT
+    vm.input.append(7)
+    assert vm.run() == HALT
+    assert vm.registers() == {"w": -1, "x": 0, "y": 0, "z": 1}
+
+    lines = ["Register A: 729", "", "Program: 0,1,5,4,3,0"]
+    vm = RegisterVM.from_lines(lines, "chronospatial")
+    vm["A"] = 729
+    vm.run()
+    assert vm.output == [4, 6, 3, 5, 6, 3, 5, 2, 1, 0]
+
+    vm.reset()
+    vm["A"] = 729
+    assert vm.run(max_output=3) == OUTPUT
+    assert vm.output == [4, 6, 3]
+
+    # stepping and breakpoints
+    vm = RegisterVM.from_lines(["inc a", "inc a", "inc a", "jnz a -3"], "assembunny")
+    vm.breakpoints = {2}
+    assert vm.run() == BREAK and vm["a"] == 2
+    assert vm.step() == BREAK and vm["a"] == 3 and vm.ip == 3
+    assert vm.run() == BREAK and vm["a"] == 5
+    vm.breakpoints = {1}
+    assert vm.run() == BREAK and vm["a"] == 7 and vm.ip == 1
+
+
+def test_idioms():
+    """The fast paths agree with running the loops"""
+
+    def both(lines, dialect, **registers):
+        vms = []
+        for optimise in (False, True):
+            vm = RegisterVM.from_lines(lines, dialect, optimise=optimise)
+            for k, v in registers.items():
+                vm[int(k[1:]) if k[0] == "r" else k] = v
+            assert vm.run() == HALT
+            vms.append(vm)
+        plain, fast = vms
+        assert plain.r == fast.r and plain.ip == fast.ip
+        return [name for name, fired in fast.idioms().values() if fired]
+
+    lines = ["cpy b c", "inc a", "dec c", "jnz c -2", "dec d", "jnz d -5"]
+    assert both(lines, "assembunny", b=7, d=6) == ["multiply add"]
+
+    # the add loop turns into a subtract loop after the tgl
+    lines = ["cpy 3 c", "inc a", "dec c", "jnz c -2", "jnz b 5", "inc b"]
+    lines += ["cpy -6 c", "tgl c", "jnz 1 -8"]
+    assert both(lines, "assembunny") == ["decrement to zero"]
+
+    lines = ["set g d", "mul g e", "sub g b", "jnz g 2", "set f 0", "sub e -1"]
+    lines += ["set g e", "sub g b", "jnz g -8"]
+    nested = ["set e 2"] + lines + ["sub d -1", "set g d", "sub g b", "jnz g -13"]
+    for b in range(3, 30):
+        assert both(lines, "duet", b=b, d=3, e=2, f=1) == ["divisor scan"]
+        assert both(nested, "duet", b=b, d=2, f=1) == ["nested divisor scan"]
+
+    # 2018/19 with commutative args swapped round
+    lines = ["#ip 2", "seti 1 0 3", "mulr 3 1 4", "eqrr 5 4 4", "addr 2 4 2"]
+    lines += ["addi 2 1 2", "addr 0 1 0", "addi 3 1 3", "gtrr 3 5 4", "addr 4 2 2"]
+    lines += ["seti 0 0 2", "addi 1 1 1", "gtrr 1 5 4", "addr 4 2 2", "seti -1 0 2"]
+    assert both(lines, "elfcode", r1=1, r5=36) == ["nested divisor sum"]
+
+    # 2018/21, the quotient found by counting
+    lines = ["#ip 1", "seti 0 0 2", "addi 2 1 4", "muli 4 256 4", "gtrr 4 5 4"]
+    lines += ["addr 4 1 1", "addi 1 1 1", "seti 8 0 1", "addi 2 1 2", "seti 0 0 1"]
+    lines += ["setr 2 0 5"]
+    assert both(lines, "elfcode", r5=65536 + 255) == ["division"]
+
+
+# test_regvm()
+# test_idioms()
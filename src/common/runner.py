@@ -0,0 +1,188 @@
+"""Headless runner for the whole catalog (or some of it)
+
+Every day_nn.py solves its parts at import time, so running a day is just
+importing it. Each day is run in its own worker process with stdout silenced
+and the `aoc_part` decorator logging the answer and stats of every part.
+
+From the src folder
+
+    python -m common.runner                         everything
+    python -m common.runner 2019 2023:5,17          some years/days
+    python -m common.runner -w 8 -o report.csv      8 workers, CSV report
+    python -m common.runner -m -o report.json       include peak memory
+    python -m common.runner -r 3 --history h.jsonl  best of 3, keep history
+
+See common.benchmark for comparing runs kept in the history.
+
+Parts are identified by year, day, part and call. The call is the order in
+which the day module invoked that part, so with the template 1 is the example
+and 2 is my data.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+import csv
+from glob import glob
+from importlib.util import module_from_spec, spec_from_file_location
+import json
+from os import cpu_count, devnull, path
+import sys
+from time import perf_counter
+import tracemalloc
+
+from common import aoc
+from common.benchmark import append_history
+
+SRC_PATH = path.dirname(path.dirname(path.abspath(__file__)))
+
+REPORT_FIELDS = [
+    "year",
+    "day",
+    "part",
+    "call",
+    "input_size",
+    "answer",
+    "repeat",
+    "wall_time",
+    "cpu_time",
+    "peak_memory",
+    "error",
+]
+
+
+def discover_days(selection=None) -> list:
+    """Return a sorted list of (year, day, filename) for all the day modules.
+    selection is an optional list of "yyyy" or "yyyy:d,d,.." strings"""
+    wanted = {}
+    for sel in selection or []:
+        year, _, days = sel.partition(":")
+        wanted[int(year)] = {int(d) for d in days.split(",")} if days else None
+
+    days = []
+    for fn in glob(path.join(SRC_PATH, "20[0-9][0-9]", "day_[0-9][0-9].py")):
+        year = int(path.basename(path.dirname(fn)))
+        day = int(path.basename(fn)[4:6])
+        if wanted:
+            if year not in wanted:
+                continue
+            if wanted[year] is not None and day not in wanted[year]:
+                continue
+        days.append((year, day, fn))
+    return sorted(days)
+
+
+def run_day(year, day, filename, trace_memory=False, repeat=1) -> list:
+    """Import (and so solve) a day module, returning the logged parts
+    If it fails then the last record carries the error"""
+    aoc.part_log = []
+    aoc.repeat_count = repeat
+    if trace_memory:
+        tracemalloc.start()
+
+    error = None
+    with open(devnull, "w", encoding=aoc.ENCODING) as null, redirect_stdout(null):
+        try:
+            spec = spec_from_file_location(f"aoc_{year}_day_{day:02d}", filename)
+            module = module_from_spec(spec)
+            sys.modules[spec.name] = module
+            spec.loader.exec_module(module)
+        except (Exception, SystemExit) as e:  # pylint: disable=broad-except
+            error = f"{type(e).__name__}: {e}"
+
+    if trace_memory:
+        tracemalloc.stop()
+
+    records = aoc.part_log
+    aoc.part_log = None
+    for rec in records:
+        rec["year"] = year
+        rec["day"] = day
+    if error is not None:
+        records.append({"year": year, "day": day, "error": error})
+    return records
+
+
+def run_days(days, workers=None, trace_memory=False, repeat=1, progress=True) -> list:
+    """Run the days over a process pool, return all the records in day order"""
+    results = {}
+    # a fresh process for every day, as the days like to leave things behind
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool:
+        futures = {
+            pool.submit(run_day, year, day, fn, trace_memory, repeat): (year, day)
+            for year, day, fn in days
+        }
+        for future in as_completed(futures):
+            year, day = futures[future]
+            try:
+                records = future.result()
+            except Exception as e:  # pylint: disable=broad-except
+                records = [{"year": year, "day": day, "error": repr(e)}]
+            results[(year, day)] = records
+            if progress:
+                print_day(year, day, records)
+
+    return [rec for key in sorted(results) for rec in results[key]]
+
+
+def print_day(year, day, records):
+    """One line summary of a day"""
+    wall = sum(rec.get("wall_time", 0) for rec in records)
+    errors = [rec["error"] for rec in records if rec.get("error")]
+    status = f"ERROR {errors[0]}" if errors else "ok"
+    print(f"{year} day {day:02d}: {len(records):2d} parts {wall:8.3f} s  {status}")
+
+
+def write_report(records, filename):
+    """Write as CSV if the file name ends in .csv otherwise JSON"""
+    if filename.lower().endswith(".csv"):
+        with open(filename, "w", encoding=aoc.ENCODING, newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            for rec in records:
+                writer.writerow(rec)
+        return
+
+    with open(filename, "w", encoding=aoc.ENCODING) as f:
+        json.dump(records, f, indent=2)
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run AoC days headless")
+    parser.add_argument(
+        "selection", nargs="*", help="years or year:days to run, e.g. 2019 2023:5,17"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=cpu_count(), help="worker processes"
+    )
+    parser.add_argument("-o", "--output", help="report file (.json or .csv)")
+    parser.add_argument(
+        "-m", "--memory", action="store_true", help="trace peak memory (slower)"
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=1, help="run each part n times, keep best"
+    )
+    parser.add_argument("--history", help="append the timings to a history file")
+    parser.add_argument("--label", help="label the run in the history")
+    args = parser.parse_args(argv)
+
+    days = discover_days(args.selection)
+    print(f"Running {len(days)} days over {args.workers} workers")
+    start_time = perf_counter()
+    records = run_days(
+        days, workers=args.workers, trace_memory=args.memory, repeat=args.repeat
+    )
+    print(f"Total duration: {perf_counter() - start_time:.3f} s")
+
+    if args.output:
+        write_report(records, args.output)
+
+    if args.history:
+        append_history(args.history, records, label=args.label)
+
+    return records
+
+
+if __name__ == "__main__":
+    main()
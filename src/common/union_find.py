@@ -1,3 +1,163 @@
+"""Disjoint sets (union find)
+
+DisjointSet holds the parent and size of each element in flat lists, so
+there is no object per element and find is a loop (path halving) rather
+than recursion. Elements are the ints 0..n-1, or any hashable id when
+no n is given, which are then numbered as they turn up.
+
+    ds = DisjointSet.from_edges(edges)
+    ds.count            number of components
+    ds.size(x)          size of the component x is in
+    ds.sizes()          all the component sizes
+    ds.groups()         the components as lists
+
+Node, find and union are the original object per element version.
+"""
+
+
+class DisjointSet:
+    """Union find with union by size and path halving"""
+
+    def __init__(self, n: int = None) -> None:
+        self._ids = None
+        if n is None:
+            # hashed ids, numbered as they are added
+            self._ids = []
+            self._index = {}
+            n = 0
+        self._parent = list(range(n))
+        self._size = [1] * n
+        self.count = n
+
+    @classmethod
+    def from_edges(cls, edges, n: int = None, nodes=()):
+        """Build from a stream of (u, v) pairs, nodes adds any loners"""
+        ds = cls(n)
+        for u in nodes:
+            ds.add(u)
+        ds.union_many(edges)
+        return ds
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def __contains__(self, x) -> bool:
+        if self._ids is None:
+            return isinstance(x, int) and 0 <= x < len(self._parent)
+        return x in self._index
+
+    def add(self, x) -> int:
+        """Add x as a singleton if it is new, return its index"""
+        if self._ids is None:
+            return x
+        i = self._index.get(x)
+        if i is None:
+            i = len(self._ids)
+            self._index[x] = i
+            self._ids.append(x)
+            self._parent.append(i)
+            self._size.append(1)
+            self.count += 1
+        return i
+
+    def _root(self, i: int) -> int:
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def find(self, x):
+        """Return the representative of the set containing x"""
+        i = self._root(self.add(x))
+        return i if self._ids is None else self._ids[i]
+
+    def _union_roots(self, a: int, b: int) -> bool:
+        if a == b:
+            return False
+        size = self._size
+        if size[a] < size[b]:
+            a, b = b, a
+        self._parent[b] = a
+        size[a] += size[b]
+        self.count -= 1
+        return True
+
+    def union(self, x, y) -> bool:
+        """Merge the sets containing x and y, False if already the same"""
+        return self._union_roots(self._root(self.add(x)), self._root(self.add(y)))
+
+    def union_many(self, pairs) -> int:
+        """Union every (x, y) pair, return how many merges there were"""
+        add = self.add
+        root = self._root
+        union_roots = self._union_roots
+        merges = 0
+        for x, y in pairs:
+            if union_roots(root(add(x)), root(add(y))):
+                merges += 1
+        return merges
+
+    def connected(self, x, y) -> bool:
+        """True if x and y are in the same set"""
+        return self._root(self.add(x)) == self._root(self.add(y))
+
+    def size(self, x) -> int:
+        """Size of the set containing x"""
+        return self._size[self._root(self.add(x))]
+
+    def sizes(self) -> list:
+        """Sizes of all the sets, largest first"""
+        size = self._size
+        roots = (i for i, p in enumerate(self._parent) if i == p)
+        return sorted((size[i] for i in roots), reverse=True)
+
+    def groups(self) -> list:
+        """All the sets as lists of their elements"""
+        groups = {}
+        ids = self._ids
+        for i in range(len(self._parent)):
+            x = i if ids is None else ids[i]
+            groups.setdefault(self._root(i), []).append(x)
+        return list(groups.values())
+
+
+def test_disjoint_set():
+    """Test DisjointSet"""
+    ds = DisjointSet(10)
+    assert ds.count == 10
+    assert ds.union(1, 2)
+    assert not ds.union(2, 1)
+    assert ds.union_many([(3, 4), (4, 5), (5, 3), (2, 3)]) == 3
+    assert ds.count == 6
+    assert ds.connected(1, 5)
+    assert not ds.connected(0, 5)
+    assert ds.size(4) == 5
+    assert ds.sizes() == [5, 1, 1, 1, 1, 1]
+    assert sorted(sorted(g) for g in ds.groups())[:2] == [[0], [1, 2, 3, 4, 5]]
+
+    # hashed ids and a long chain, no recursion limit
+    n = 100000
+    ds = DisjointSet.from_edges(((f"n{i}", f"n{i + 1}") for i in range(n)))
+    assert ds.count == 1
+    assert len(ds) == n + 1
+    assert ds.size("n0") == n + 1
+    assert ds.find("n0") == ds.find(f"n{n}")
+
+    ds = DisjointSet.from_edges([("a", "b")], nodes="abc")
+    assert ds.count == 2
+    assert "c" in ds and "d" not in ds
+    assert sorted(map(sorted, ds.groups())) == [["a", "b"], ["c"]]
+
+
+# test_disjoint_set()
+
+
+#
+# Object per element
+#
+
+
 class Node:
     """Represents an element of a set."""
 